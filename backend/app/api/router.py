@@ -2,7 +2,15 @@ from fastapi import APIRouter
 
 from app.api.routes.inventory import router as inventory_router
 from app.api.routes.billing import router as billing_router
+from app.api.routes.jobs import router as jobs_router
+from app.api.routes.events import router as events_router
+from app.api.routes.sync import router as sync_router
+from app.api.routes.metrics import router as metrics_router
 
 api_router = APIRouter()
 api_router.include_router(inventory_router)
 api_router.include_router(billing_router)
+api_router.include_router(jobs_router)
+api_router.include_router(events_router)
+api_router.include_router(sync_router)
+api_router.include_router(metrics_router)
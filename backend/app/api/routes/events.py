@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.auth import AuthenticatedUser, get_current_user
+from app.core.responses import sse_event
+from app.services.events import get_event_bus
+
+
+router = APIRouter(tags=["events"])
+
+
+# Comment frames keep idle connections from being closed by proxies.
+HEARTBEAT_SECONDS = 15.0
+
+
+@router.get("/events")
+async def events_route(request: Request, user: AuthenticatedUser = Depends(get_current_user)) -> StreamingResponse:
+    """Stream the user's item, document and activity changes as server-sent events.
+
+    Events are ``{"type": "item.created" | "item.updated" | "item.deleted" |
+    "document.created" | "document.updated" | "document.deleted" |
+    "activity.created" | "activity.updated", ...}``. A ``resync`` event means
+    the client fell behind and should refetch its collections.
+    """
+    bus = get_event_bus()
+    sub = bus.subscribe(user_id=user.user_id)
+
+    async def _stream():
+        try:
+            yield sse_event({"type": "ready"})
+            while not await request.is_disconnected():
+                event = await sub.get(timeout=HEARTBEAT_SECONDS)
+                yield ": ping\n\n" if event is None else sse_event(event)
+        finally:
+            bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -2,21 +2,29 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, File, Request, Response, UploadFile
 from fastapi import status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 import logging
 
 import httpx
 
 from app.core.auth import AuthenticatedUser, get_current_user
-from app.core.errors import bad_gateway, bad_request, service_unavailable
+from app.core.conditional import etag_matches, not_modified, set_etag
+from app.core.config import get_settings
+from app.core.errors import bad_gateway, bad_request, payload_too_large, service_unavailable
+from app.core.rate_limit import llm_lease
+from app.core.responses import FastJSONResponse, project
 from app.schemas.ai import AICommandRequest, AICommandResponse
 from app.schemas.inventory import (
     AddItemRequest,
     AddItemResponse,
     DeleteItemResponse,
     ExtractFromImageResponse,
+    InventoryStatsResponse,
+    ListItemsResponse,
     ProcessBarcodeRequest,
     ProcessBarcodeResponse,
+    ReindexItemsResponse,
     SearchItemsRequest,
     SearchItemsResponse,
     UpdateItemRequest,
@@ -25,20 +33,53 @@ from app.schemas.inventory import (
     BulkCreateResponse,
     MultiExtractFromImageResponse,
 )
-from app.schemas.documents import ListDocumentsResponse, RecentActivityResponse, UploadDocumentResponse
-from app.services.items_repo import add_item, bulk_create_items, delete_item, search_items_basic, update_item
+from app.schemas.documents import (
+    ActivityEntry,
+    DocumentRecord,
+    DocumentSearchResponse,
+    ListDocumentsResponse,
+    RecentActivityResponse,
+    UploadDocumentResponse,
+)
+from app.services.collection_versions import ACTIVITY, DOCUMENTS, ITEMS, collection_etag
+from app.services.items_repo import (
+    add_item,
+    bulk_create_items,
+    delete_item,
+    get_inventory_stats,
+    list_items,
+    search_items_basic,
+    update_item,
+)
 from app.services.ai_agent import iter_ai_command_sse, run_ai_command
 from app.services.openai_service import (
     extract_item_from_image,
     extract_items_from_image_multi,
     interpret_barcode,
     parse_search_query_to_keywords,
-    summarize_activity,
 )
-from app.services.documents_repo import create_activity, create_document, list_recent_activity
-from app.services.documents_repo import list_documents
-from app.services.supabase_client import get_supabase_admin
-from app.services.storage import upload_document, upload_image
+from app.services.activity import record_activity, render_activity_summary
+from app.services.documents_repo import create_document, list_recent_activity
+from app.services.documents_repo import delete_document, get_document, list_documents
+from app.services.upload_jobs import enqueue_document_postprocessing
+from app.services.embeddings import hybrid_search_documents, hybrid_search_items
+from app.services.job_queue import get_job_queue
+from app.services.rate_limits import LLMLease
+from app.services.resilience import UpstreamUnavailableError
+from app.services.single_flight import get_single_flight
+from app.services.storage import (
+    EmptyUploadError,
+    ForeignObjectError,
+    UploadTooLargeError,
+    attach_document_urls,
+    attach_thumbnail_urls,
+    release_object,
+    signed_url_epoch,
+    store_thumbnails,
+    thumbnail_urls,
+    upload_document,
+    upload_image,
+)
 
 router = APIRouter(tags=["inventory"])
 
@@ -48,17 +89,56 @@ logger = logging.getLogger(__name__)
 
 @router.post("/add_item", response_model=AddItemResponse)
 def add_item_route(payload: AddItemRequest, user: AuthenticatedUser = Depends(get_current_user)) -> AddItemResponse:
-    created = add_item(user_id=user.user_id, item=payload.model_dump())
+    try:
+        created = add_item(user_id=user.user_id, item=payload.model_dump())
+    except ForeignObjectError:
+        raise bad_request("Unknown image_path")
     return AddItemResponse(item=created)
 
 
+@router.get("/items", response_model=ListItemsResponse)
+def list_items_route(
+    request: Request,
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    etag = collection_etag(user_id=user.user_id, collection=ITEMS, variant=(signed_url_epoch(),))
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+
+    try:
+        items = list_items(user_id=user.user_id)
+    except httpx.HTTPError:
+        logger.exception("Upstream error during /items")
+        raise service_unavailable("Inventory temporarily unavailable. Please try again.")
+
+    resp = FastJSONResponse({"items": attach_thumbnail_urls(items)})
+    set_etag(resp, etag)
+    return resp
+
+
 @router.post("/search_items", response_model=SearchItemsResponse)
-def search_items_route(payload: SearchItemsRequest, user: AuthenticatedUser = Depends(get_current_user)) -> SearchItemsResponse:
+def search_items_route(
+    payload: SearchItemsRequest,
+    user: AuthenticatedUser = Depends(get_current_user),
+    _lease: LLMLease = Depends(llm_lease),
+):
     try:
-        parsed = parse_search_query_to_keywords(query=payload.query)
-        q = (parsed.get("text") or payload.query or "").strip()
+        if payload.mode == "semantic":
+            parsed = {"text": payload.query.strip(), "mode": "semantic"}
+            items = hybrid_search_items(user_id=user.user_id, q=payload.query)
+        else:
+            # Hydration often repeats the same search; share one LLM parse per user and query.
+            # Parse the same normalized text the key is built from, so every caller
+            # sharing the key gets a result for exactly that input.
+            query = payload.query.strip().lower()
+            parsed = get_single_flight().do(
+                (user.user_id, "search_parse", query),
+                lambda: parse_search_query_to_keywords(query=query),
+                ttl=get_settings().search_parse_cache_seconds,
+            )
+            q = (parsed.get("text") or query).strip()
 
-        items = search_items_basic(user_id=user.user_id, q=q)
+            items = search_items_basic(user_id=user.user_id, q=q)
 
         category = parsed.get("category")
         location = parsed.get("location")
@@ -68,24 +148,42 @@ def search_items_route(payload: SearchItemsRequest, user: AuthenticatedUser = De
             items = [i for i in items if (i.get("location") or "").lower() == str(location).lower()]
 
         try:
-            create_activity(
+            record_activity(
                 user_id=user.user_id,
-                summary=f"Searched inventory: {payload.query}",
-                metadata={"type": "search_items", "query": payload.query, "parsed": parsed, "results": len(items)},
+                action="search_items",
+                details={"query": payload.query, "parsed": parsed, "results": len(items)},
                 actor_name=user.first_name,
             )
         except Exception:
             logger.exception("Failed to write search activity")
 
-        return SearchItemsResponse(items=items, parsed=parsed)
+        return FastJSONResponse({"items": attach_thumbnail_urls(items), "parsed": parsed})
     except httpx.HTTPError:
         logger.exception("Upstream error during /search_items")
         raise service_unavailable("Search temporarily unavailable. Please try again.")
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("OpenAI error during /search_items")
         raise bad_gateway("Search temporarily unavailable. Please try again.")
 
 
+@router.get("/inventory/stats", response_model=InventoryStatsResponse)
+def inventory_stats_route(user: AuthenticatedUser = Depends(get_current_user)) -> InventoryStatsResponse:
+    try:
+        return InventoryStatsResponse(**get_inventory_stats(user_id=user.user_id))
+    except httpx.HTTPError:
+        logger.exception("Upstream error during /inventory/stats")
+        raise service_unavailable("Inventory stats temporarily unavailable. Please try again.")
+
+
+@router.post("/inventory/reindex", response_model=ReindexItemsResponse)
+def reindex_items_route(user: AuthenticatedUser = Depends(get_current_user)) -> ReindexItemsResponse:
+    """Queue a semantic-search embedding refresh for all of the user's items; unchanged items are skipped."""
+    job_id = get_job_queue().enqueue(user_id=user.user_id, kind="embed_items", payload={"user_id": user.user_id, "item_ids": None})
+    return ReindexItemsResponse(job_id=job_id)
+
+
 @router.delete("/delete_item", response_model=DeleteItemResponse)
 def delete_item_route(item_id: str, user: AuthenticatedUser = Depends(get_current_user)) -> DeleteItemResponse:
     ok = delete_item(user_id=user.user_id, item_id=item_id)
@@ -101,6 +199,10 @@ def update_item_route(payload: UpdateItemRequest, user: AuthenticatedUser = Depe
         if not updated:
             raise bad_request("No updates applied")
         return UpdateItemResponse(item=updated)
+    except ForeignObjectError:
+        raise bad_request("Unknown image_path")
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("Unhandled error during /update_item")
         raise service_unavailable("Update temporarily unavailable. Please try again.")
@@ -110,32 +212,59 @@ def update_item_route(payload: UpdateItemRequest, user: AuthenticatedUser = Depe
 async def extract_from_image_route(
     file: UploadFile = File(...),
     user: AuthenticatedUser = Depends(get_current_user),
+    _lease: LLMLease = Depends(llm_lease),
 ) -> ExtractFromImageResponse:
-    raw = await file.read()
-    if not raw:
+    try:
+        stored = await upload_image(user_id=user.user_id, upload=file)
+    except EmptyUploadError:
         raise bad_request("Empty file")
-
-    stored = upload_image(user_id=user.user_id, filename=file.filename or "upload.png", content=raw)
+    except UploadTooLargeError:
+        raise payload_too_large("Image exceeds the maximum upload size")
+
+    bucket = get_settings().supabase_storage_bucket
+    if stored.deduplicated:
+        stored.thumbnail_urls = await run_in_threadpool(thumbnail_urls, bucket=bucket, path=stored.path)
+    else:
+        await file.seek(0)
+        stored.thumbnail_urls = await run_in_threadpool(store_thumbnails, bucket=bucket, path=stored.path, source=file.file)
+
+    # The vision model needs the full image; re-read it from the spooled upload
+    # only after the storage write has been streamed.
+    await file.seek(0)
+    raw = await file.read()
     try:
-        extracted = extract_item_from_image(filename=file.filename or "upload.png", image_bytes=raw)
+        extracted = await extract_item_from_image(filename=file.filename or "upload.png", image_bytes=raw)
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("Vision extraction failed")
         raise bad_gateway("AI extraction temporarily unavailable. Please try again.")
 
-    return ExtractFromImageResponse(extracted=extracted, image_url=stored.url)
+    return ExtractFromImageResponse(
+        extracted=extracted,
+        image_url=stored.url,
+        image_path=stored.path,
+        thumbnail_urls=stored.thumbnail_urls,
+    )
 
 
 @router.post("/inventory/extract_from_image", response_model=MultiExtractFromImageResponse)
 async def inventory_extract_from_image_route(
     file: UploadFile = File(...),
     user: AuthenticatedUser = Depends(get_current_user),
+    _lease: LLMLease = Depends(llm_lease),
 ) -> MultiExtractFromImageResponse:
+    if file.size is not None and file.size > get_settings().max_image_mb * 1024 * 1024:
+        raise payload_too_large("Image exceeds the maximum upload size")
+
     raw = await file.read()
     if not raw:
         raise bad_request("Empty file")
 
     try:
-        data = extract_items_from_image_multi(filename=file.filename or "upload.png", image_bytes=raw)
+        data = await extract_items_from_image_multi(filename=file.filename or "upload.png", image_bytes=raw)
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("Vision extraction failed")
         raise bad_gateway("AI extraction temporarily unavailable. Please try again.")
@@ -152,10 +281,10 @@ async def inventory_extract_from_image_route(
         summary["categories"] = {}
 
     try:
-        create_activity(
+        record_activity(
             user_id=user.user_id,
-            summary=f"Scanned image for inventory items ({len(items)} detected)",
-            metadata={"type": "scan_image", "filename": file.filename, "total_detected": len(items)},
+            action="scan_image",
+            details={"filename": file.filename, "total_detected": len(items)},
             actor_name=user.first_name,
         )
     except Exception:
@@ -173,19 +302,23 @@ def inventory_bulk_create_route(
         inserted, failures = bulk_create_items(user_id=user.user_id, items=[i.model_dump() for i in payload.items])
 
         try:
-            create_activity(
+            record_activity(
                 user_id=user.user_id,
-                summary=f"Saved {len(inserted)} scanned items to inventory",
-                metadata={"type": "bulk_create", "inserted": len(inserted), "failures": len(failures)},
+                action="bulk_create",
+                details={"inserted": len(inserted), "failures": len(failures)},
                 actor_name=user.first_name,
             )
         except Exception:
             logger.exception("Failed to write bulk create activity")
 
         return BulkCreateResponse(inserted=inserted, failures=failures)
+    except ForeignObjectError:
+        raise bad_request("Unknown image_path")
     except httpx.HTTPError:
         logger.exception("Upstream error during bulk create")
         raise service_unavailable("Bulk insert temporarily unavailable. Please try again.")
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("Unhandled error during bulk create")
         raise service_unavailable("Bulk insert temporarily unavailable. Please try again.")
@@ -205,6 +338,7 @@ def ai_command_route(
     payload: AICommandRequest,
     request: Request,
     user: AuthenticatedUser = Depends(get_current_user),
+    lease: LLMLease = Depends(llm_lease),
     stream: bool = False,
 ) -> AICommandResponse:
     accept = (request.headers.get("accept") or "").lower()
@@ -212,22 +346,24 @@ def ai_command_route(
 
     if wants_stream:
         try:
-            def _wrap_sse(gen):
+            def _wrap_sse(gen, lease):
                 done_sent = False
                 try:
                     for chunk in gen:
-                        if not done_sent and isinstance(chunk, str) and '"type": "done"' in chunk:
+                        if not done_sent and isinstance(chunk, str) and '"type":"done"' in chunk:
                             done_sent = True
                         yield chunk
                 except Exception:
                     logger.exception("AI command stream generator failed")
                 finally:
+                    lease.release()
                     if not done_sent:
                         yield 'event: end\n'
                         yield 'data: {"type":"done","tool":null,"result":null,"assistant_message":""}\n\n'
 
             gen = iter_ai_command_sse(user_id=user.user_id, message=payload.message, first_name=user.first_name)
-            wrapped = _wrap_sse(gen)
+            # The LLM work happens while the body streams, after this route returns.
+            wrapped = _wrap_sse(gen, lease.detach())
             return StreamingResponse(
                 wrapped,
                 media_type="text/event-stream",
@@ -237,21 +373,25 @@ def ai_command_route(
                     "X-Accel-Buffering": "no",
                 },
             )
+        except UpstreamUnavailableError:
+            raise
         except Exception:
             logger.exception("AI command stream failed")
             raise bad_gateway("AI temporarily unavailable. Please try again.")
 
     try:
         out = run_ai_command(user_id=user.user_id, message=payload.message, first_name=user.first_name)
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("AI command failed")
         raise bad_gateway("AI temporarily unavailable. Please try again.")
 
     try:
-        create_activity(
+        record_activity(
             user_id=user.user_id,
-            summary="Used Assist",
-            metadata={"type": "ai_chat", "tool": out.get("tool"), "message": payload.message},
+            action="ai_chat",
+            details={"tool": out.get("tool"), "message": payload.message},
             actor_name=user.first_name,
         )
     except Exception:
@@ -269,10 +409,6 @@ async def upload_document_route(
     file: UploadFile = File(...),
     user: AuthenticatedUser = Depends(get_current_user),
 ) -> UploadDocumentResponse:
-    raw = await file.read()
-    if not raw:
-        raise bad_request("Empty file")
-
     filename = file.filename or "upload"
     content_type = (file.content_type or "").lower()
     allowed = {
@@ -287,27 +423,47 @@ async def upload_document_route(
         raise bad_request("Unsupported file type")
 
     try:
-        stored = upload_document(user_id=user.user_id, filename=filename, content=raw)
+        stored = await upload_document(user_id=user.user_id, upload=file)
 
         mime = (file.content_type or "").lower()
         file_type = "pdf" if (mime == "application/pdf" or filename.lower().endswith(".pdf")) else "image"
 
-        doc = create_document(
+        activity_summary = render_activity_summary("upload_document", {"filename": filename})
+
+        # Identical content maps to the same storage_path, which identifies the
+        # document, so a repeat upload returns the existing row; its extraction,
+        # indexing and activity entry were done when it was first uploaded.
+        if stored.deduplicated:
+            existing = await run_in_threadpool(get_document, user_id=user.user_id, storage_path=stored.path)
+            if existing is not None:
+                return UploadDocumentResponse(document=existing, activity_summary=activity_summary)
+
+        doc = await run_in_threadpool(
+            create_document,
             user_id=user.user_id,
             filename=filename,
             mime_type=file.content_type,
             storage_path=stored.path,
             file_type=file_type,
-            size_bytes=len(raw),
+            size_bytes=stored.size_bytes,
         )
 
-        summary = summarize_activity(action="upload_document", details={"filename": filename, "mime_type": file.content_type})
-        create_activity(user_id=user.user_id, summary=summary, metadata={"type": "upload_document", "storage_path": stored.path}, actor_name=user.first_name)
+        # Summarization, activity logging and thumbnails run on the job queue so
+        # the response only waits for the bytes and the row.
+        job_ids = await run_in_threadpool(
+            enqueue_document_postprocessing, user_id=user.user_id, document=doc, actor_name=user.first_name
+        )
 
-        return UploadDocumentResponse(document=doc, activity_summary=summary)
+        return UploadDocumentResponse(document=doc, activity_summary=activity_summary, job_ids=job_ids)
+    except EmptyUploadError:
+        raise bad_request("Empty file")
+    except UploadTooLargeError:
+        raise payload_too_large("Document exceeds the maximum upload size")
     except httpx.HTTPError:
         logger.exception("Upstream error during document upload")
         raise service_unavailable("Upload temporarily unavailable. Please try again.")
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("Unhandled error during document upload")
         raise service_unavailable("Upload temporarily unavailable. Please try again.")
@@ -315,11 +471,37 @@ async def upload_document_route(
 
 @router.get("/documents", response_model=ListDocumentsResponse)
 def list_documents_route(
+    request: Request,
     user: AuthenticatedUser = Depends(get_current_user),
     limit: int = 200,
-) -> ListDocumentsResponse:
+):
+    etag = collection_etag(user_id=user.user_id, collection=DOCUMENTS, variant=(limit, signed_url_epoch()))
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+
     docs = list_documents(user_id=user.user_id, limit=limit)
-    return ListDocumentsResponse(documents=docs)
+    resp = FastJSONResponse({"documents": project(attach_document_urls(docs), DocumentRecord)})
+    set_etag(resp, etag)
+    return resp
+
+
+@router.get("/documents/search", response_model=DocumentSearchResponse)
+def search_documents_route(
+    q: str,
+    user: AuthenticatedUser = Depends(get_current_user),
+    limit: int = 10,
+) -> DocumentSearchResponse:
+    try:
+        hits = hybrid_search_documents(user_id=user.user_id, query=q, limit=max(1, min(limit, 50)))
+        return DocumentSearchResponse(results=hits)
+    except httpx.HTTPError:
+        logger.exception("Upstream error during document search")
+        raise service_unavailable("Document search temporarily unavailable. Please try again.")
+    except UpstreamUnavailableError:
+        raise
+    except Exception:
+        logger.exception("Unhandled error during document search")
+        raise service_unavailable("Document search temporarily unavailable. Please try again.")
 
 
 @router.delete("/documents", status_code=status.HTTP_204_NO_CONTENT)
@@ -331,13 +513,14 @@ def delete_document_route(
         raise bad_request("Missing storage_path")
 
     try:
-        supabase = get_supabase_admin()
-        supabase.storage.from_("documents").remove([storage_path])
-        supabase.table("documents").delete().eq("user_id", user.user_id).eq("storage_path", storage_path).execute()
+        if delete_document(user_id=user.user_id, storage_path=storage_path):
+            release_object(bucket="documents", path=storage_path, user_id=user.user_id)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except httpx.HTTPError:
         logger.exception("Upstream error during document deletion")
         raise service_unavailable("Delete temporarily unavailable. Please try again.")
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("Unhandled error during document deletion")
         raise service_unavailable("Delete temporarily unavailable. Please try again.")
@@ -345,15 +528,24 @@ def delete_document_route(
 
 @router.get("/activity/recent", response_model=RecentActivityResponse)
 def recent_activity_route(
+    request: Request,
     user: AuthenticatedUser = Depends(get_current_user),
     limit: int = 10,
-) -> RecentActivityResponse:
+):
+    etag = collection_etag(user_id=user.user_id, collection=ACTIVITY, variant=(limit,))
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+
     try:
         activities = list_recent_activity(user_id=user.user_id, limit=limit)
-        return RecentActivityResponse(activities=activities)
+        resp = FastJSONResponse({"activities": project(activities, ActivityEntry)})
+        set_etag(resp, etag)
+        return resp
     except httpx.HTTPError:
         logger.exception("Upstream error during recent activity")
         raise service_unavailable("Activity temporarily unavailable. Please try again.")
+    except UpstreamUnavailableError:
+        raise
     except Exception:
         logger.exception("Unhandled error during recent activity")
         raise service_unavailable("Activity temporarily unavailable. Please try again.")
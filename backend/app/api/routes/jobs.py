@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.core.auth import AuthenticatedUser, get_current_user
+from app.core.errors import not_found
+from app.schemas.jobs import JobStatusResponse
+from app.services.job_queue import get_job_queue
+
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+def get_job_route(job_id: str, user: AuthenticatedUser = Depends(get_current_user)) -> JobStatusResponse:
+    job = get_job_queue().get(user_id=user.user_id, job_id=job_id)
+    if job is None:
+        raise not_found("Job not found")
+
+    return JobStatusResponse(
+        job_id=job.job_id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        result=job.result,
+        error=job.last_error if job.status == "failed" else None,
+    )
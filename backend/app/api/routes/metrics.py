@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import hmac
+
+from fastapi import APIRouter, Request, Response
+
+from app.core.config import get_settings
+from app.core.errors import not_found, unauthorized
+from app.services.metrics import render_latest
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_route(request: Request) -> Response:
+    """Prometheus scrape endpoint; requires ``Bearer <METRICS_TOKEN>`` and does not exist without that setting."""
+    token = get_settings().metrics_token
+    if not token:
+        raise not_found()
+    supplied = (request.headers.get("authorization") or "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        raise unauthorized()
+
+    # Async on purpose: threadpool gauges are sampled from the event loop.
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import logging
+
+from fastapi import APIRouter, Depends
+import httpx
+
+from app.core.auth import AuthenticatedUser, get_current_user
+from app.core.errors import bad_request, service_unavailable
+from app.core.responses import FastJSONResponse, project
+from app.schemas.documents import DocumentRecord
+from app.schemas.sync import SyncResponse
+from app.services.sync import InvalidSyncTokenError, sync_changes
+from app.services.sync_repo import InvalidSyncResponseError
+
+
+router = APIRouter(tags=["sync"])
+
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/sync", response_model=SyncResponse)
+def sync_route(since: str | None = None, user: AuthenticatedUser = Depends(get_current_user)):
+    """Delta sync for offline clients.
+
+    Call without ``since`` for a full snapshot, then pass the returned
+    ``sync_token`` to receive only items and documents changed or deleted
+    since. A response with ``full=true`` replaces the client's copy.
+    """
+    try:
+        changes = sync_changes(user_id=user.user_id, since_token=since)
+    except InvalidSyncTokenError:
+        raise bad_request("Invalid sync token")
+    except (httpx.HTTPError, InvalidSyncResponseError):
+        logger.exception("Upstream error during /sync")
+        raise service_unavailable("Sync temporarily unavailable. Please try again.")
+
+    changes["documents"] = project(changes["documents"], DocumentRecord)
+    return FastJSONResponse(changes)
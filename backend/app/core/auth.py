@@ -5,11 +5,15 @@ from dataclasses import dataclass
 
 import httpx
 from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt
 
 from app.core.config import get_settings
 from app.core.errors import unauthorized
+from app.services.metrics import observe, record_cache
+from app.services.resilience import supabase_call
+from app.services.single_flight import get_single_flight
 from app.services.supabase_client import get_supabase_admin
 
 
@@ -30,12 +34,15 @@ class JWKSCache:
     async def get(self, jwks_url: str) -> dict:
         now = time.time()
         if self._jwks is not None and self._fetched_at is not None and (now - self._fetched_at) < 3600:
+            record_cache("jwks", hits=1)
             return self._jwks
 
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(jwks_url)
-            resp.raise_for_status()
-            data = resp.json()
+        record_cache("jwks", misses=1)
+        with observe("auth.jwks_fetch"):
+            async with httpx.AsyncClient(timeout=10) as client:
+                resp = await client.get(jwks_url)
+                resp.raise_for_status()
+                data = resp.json()
 
         self._jwks = data
         self._fetched_at = now
@@ -66,6 +73,19 @@ def _select_jwk(*, jwks: dict, token: str) -> dict:
     raise unauthorized("Unknown signing key")
 
 
+def _profile_first_name(user_id: str) -> str | None:
+    resp = supabase_call(
+        lambda: get_supabase_admin().table("profiles").select("first_name").eq("id", user_id).maybe_single().execute(),
+        operation="profile",
+    )
+    data = resp.data if resp is not None and isinstance(resp.data, dict) else None
+    fn = (data or {}).get("first_name")
+    if isinstance(fn, str):
+        fn = fn.strip()
+        return fn if fn else None
+    return None
+
+
 async def get_current_user(
     creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
 ) -> AuthenticatedUser:
@@ -79,13 +99,14 @@ async def get_current_user(
     jwk = _select_jwk(jwks=jwks, token=token)
 
     try:
-        claims = jwt.decode(
-            token,
-            jwk,
-            algorithms=["ES256", "RS256"],
-            audience=settings.supabase_jwt_audience,
-            options={"verify_iss": False},
-        )
+        with observe("auth.verify_token"):
+            claims = jwt.decode(
+                token,
+                jwk,
+                algorithms=["ES256", "RS256"],
+                audience=settings.supabase_jwt_audience,
+                options={"verify_iss": False},
+            )
     except Exception:
         raise unauthorized("Invalid token")
 
@@ -93,16 +114,18 @@ async def get_current_user(
     if not user_id:
         raise unauthorized("Invalid token payload")
 
-    first_name: str | None = None
+    user_id = str(user_id)
     try:
-        supabase = get_supabase_admin()
-        resp = supabase.table("profiles").select("first_name").eq("id", str(user_id)).maybe_single().execute()
-        data = resp.data if isinstance(resp.data, dict) else None
-        fn = (data or {}).get("first_name")
-        if isinstance(fn, str):
-            fn = fn.strip()
-            first_name = fn if fn else None
+        # Every authenticated request needs this; share it across concurrent
+        # requests and keep the blocking client call off the event loop.
+        with observe("auth.profile_lookup"):
+            first_name = await run_in_threadpool(
+                get_single_flight().do,
+                (user_id, "profile"),
+                lambda: _profile_first_name(user_id),
+                ttl=settings.profile_cache_seconds,
+            )
     except Exception:
         first_name = None
 
-    return AuthenticatedUser(user_id=str(user_id), first_name=first_name)
+    return AuthenticatedUser(user_id=user_id, first_name=first_name)
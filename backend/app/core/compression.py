@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import time
+import zlib
+
+from anyio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import COMPRESSION_BYTES, COMPRESSION_SECONDS
+
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+# Chunks bigger than this are compressed off the event loop.
+_OFFLOAD_BYTES = 256 * 1024
+
+
+class _Gzip:
+    name = "gzip"
+
+    def __init__(self, level: int) -> None:
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    name = "br"
+
+    def __init__(self, quality: int) -> None:
+        import brotli
+
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _Zstd:
+    name = "zstd"
+
+    def __init__(self, level: int) -> None:
+        import zstandard
+
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+def _installed(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def _parse_accept_encoding(header: str) -> dict[str, float]:
+    accepted: dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """Negotiated zstd/br/gzip response compression.
+
+    Ordinary responses are compressed once they reach ``minimum_size`` bytes;
+    smaller ones go out untouched. ``text/event-stream`` responses are
+    compressed from the first byte and flushed after every message so
+    events are never held back waiting for more data. brotli and zstd are
+    offered only when their optional packages are installed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self._factories = {"gzip": lambda: _Gzip(gzip_level)}
+        if _installed("brotli"):
+            self._factories["br"] = lambda: _Brotli(brotli_quality)
+        if _installed("zstandard"):
+            self._factories["zstd"] = lambda: _Zstd(zstd_level)
+
+    def _negotiate(self, header: str) -> str | None:
+        accepted = _parse_accept_encoding(header)
+        best, best_q = None, 0.0
+        # Server preference breaks ties between equally weighted encodings.
+        for name in ("zstd", "br", "gzip"):
+            if name not in self._factories:
+                continue
+            q = accepted.get(name, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = name, q
+        return best
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, factory=self._factories[encoding], minimum_size=self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, *, factory, minimum_size: int) -> None:
+        self._send = send
+        self._factory = factory
+        self._minimum_size = minimum_size
+        self._start: Message | None = None
+        self._passthrough = False
+        self._streaming = False
+        self._compressor = None
+        self._buffer = bytearray()
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            await self._on_start(message)
+        elif message["type"] == "http.response.body" and not self._passthrough:
+            await self._on_body(message)
+        else:
+            await self._send(message)
+
+    async def _on_start(self, message: Message) -> None:
+        headers = Headers(raw=message["headers"])
+        content_type = headers.get("content-type", "")
+        if (
+            message["status"] < 200
+            or message["status"] in (204, 304)
+            or "content-encoding" in headers
+            or not content_type.startswith(_COMPRESSIBLE_TYPES)
+        ):
+            self._passthrough = True
+            await self._send(message)
+            return
+
+        self._start = message
+        if content_type.startswith("text/event-stream"):
+            self._streaming = True
+            await self._begin()
+
+    async def _begin(self) -> None:
+        self._compressor = self._factory()
+        headers = MutableHeaders(raw=self._start["headers"])
+        headers["Content-Encoding"] = self._compressor.name
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
+        # The compressed bytes differ from the identity ones, so a strong tag no
+        # longer holds; etag_matches compares weakly, so revalidation still works.
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        await self._send(self._start)
+
+    async def _on_body(self, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressor is None:
+            self._buffer += body
+            if len(self._buffer) < self._minimum_size:
+                if more_body:
+                    return
+                # Too small to be worth it: send the original response.
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": bytes(self._buffer), "more_body": False})
+                return
+            await self._begin()
+            body, self._buffer = bytes(self._buffer), bytearray()
+
+        out = await self._compress(body, final=not more_body)
+        await self._send({"type": "http.response.body", "body": out, "more_body": more_body})
+
+    async def _compress(self, data: bytes, *, final: bool) -> bytes:
+        def run() -> tuple[bytes, float]:
+            start = time.perf_counter()
+            out = self._compressor.compress(data) if data else b""
+            if final:
+                out += self._compressor.finish()
+            elif self._streaming:
+                out += self._compressor.flush()
+            return out, time.perf_counter() - start
+
+        if len(data) > _OFFLOAD_BYTES:
+            out, seconds = await to_thread.run_sync(run)
+        else:
+            out, seconds = run()
+        # Recorded per chunk so long-lived event streams show up before they end.
+        name = self._compressor.name
+        COMPRESSION_SECONDS.labels(encoding=name).inc(seconds)
+        COMPRESSION_BYTES.labels(encoding=name, direction="in").inc(len(data))
+        COMPRESSION_BYTES.labels(encoding=name, direction="out").inc(len(out))
+        return out
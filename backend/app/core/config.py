@@ -30,8 +30,79 @@ class Settings(BaseSettings):
     openai_api_key: str
     openai_model: str = "gpt-5"
     openai_vision_model: str = "gpt-5"
+    openai_embedding_model: str = "text-embedding-3-small"
+    # Must match the vector(...) width in migration 008.
+    embedding_dimensions: int = 256
+    # Shared connection pool for all OpenAI calls.
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry_seconds: float = 30.0
+    openai_http2: bool = True
 
     max_image_mb: int = 10
+    max_document_mb: int = 25
+
+    activity_locale: str = "en"
+    activity_llm_enrichment: bool = False
+    activity_flush_batch_size: int = 100
+    activity_flush_interval_seconds: float = 1.0
+
+    job_queue_path: str = "jobs.sqlite3"
+    job_queue_workers: int = 2
+    # How long a claimed job stays reserved without a renewal; renewed every
+    # third of this while its handler runs, so only a dead process lets it lapse.
+    job_queue_lease_seconds: float = 60.0
+
+    extraction_workers: int = 2
+    extraction_timeout_seconds: float = 20.0
+    extraction_memory_limit_mb: int = 512
+
+    # How long a cached collection version (used for list ETags) is trusted
+    # before re-reading it; bounds staleness across workers.
+    collection_version_ttl_seconds: float = 2.0
+
+    # Upstream resilience: consecutive failures before a circuit opens, how
+    # long it stays open, and the default per-request deadline for upstream work.
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30.0
+    request_deadline_seconds: float = 60.0
+
+    # Admission control for LLM-backed routes: a per-user token bucket plus
+    # per-user and process-wide (or Redis-wide) concurrency caps.
+    llm_rate_per_minute: float = 20.0
+    llm_burst: int = 10
+    llm_user_concurrency: int = 2
+    llm_global_concurrency: int = 32
+    # Share limits across workers via Redis (requires the redis package).
+    rate_limit_redis_url: str | None = None
+
+    # /metrics is served only when this is set, and requires "Authorization: Bearer <token>".
+    metrics_token: str | None = None
+
+    # Span export: "none", "otlp" (OTLP/HTTP to tracing_otlp_endpoint) or
+    # "file" (JSON lines). Needs the optional opentelemetry-sdk package.
+    tracing_exporter: str = "none"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file_path: str = "traces.jsonl"
+    tracing_service_name: str = "ai-inventory-api"
+
+    # Response compression: bodies below the threshold are sent as-is. brotli
+    # and zstd are offered only when the brotli/zstandard packages are installed.
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+
+    # Identical concurrent reads share one upstream call; results are reused for
+    # single_flight_ttl_seconds (writes in this process invalidate them sooner).
+    single_flight_ttl_seconds: float = 2.0
+    search_parse_cache_seconds: float = 300.0
+    profile_cache_seconds: float = 60.0
+
+    # Direct Postgres connection string for the LISTEN/NOTIFY bridge that fans
+    # change events out across workers; unset keeps events in-process.
+    events_database_url: str | None = None
+    events_channel: str = "app_events"
 
     @field_validator("backend_cors_origins", mode="before")
     @classmethod
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+from fastapi import Depends
+
+from app.core.auth import AuthenticatedUser, get_current_user
+from app.core.errors import too_many_requests
+from app.services.rate_limits import LLMLease, RateLimitExceeded, get_llm_limiter, retry_after_header
+
+
+def llm_lease(user: AuthenticatedUser = Depends(get_current_user)) -> Iterator[LLMLease]:
+    """Admit one LLM-backed request for ``user`` or answer 429 with Retry-After.
+
+    The slots are released when the route returns, unless the route
+    ``detach``es the lease to hold it for the life of a streaming response.
+    """
+    try:
+        lease = get_llm_limiter().acquire(user_id=user.user_id)
+    except RateLimitExceeded as e:
+        raise too_many_requests(e.reason, headers=retry_after_header(e.retry_after))
+    try:
+        yield lease
+    finally:
+        if not lease.detached:
+            lease.release()
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> str:
+    # Matches the json.dumps(default=str) fallback used for SSE payloads.
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON rendered with orjson.
+
+    Returning one from a route skips ``response_model`` validation and
+    serialization, so only use it for payloads built from trusted repository
+    rows (shaped with ``project`` where the model would drop keys). The
+    route's ``response_model`` still documents the shape.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def project(rows: list[dict], model: type[BaseModel]) -> list[dict]:
+    """Keep only ``model``'s fields on each row, as validating with ``model`` would, without validating."""
+    fields = tuple(model.model_fields)
+    return [{f: row.get(f) for f in fields} for row in rows if isinstance(row, dict)]
+
+
+def sse_event(payload: dict) -> str:
+    return f"data: {dumps(payload).decode()}\n\n"
@@ -1,16 +1,111 @@
+import asyncio
+from contextlib import asynccontextmanager
+import math
+import time
+
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 
 from app.api.router import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import get_settings
+from app.services.activity_writer import get_activity_writer
+from app.services.events import get_event_bus
+from app.services.extraction_pool import get_extraction_pool
+from app.services.job_queue import get_job_queue
+from app.services.metrics import (
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_SIZE,
+    HTTP_RESPONSE_SIZE,
+    MULTIPROCESS,
+    mark_worker_exited,
+    sample_periodically,
+)
+from app.services.openai_clients import close_openai_clients, get_openai_clients
+from app.services.resilience import UpstreamUnavailableError, deadline
+from app.services.tracing import configure_tracing, shutdown_tracing, span
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    configure_tracing()
+    get_openai_clients()
+    activity_writer = get_activity_writer()
+    await run_in_threadpool(activity_writer.start)
+    jobs = get_job_queue()
+    await jobs.start()
+    events = get_event_bus()
+    await events.start()
+    sampler = asyncio.create_task(sample_periodically(), name="metrics-sampler") if MULTIPROCESS else None
+    try:
+        yield
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+        mark_worker_exited()
+        await events.stop()
+        await jobs.stop()
+        await run_in_threadpool(activity_writer.stop)
+        get_extraction_pool().shutdown()
+        await close_openai_clients()
+        shutdown_tracing()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="AI Inventory API", version="1.0.0")
+    app = FastAPI(title="AI Inventory API", version="1.0.0", lifespan=_lifespan)
 
     settings = get_settings()
 
+    @app.exception_handler(UpstreamUnavailableError)
+    async def _upstream_unavailable(request: Request, exc: UpstreamUnavailableError):
+        headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))} if exc.retry_after else None
+        return JSONResponse({"detail": "Service temporarily unavailable. Please try again."}, status_code=503, headers=headers)
+
+    @app.middleware("http")
+    async def _request_deadline(request: Request, call_next):
+        # Streams run for as long as the client listens; only bound ordinary requests.
+        if "text/event-stream" in (request.headers.get("accept") or "") or (request.query_params.get("stream") or "").lower() in ("1", "true", "yes", "on"):
+            return await call_next(request)
+
+        seconds = settings.request_deadline_seconds
+        try:
+            requested = float(request.headers.get("x-request-timeout") or 0)
+        except ValueError:
+            requested = 0
+        if requested > 0:
+            seconds = min(seconds, requested)
+
+        with deadline(seconds):
+            return await call_next(request)
+
+    @app.middleware("http")
+    async def _record_request_metrics(request: Request, call_next):
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        status_code = 500
+        try:
+            with span(f"HTTP {request.method}", **{"http.method": request.method}) as s:
+                response = await call_next(request)
+                status_code = response.status_code
+                s.set("http.status_code", status_code)
+                s.set("http.route", getattr(request.scope.get("route"), "path", None))
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Label by route template, not raw path, to keep cardinality bounded.
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            method = request.method
+            HTTP_REQUEST_DURATION.labels(method=method, route=route, status=str(status_code)).observe(time.perf_counter() - start)
+            request_size = request.headers.get("content-length")
+            if request_size and request_size.isdigit():
+                HTTP_REQUEST_SIZE.labels(method=method, route=route).observe(int(request_size))
+        response_size = response.headers.get("content-length")
+        if response_size and response_size.isdigit():
+            HTTP_RESPONSE_SIZE.labels(method=method, route=route).observe(int(response_size))
+        return response
+
     @app.middleware("http")
     async def _ensure_cors_headers(request: Request, call_next):
         origin = request.headers.get("origin")
@@ -38,6 +133,15 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Outermost, so every response (including CORS and error responses) is negotiated.
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        zstd_level=settings.compression_zstd_level,
+    )
+
     app.include_router(api_router)
     return app
 
@@ -11,17 +11,35 @@ class DocumentRecord(BaseModel):
     file_type: str | None = None
     size_bytes: int | None = None
     created_at: str | None = None
+    updated_at: str | None = None
+    url: str | None = None
+    thumbnail_urls: dict[str, str] | None = None
 
 
 class UploadDocumentResponse(BaseModel):
     document: DocumentRecord
     activity_summary: str
+    job_ids: list[str] = []
 
 
 class ListDocumentsResponse(BaseModel):
     documents: list[DocumentRecord]
 
 
+class DocumentSearchHit(BaseModel):
+    storage_path: str
+    filename: str | None = None
+    chunk_index: int
+    page_start: int | None = None
+    page_end: int | None = None
+    rank: float
+    snippet: str
+
+
+class DocumentSearchResponse(BaseModel):
+    results: list[DocumentSearchHit]
+
+
 class ActivityEntry(BaseModel):
     activity_id: str
     summary: str
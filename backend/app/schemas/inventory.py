@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic import BaseModel, Field
+from typing_extensions import TypedDict
 
 
 class AddItemRequest(BaseModel):
@@ -9,6 +12,7 @@ class AddItemRequest(BaseModel):
     quantity: int = Field(ge=0)
     location: str
     image_url: str | None = None
+    image_path: str | None = None
     barcode: str | None = None
     purchase_source: str | None = None
     notes: str | None = None
@@ -18,15 +22,53 @@ class AddItemResponse(BaseModel):
     item: dict
 
 
+class ItemRecord(TypedDict, total=False):
+    """An item as listed to clients (``items_repo.ITEM_COLUMNS`` plus resolved URLs).
+
+    List routes return repository rows as-is through ``FastJSONResponse``;
+    this type documents them without a per-row validation pass.
+    """
+
+    item_id: str
+    user_id: str
+    name: str
+    category: str | None
+    subcategory: str | None
+    brand: str | None
+    part_number: str | None
+    tags: list[str] | None
+    confidence: float | None
+    quantity: int
+    location: str | None
+    image_url: str | None
+    image_path: str | None
+    barcode: str | None
+    purchase_source: str | None
+    notes: str | None
+    created_at: str | None
+    updated_at: str | None
+    thumbnail_urls: dict[str, str]
+
+
+class ListItemsResponse(BaseModel):
+    items: list[ItemRecord]
+
+
 class SearchItemsRequest(BaseModel):
     query: str
+    # "semantic" ranks by meaning (embeddings + full-text) and skips the LLM query parse.
+    mode: Literal["keyword", "semantic"] = "keyword"
 
 
 class SearchItemsResponse(BaseModel):
-    items: list[dict]
+    items: list[ItemRecord]
     parsed: dict
 
 
+class ReindexItemsResponse(BaseModel):
+    job_id: str
+
+
 class DeleteItemResponse(BaseModel):
     deleted: bool
 
@@ -34,6 +76,8 @@ class DeleteItemResponse(BaseModel):
 class ExtractFromImageResponse(BaseModel):
     extracted: dict
     image_url: str
+    image_path: str
+    thumbnail_urls: dict[str, str] = {}
 
 
 class ProcessBarcodeRequest(BaseModel):
@@ -51,6 +95,7 @@ class UpdateItemRequest(BaseModel):
     quantity: int | None = Field(default=None, ge=0)
     location: str | None = None
     image_url: str | None = None
+    image_path: str | None = None
     barcode: str | None = None
     purchase_source: str | None = None
     notes: str | None = None
@@ -91,3 +136,16 @@ class BulkCreateRequest(BaseModel):
 class BulkCreateResponse(BaseModel):
     inserted: list[dict]
     failures: list[dict]
+
+
+class InventoryStatsBucket(BaseModel):
+    key: str
+    item_count: int
+    total_quantity: int
+
+
+class InventoryStatsResponse(BaseModel):
+    total_items: int
+    total_quantity: int
+    by_category: list[InventoryStatsBucket]
+    by_location: list[InventoryStatsBucket]
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+from app.schemas.documents import DocumentRecord
+from app.schemas.inventory import ItemRecord
+
+
+class SyncResponse(BaseModel):
+    # True when the client must replace its local copy rather than merge.
+    full: bool
+    items: list[ItemRecord]
+    documents: list[DocumentRecord]
+    deleted_items: list[str]
+    deleted_documents: list[str]
+    sync_token: str
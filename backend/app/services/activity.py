@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import logging
+
+from app.core.config import get_settings
+from app.services.documents_repo import create_activity, update_activity_summary
+from app.services.job_queue import get_job_queue, job_handler
+from app.services.openai_service import summarize_activity
+
+
+logger = logging.getLogger(__name__)
+
+
+# Activity log lines keyed by locale, then by action type. Placeholders are
+# filled from the event details; unknown placeholders render as empty strings.
+ACTIVITY_TEMPLATES: dict[str, dict[str, str]] = {
+    "en": {
+        "search_items": "Searched inventory: {query}",
+        "scan_image": "Scanned image for inventory items ({total_detected} detected)",
+        "bulk_create": "Saved {inserted} scanned items to inventory",
+        "bulk_add": "Added {inserted} items to inventory",
+        "ai_chat": "Used Assist",
+        "upload_document": "Uploaded {filename}",
+    },
+}
+
+DEFAULT_LOCALE = "en"
+
+
+class _Details(dict):
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def render_activity_summary(action: str, details: dict | None = None, *, locale: str | None = None) -> str:
+    locale = locale or get_settings().activity_locale
+    template = (ACTIVITY_TEMPLATES.get(locale) or {}).get(action) or ACTIVITY_TEMPLATES[DEFAULT_LOCALE].get(action)
+    if not template:
+        return action.replace("_", " ").capitalize()
+
+    try:
+        return template.format_map(_Details(details or {})).strip()
+    except (ValueError, IndexError):
+        logger.warning("Bad activity template for action=%s locale=%s", action, locale)
+        return action.replace("_", " ").capitalize()
+
+
+def record_activity(*, user_id: str, action: str, details: dict | None = None, actor_name: str | None = None) -> dict:
+    """Write an activity entry with a templated summary.
+
+    When ``ACTIVITY_LLM_ENRICHMENT`` is enabled, a job later rewrites the
+    summary with the model; the request never waits on it.
+    """
+    details = details or {}
+    activity = create_activity(
+        user_id=user_id,
+        summary=render_activity_summary(action, details),
+        metadata={"type": action, **details},
+        actor_name=actor_name,
+    )
+
+    activity_id = activity.get("activity_id") if isinstance(activity, dict) else None
+    if get_settings().activity_llm_enrichment and activity_id:
+        try:
+            get_job_queue().enqueue(
+                user_id=user_id,
+                kind="enrich_activity",
+                payload={"activity_id": str(activity_id), "action": action, "details": details},
+            )
+        except Exception:
+            logger.exception("Failed to enqueue activity enrichment")
+
+    return activity
+
+
+@job_handler("enrich_activity")
+def _enrich_activity_job(payload: dict) -> dict:
+    summary = summarize_activity(action=payload["action"], details=payload.get("details") or {})
+    if not update_activity_summary(activity_id=payload["activity_id"], summary=summary):
+        raise LookupError("activity row not found")
+    return {"summary": summary}
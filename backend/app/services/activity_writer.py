@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.services.collection_versions import ACTIVITY, mark_changed
+from app.services.events import publish_event
+from app.services.resilience import supabase_call
+from app.services.supabase_client import get_supabase_admin
+
+
+logger = logging.getLogger(__name__)
+
+# PostgREST codes for a column that doesn't exist: Postgres undefined_column on
+# reads, and PostgREST's schema-cache miss on writes.
+_UNDEFINED_COLUMN_CODES = {"42703", "PGRST204"}
+
+
+def _is_undefined_column(exc: BaseException) -> bool:
+    return getattr(exc, "code", None) in _UNDEFINED_COLUMN_CODES
+
+
+class ActivityWriter:
+    """Buffers activity_log rows in memory and writes them as multi-row inserts.
+
+    A background thread flushes whenever ``batch_size`` rows are pending or
+    ``flush_interval`` seconds have passed, and ``stop()`` drains what is left.
+    Whether ``activity_log.actor_name`` exists is detected on start rather than
+    by failing an insert per event; if the probe fails for any other reason
+    (network, open circuit) it stays undetermined and is retried on each flush.
+    """
+
+    def __init__(self, *, batch_size: int = 100, flush_interval: float = 1.0, max_buffer: int = 10_000) -> None:
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_buffer = max_buffer
+        self._buffer: list[dict] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        # None until a probe succeeds or reports the column missing.
+        self.has_actor_name: bool | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.has_actor_name = self._detect_actor_name()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="activity-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, *, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def submit(self, row: dict) -> None:
+        with self._cond:
+            if len(self._buffer) >= self._max_buffer:
+                self._buffer.pop(0)
+                logger.warning("Activity buffer full; dropping oldest entry")
+            self._buffer.append(row)
+            if len(self._buffer) >= self._batch_size:
+                self._cond.notify_all()
+
+    def _detect_actor_name(self) -> bool | None:
+        try:
+            # No retry: an unanswered probe is simply repeated on the next flush.
+            supabase_call(
+                lambda: get_supabase_admin().table("activity_log").select("actor_name").limit(1).execute(),
+                retry=False,
+                operation="activity.probe",
+            )
+            return True
+        except Exception as e:
+            if _is_undefined_column(e):
+                logger.warning("activity_log.actor_name not available; activity rows will be written without it")
+                return False
+            logger.warning("Could not check for activity_log.actor_name; will retry on next flush", exc_info=True)
+            return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self._flush_interval
+                while not self._stopping and len(self._buffer) < self._batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._buffer[: self._batch_size]
+                del self._buffer[: len(batch)]
+                stopping = self._stopping
+                drained = not self._buffer
+
+            if batch:
+                self._write(batch)
+            if stopping and drained:
+                return
+
+    def _insert(self, rows: list[dict]) -> None:
+        supabase = get_supabase_admin()
+        supabase_call(lambda: supabase.table("activity_log").insert(rows).execute())
+
+    def _write(self, batch: list[dict]) -> None:
+        if self.has_actor_name is None:
+            self.has_actor_name = self._detect_actor_name()
+        # Still undetermined: send actor_name and let the insert itself tell.
+        rows = batch if self.has_actor_name is not False else _without_actor_name(batch)
+        try:
+            try:
+                self._insert(rows)
+            except Exception as e:
+                if not (self.has_actor_name is None and _is_undefined_column(e)):
+                    raise
+                logger.warning("activity_log.actor_name not available; activity rows will be written without it")
+                self.has_actor_name = False
+                rows = _without_actor_name(batch)
+                self._insert(rows)
+        except Exception:
+            logger.exception("Dropping %s activity rows after failed insert", len(rows))
+            return
+
+        for user_id in {str(r["user_id"]) for r in rows if r.get("user_id")}:
+            mark_changed(user_id=user_id, collection=ACTIVITY)
+        for r in rows:
+            if r.get("user_id"):
+                publish_event(user_id=str(r["user_id"]), type="activity.created", activity=r)
+
+
+def _without_actor_name(rows: list[dict]) -> list[dict]:
+    return [{k: v for k, v in r.items() if k != "actor_name"} for r in rows]
+
+
+@lru_cache
+def get_activity_writer() -> ActivityWriter:
+    settings = get_settings()
+    return ActivityWriter(
+        batch_size=settings.activity_flush_batch_size,
+        flush_interval=settings.activity_flush_interval_seconds,
+    )
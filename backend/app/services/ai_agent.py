@@ -7,39 +7,43 @@ from collections.abc import Iterator
 from openai import OpenAI
 
 from app.core.config import get_settings
-from app.services.documents_repo import create_activity, list_recent_activity
+from app.core.responses import sse_event
+from app.services.activity import record_activity
+from app.services.documents_repo import list_recent_activity
 from app.services.documents_repo import get_ai_access_granted, grant_ai_access, list_documents
-from app.services.items_repo import add_item, bulk_create_items, delete_item, search_items_basic, update_item
+from app.services.items_repo import add_item, bulk_create_items, delete_item, get_inventory_stats, search_items_basic, update_item
+from app.services.embeddings import hybrid_search_documents, hybrid_search_items
 from app.services.supabase_client import get_supabase_admin
-from app.services.document_text_extractor import extract_text_from_upload
+from app.services.extraction_pool import ExtractionTimeoutError, get_extraction_pool
+from app.services.openai_clients import get_openai_clients
+from app.services.metrics import record_openai_usage
+from app.services.resilience import openai_call, supabase_call
+from app.services.tracing import Span, Timeline, traced
 
 
 logger = logging.getLogger(__name__)
 
+# Character budget for document text handed to the model per read_document_text call.
+DOCUMENT_TEXT_MAX_CHARS = 12_000
 
-def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None = None) -> Iterator[str]:
-    def _evt(payload: dict) -> str:
-        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
-
-    yield _evt({"type": "status", "message": "Checking your inventory…"})
-    yield _evt({"type": "status", "message": "Looking for similar items…"})
-    yield _evt({"type": "status", "message": "Thinking…"})
 
-    settings = get_settings()
-    client = _client()
+def _inventory_stats_or_none(*, user_id: str) -> dict | None:
+    try:
+        return get_inventory_stats(user_id=user_id)
+    except Exception:
+        logger.exception("Failed to load inventory stats for agent context")
+        return None
 
-    items = search_items_basic(user_id=user_id, q="")
-    docs = list_documents(user_id=user_id, limit=50)
-    activity = list_recent_activity(user_id=user_id, limit=25)
 
-    documents_for_ai: list[dict] = []
+def _documents_for_ai(docs: object) -> list[dict]:
+    out: list[dict] = []
     for d in docs if isinstance(docs, list) else []:
         if not isinstance(d, dict):
             continue
         filename = (d.get("filename") or "").strip() or "Untitled"
         storage_path = (d.get("storage_path") or "").strip()
         granted = bool(d.get("ai_access_granted"))
-        documents_for_ai.append(
+        out.append(
             {
                 "name": filename,
                 "filename": filename,
@@ -50,25 +54,92 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
                 "size_bytes": d.get("size_bytes"),
             }
         )
+    return out
 
-    greet_name = (first_name or "").strip() or None
-    should_greet = False
-    if greet_name:
-        try:
-            has_ai_chat = any((a.get("metadata") or {}).get("type") == "ai_chat" for a in activity if isinstance(a, dict))
-            should_greet = not has_ai_chat
-        except Exception:
-            should_greet = True
 
+def _context_json(*, items: list[dict], stats: dict | None, docs: object, activity: list[dict]) -> str:
+    """Serialize the per-user context the model is grounded in (the USER_CONTEXT_JSON system message)."""
     context = {
         "inventory_items": items,
-        "documents": documents_for_ai,
+        "inventory_stats": stats,
+        "documents": _documents_for_ai(docs),
         "recent_activity": activity,
         "notes": {
+            "inventory_stats": "inventory_stats holds exact item counts and quantity totals overall, per category and per location. Use it for counting questions instead of tallying inventory_items.",
             "documents_text": "Document contents are NOT available unless the user grants AI access for that document. You must request permission first.",
             "documents_naming": "When you refer to a document, ALWAYS use its human-readable name/filename (field: name/filename). Never refer to documents as IDs. When asking permission, say: 'Do you want me to check <DOCUMENT_NAME>?'",
         },
     }
+    return json.dumps(context, ensure_ascii=False)
+
+
+def _normalize_new_items(items_in: object) -> list[dict]:
+    """Fill defaults on ``add_inventory_items`` tool arguments; entries without a name are dropped."""
+    normalized: list[dict] = []
+    for it in items_in if isinstance(items_in, list) else []:
+        if not isinstance(it, dict):
+            continue
+
+        name = (it.get("name") or "").strip()
+        if not name:
+            continue
+
+        category = (it.get("category") or "").strip() or "Unsorted"
+        location = (it.get("location") or "").strip() or "Unsorted"
+        quantity = it.get("quantity")
+        if quantity is None:
+            quantity = 1
+
+        normalized.append(
+            {
+                **it,
+                "name": name,
+                "category": category,
+                "location": location,
+                "quantity": quantity,
+            }
+        )
+    return normalized
+
+
+def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None = None) -> Iterator[str]:
+    # Stage timings are traced and also sent to the client as a "timing" event before "done".
+    timeline = Timeline("ai_command")
+    events = _ai_command_events(timeline=timeline, user_id=user_id, message=message, first_name=first_name)
+    try:
+        yield from timeline.run(events)
+    except Exception:
+        # Report how far the request got before the stream fails.
+        yield sse_event(timeline.finish())
+        raise
+
+
+def _ai_command_events(*, timeline: Timeline, user_id: str, message: str, first_name: str | None) -> Iterator[str]:
+    _evt = sse_event
+
+    yield _evt({"type": "status", "message": "Checking your inventory…"})
+    yield _evt({"type": "status", "message": "Looking for similar items…"})
+    yield _evt({"type": "status", "message": "Thinking…"})
+
+    settings = get_settings()
+    client = _client()
+
+    timeline.begin("context")
+    items = search_items_basic(user_id=user_id, q="")
+    stats = _inventory_stats_or_none(user_id=user_id)
+    docs = list_documents(user_id=user_id, limit=50)
+    activity = list_recent_activity(user_id=user_id, limit=25)
+
+    greet_name = (first_name or "").strip() or None
+    should_greet = False
+    if greet_name:
+        try:
+            has_ai_chat = any((a.get("metadata") or {}).get("type") == "ai_chat" for a in activity if isinstance(a, dict))
+            should_greet = not has_ai_chat
+        except Exception:
+            should_greet = True
+
+    context_json = _context_json(items=items, stats=stats, docs=docs, activity=activity)
 
     tools = [
         {
@@ -129,7 +200,7 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
             "type": "function",
             "function": {
                 "name": "search_inventory",
-                "description": "Search the current user's inventory.",
+                "description": "Search the current user's inventory by meaning and keywords; results are ranked by relevance.",
                 "parameters": {
                     "type": "object",
                     "properties": {
@@ -215,15 +286,32 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
                 },
             },
         },
+        {
+            "type": "function",
+            "function": {
+                "name": "search_documents",
+                "description": "Full-text search across the contents of documents the user has granted AI access to. Returns ranked passages with document name and page range.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string"},
+                    },
+                    "required": ["query"],
+                    "additionalProperties": False,
+                },
+            },
+        },
         {
             "type": "function",
             "function": {
                 "name": "read_document_text",
-                "description": "Read and extract text from a document in the 'documents' storage bucket by storage_path, only if ai_access_granted is true.",
+                "description": "Read and extract text from a document in the 'documents' storage bucket by storage_path, only if ai_access_granted is true. Optionally limit to a 1-based inclusive page range; if the result is truncated, read the following pages.",
                 "parameters": {
                     "type": "object",
                     "properties": {
                         "storage_path": {"type": "string"},
+                        "page_start": {"type": ["integer", "null"]},
+                        "page_end": {"type": ["integer", "null"]},
                     },
                     "required": ["storage_path"],
                     "additionalProperties": False,
@@ -245,7 +333,7 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
                 "Do not ask clarifying questions unless absolutely required to proceed. If ambiguity exists (e.g., multiple matches), pick the most recent / most common match based on USER_CONTEXT_JSON (inventory_items + recent_activity) and proceed. "
                 "Inventory questions: answer in two short sections: 'You already have' and 'You're missing'. Do not list everything the user owns. Do not include IDs or internal metadata. "
                 "Never mention other users or data. "
-                "When asked about documents, you only know filenames/metadata (no PDF text). "
+                "When asked about documents, you only know filenames/metadata (no PDF text) unless AI access is granted; for granted documents, use search_documents to find the relevant passage before reading a whole document. "
                 "When referencing a document, ALWAYS use its name/filename from USER_CONTEXT_JSON.documents (e.g., 'Your Makita Drill Manual…'). "
                 "When requesting permission to read a document, explicitly name it (e.g., 'Do you want me to check the warranty in Water Heater Manual?'). "
                 "Do not read or extract document text unless the user has explicitly granted AI access for that document. "
@@ -254,7 +342,7 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
                 "If missing required fields for add, infer reasonable defaults (quantity=1, location='Unsorted', category='Unsorted') and proceed."
             ),
         },
-        {"role": "system", "content": f"USER_CONTEXT_JSON:\n{json.dumps(context, ensure_ascii=False)}"},
+        {"role": "system", "content": f"USER_CONTEXT_JSON:\n{context_json}"},
         {"role": "user", "content": message},
     ]
 
@@ -262,14 +350,20 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
     assistant_content = ""
     streamed_prefix1 = False
     tool_calls_acc: dict[int, dict] = {}
-    stream1 = client.chat.completions.create(
-        model=settings.openai_model,
-        messages=messages,
-        tools=tools,
-        tool_choice="auto",
-        stream=True,
+    stage = timeline.begin("model_first")
+    stream1 = openai_call(
+        lambda: client.chat.completions.create(
+            model=settings.openai_model,
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+            stream=True,
+            stream_options={"include_usage": True},
+        ),
+        operation="chat",
     )
     for chunk in stream1:
+        _record_stream_usage(chunk, stage)
         try:
             choice = chunk.choices[0]
         except Exception:
@@ -316,15 +410,16 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
             final_msg = f"Hi {greet_name} — {final_msg.lstrip()}"
 
         try:
-            create_activity(
+            record_activity(
                 user_id=user_id,
-                summary="Used Assist",
-                metadata={"type": "ai_chat", "tool": None, "message": message},
+                action="ai_chat",
+                details={"tool": None, "message": message},
                 actor_name=first_name,
             )
         except Exception:
             logger.exception("Failed to write ai_chat activity")
 
+        yield _evt(timeline.finish())
         yield _evt({"type": "done", "tool": None, "result": None, "assistant_message": final_msg})
         return
 
@@ -336,39 +431,14 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
     except Exception:
         args = {}
 
+    timeline.begin("tool", tool=tool_name)
     # Execute tool call identically to run_ai_command.
     result: dict | list | None
     if tool_name == "add_inventory_item":
         created = add_item(user_id=user_id, item=args)
         result = created
     elif tool_name == "add_inventory_items":
-        items_in = args.get("items")
-        items_list = items_in if isinstance(items_in, list) else []
-
-        normalized: list[dict] = []
-        for idx, it in enumerate(items_list):
-            if not isinstance(it, dict):
-                continue
-
-            name = (it.get("name") or "").strip()
-            if not name:
-                continue
-
-            category = (it.get("category") or "").strip() or "Unsorted"
-            location = (it.get("location") or "").strip() or "Unsorted"
-            quantity = it.get("quantity")
-            if quantity is None:
-                quantity = 1
-
-            normalized.append(
-                {
-                    **it,
-                    "name": name,
-                    "category": category,
-                    "location": location,
-                    "quantity": quantity,
-                }
-            )
+        normalized = _normalize_new_items(args.get("items"))
 
         inserted: list[dict] = []
         failures: list[dict] = []
@@ -389,10 +459,10 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
                     failures.append({"index": idx, "reason": "insert failed"})
 
         try:
-            create_activity(
+            record_activity(
                 user_id=user_id,
-                summary=f"Added {len(inserted)} items to inventory",
-                metadata={"type": "bulk_add", "inserted": len(inserted), "failures": len(failures)},
+                action="bulk_add",
+                details={"inserted": len(inserted), "failures": len(failures)},
                 actor_name=first_name,
             )
         except Exception:
@@ -400,7 +470,7 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
 
         result = {"inserted": inserted, "failures": failures}
     elif tool_name == "search_inventory":
-        items2 = search_items_basic(user_id=user_id, q=str(args.get("query") or ""))
+        items2 = hybrid_search_items(user_id=user_id, q=str(args.get("query") or ""))
         result = items2
     elif tool_name == "update_inventory_items":
         q2 = str(args.get("query") or "").strip()
@@ -448,6 +518,17 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
         else:
             ok = grant_ai_access(user_id=user_id, storage_path=storage_path)
             result = {"ok": bool(ok)}
+    elif tool_name == "search_documents":
+        q2 = str(args.get("query") or "").strip()
+        if not q2:
+            result = {"ok": False, "error": "missing_query"}
+        else:
+            try:
+                hits = hybrid_search_documents(user_id=user_id, query=q2, limit=8, require_ai_access=True)
+                result = {"ok": True, "results": hits}
+            except Exception:
+                logger.exception("Failed to search documents")
+                result = {"ok": False, "error": "search_failed"}
     elif tool_name == "read_document_text":
         storage_path = str(args.get("storage_path") or "").strip()
         if not storage_path:
@@ -457,12 +538,23 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
         else:
             try:
                 supabase = get_supabase_admin()
-                raw = supabase.storage.from_("documents").download(storage_path)
-                text, _truncated = extract_text_from_upload(filename=storage_path, mime_type=None, content=raw)
-                if not text:
-                    result = {"ok": True, "text": ""}
-                else:
-                    result = {"ok": True, "text": text[:12000]}
+                raw = supabase_call(
+                    lambda: supabase.storage.from_("documents").download(storage_path), operation="storage.download"
+                )
+                page_start = args.get("page_start")
+                page_end = args.get("page_end")
+                text, truncated = get_extraction_pool().extract(
+                    filename=storage_path,
+                    mime_type=None,
+                    content=raw,
+                    max_chars=DOCUMENT_TEXT_MAX_CHARS,
+                    page_start=page_start - 1 if isinstance(page_start, int) and page_start > 0 else 0,
+                    page_end=page_end if isinstance(page_end, int) and page_end > 0 else None,
+                )
+                result = {"ok": True, "text": text or "", "truncated": truncated}
+            except ExtractionTimeoutError:
+                logger.warning("Document text extraction timed out: %s", storage_path)
+                result = {"ok": False, "error": "read_timeout"}
             except Exception:
                 logger.exception("Failed to read document text")
                 result = {"ok": False, "error": "read_failed"}
@@ -494,16 +586,22 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
         }
     )
 
+    stage = timeline.begin("model_final")
     final_msg = ""
     if should_greet and greet_name:
         final_msg = f"Hi {greet_name} — "
         yield _evt({"type": "delta", "delta": final_msg})
-    stream2 = client.chat.completions.create(
-        model=settings.openai_model,
-        messages=messages,
-        stream=True,
+    stream2 = openai_call(
+        lambda: client.chat.completions.create(
+            model=settings.openai_model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+        ),
+        operation="chat",
     )
     for chunk in stream2:
+        _record_stream_usage(chunk, stage)
         try:
             choice = chunk.choices[0]
         except Exception:
@@ -519,50 +617,43 @@ def iter_ai_command_sse(*, user_id: str, message: str, first_name: str | None =
             yield _evt({"type": "delta", "delta": content})
 
     try:
-        create_activity(
+        record_activity(
             user_id=user_id,
-            summary="Used Assist",
-            metadata={"type": "ai_chat", "tool": tool_name, "message": message},
+            action="ai_chat",
+            details={"tool": tool_name, "message": message},
             actor_name=first_name,
         )
     except Exception:
         logger.exception("Failed to write ai_chat activity")
 
+    yield _evt(timeline.finish())
     yield _evt({"type": "done", "tool": tool_name, "result": result, "assistant_message": final_msg})
 
 
+def _record_stream_usage(chunk, stage: Span) -> None:
+    # Only the final chunk of a stream opened with include_usage carries usage.
+    usage = getattr(chunk, "usage", None)
+    if usage is None:
+        return
+    record_openai_usage(operation="chat", model=getattr(chunk, "model", None), usage=usage)
+    stage.set("prompt_tokens", usage.prompt_tokens)
+    stage.set("completion_tokens", usage.completion_tokens)
+
+
 def _client() -> OpenAI:
-    settings = get_settings()
-    return OpenAI(api_key=settings.openai_api_key)
+    return get_openai_clients().for_operation("chat")
 
 
+@traced("ai_command")
 def run_ai_command(*, user_id: str, message: str, first_name: str | None = None) -> dict:
     settings = get_settings()
     client = _client()
 
     items = search_items_basic(user_id=user_id, q="")
+    stats = _inventory_stats_or_none(user_id=user_id)
     docs = list_documents(user_id=user_id, limit=50)
     activity = list_recent_activity(user_id=user_id, limit=25)
 
-    documents_for_ai: list[dict] = []
-    for d in docs if isinstance(docs, list) else []:
-        if not isinstance(d, dict):
-            continue
-        filename = (d.get("filename") or "").strip() or "Untitled"
-        storage_path = (d.get("storage_path") or "").strip()
-        granted = bool(d.get("ai_access_granted"))
-        documents_for_ai.append(
-            {
-                "name": filename,
-                "filename": filename,
-                "storage_path": storage_path,
-                "ai_access_granted": granted,
-                "mime_type": d.get("mime_type"),
-                "created_at": d.get("created_at"),
-                "size_bytes": d.get("size_bytes"),
-            }
-        )
-
     greet_name = (first_name or "").strip() or None
     should_greet = False
     if greet_name:
@@ -572,15 +663,7 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
         except Exception:
             should_greet = True
 
-    context = {
-        "inventory_items": items,
-        "documents": documents_for_ai,
-        "recent_activity": activity,
-        "notes": {
-            "documents_text": "Document contents are NOT available unless the user grants AI access for that document. You must request permission first.",
-            "documents_naming": "When you refer to a document, ALWAYS use its human-readable name/filename (field: name/filename). Never refer to documents as IDs. When asking permission, say: 'Do you want me to check <DOCUMENT_NAME>?'",
-        },
-    }
+    context_json = _context_json(items=items, stats=stats, docs=docs, activity=activity)
 
     tools = [
         {
@@ -641,7 +724,7 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
             "type": "function",
             "function": {
                 "name": "search_inventory",
-                "description": "Search the current user's inventory.",
+                "description": "Search the current user's inventory by meaning and keywords; results are ranked by relevance.",
                 "parameters": {
                     "type": "object",
                     "properties": {
@@ -727,15 +810,32 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
                 },
             },
         },
+        {
+            "type": "function",
+            "function": {
+                "name": "search_documents",
+                "description": "Full-text search across the contents of documents the user has granted AI access to. Returns ranked passages with document name and page range.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string"},
+                    },
+                    "required": ["query"],
+                    "additionalProperties": False,
+                },
+            },
+        },
         {
             "type": "function",
             "function": {
                 "name": "read_document_text",
-                "description": "Read and extract text from a document in the 'documents' storage bucket by storage_path, only if ai_access_granted is true.",
+                "description": "Read and extract text from a document in the 'documents' storage bucket by storage_path, only if ai_access_granted is true. Optionally limit to a 1-based inclusive page range; if the result is truncated, read the following pages.",
                 "parameters": {
                     "type": "object",
                     "properties": {
                         "storage_path": {"type": "string"},
+                        "page_start": {"type": ["integer", "null"]},
+                        "page_end": {"type": ["integer", "null"]},
                     },
                     "required": ["storage_path"],
                     "additionalProperties": False,
@@ -757,7 +857,7 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
                 "Do not ask clarifying questions unless absolutely required to proceed. If ambiguity exists (e.g., multiple matches), pick the most recent / most common match based on USER_CONTEXT_JSON (inventory_items + recent_activity) and proceed. "
                 "Inventory questions: answer in two short sections: 'You already have' and 'You're missing'. Do not list everything the user owns. Do not include IDs or internal metadata. "
                 "Never mention other users or data. "
-                "When asked about documents, you only know filenames/metadata (no PDF text). "
+                "When asked about documents, you only know filenames/metadata (no PDF text) unless AI access is granted; for granted documents, use search_documents to find the relevant passage before reading a whole document. "
                 "When referencing a document, ALWAYS use its name/filename from USER_CONTEXT_JSON.documents (e.g., 'Your Makita Drill Manual…'). "
                 "When requesting permission to read a document, explicitly name it (e.g., 'Do you want me to check the warranty in Water Heater Manual?'). "
                 "Do not read or extract document text unless the user has explicitly granted AI access for that document. "
@@ -766,16 +866,19 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
                 "If missing required fields for add, infer reasonable defaults (quantity=1, location='Unsorted', category='Unsorted') and proceed."
             ),
         },
-        {"role": "system", "content": f"USER_CONTEXT_JSON:\n{json.dumps(context, ensure_ascii=False)}"},
+        {"role": "system", "content": f"USER_CONTEXT_JSON:\n{context_json}"},
         {"role": "user", "content": message},
     ]
 
     try:
-        first = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto",
+        first = openai_call(
+            lambda: client.chat.completions.create(
+                model=settings.openai_model,
+                messages=messages,
+                tools=tools,
+                tool_choice="auto",
+            ),
+            operation="chat",
         )
     except Exception:
         logger.exception("OpenAI ai_command initial call failed")
@@ -803,33 +906,7 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
         created = add_item(user_id=user_id, item=args)
         result = created
     elif tool_name == "add_inventory_items":
-        items_in = args.get("items")
-        items_list = items_in if isinstance(items_in, list) else []
-
-        normalized: list[dict] = []
-        for idx, it in enumerate(items_list):
-            if not isinstance(it, dict):
-                continue
-
-            name = (it.get("name") or "").strip()
-            if not name:
-                continue
-
-            category = (it.get("category") or "").strip() or "Unsorted"
-            location = (it.get("location") or "").strip() or "Unsorted"
-            quantity = it.get("quantity")
-            if quantity is None:
-                quantity = 1
-
-            normalized.append(
-                {
-                    **it,
-                    "name": name,
-                    "category": category,
-                    "location": location,
-                    "quantity": quantity,
-                }
-            )
+        normalized = _normalize_new_items(args.get("items"))
 
         inserted: list[dict] = []
         failures: list[dict] = []
@@ -850,10 +927,10 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
                     failures.append({"index": idx, "reason": "insert failed"})
 
         try:
-            create_activity(
+            record_activity(
                 user_id=user_id,
-                summary=f"Added {len(inserted)} items to inventory",
-                metadata={"type": "bulk_add", "inserted": len(inserted), "failures": len(failures)},
+                action="bulk_add",
+                details={"inserted": len(inserted), "failures": len(failures)},
                 actor_name=first_name,
             )
         except Exception:
@@ -861,7 +938,7 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
 
         result = {"inserted": inserted, "failures": failures}
     elif tool_name == "search_inventory":
-        items = search_items_basic(user_id=user_id, q=str(args.get("query") or ""))
+        items = hybrid_search_items(user_id=user_id, q=str(args.get("query") or ""))
         result = items
     elif tool_name == "update_inventory_items":
         q = str(args.get("query") or "").strip()
@@ -909,6 +986,17 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
         else:
             ok = grant_ai_access(user_id=user_id, storage_path=storage_path)
             result = {"ok": bool(ok)}
+    elif tool_name == "search_documents":
+        q2 = str(args.get("query") or "").strip()
+        if not q2:
+            result = {"ok": False, "error": "missing_query"}
+        else:
+            try:
+                hits = hybrid_search_documents(user_id=user_id, query=q2, limit=8, require_ai_access=True)
+                result = {"ok": True, "results": hits}
+            except Exception:
+                logger.exception("Failed to search documents")
+                result = {"ok": False, "error": "search_failed"}
     elif tool_name == "read_document_text":
         storage_path = str(args.get("storage_path") or "").strip()
         if not storage_path:
@@ -918,12 +1006,23 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
         else:
             try:
                 supabase = get_supabase_admin()
-                raw = supabase.storage.from_("documents").download(storage_path)
-                text, _truncated = extract_text_from_upload(filename=storage_path, mime_type=None, content=raw)
-                if not text:
-                    result = {"ok": True, "text": ""}
-                else:
-                    result = {"ok": True, "text": text[:12000]}
+                raw = supabase_call(
+                    lambda: supabase.storage.from_("documents").download(storage_path), operation="storage.download"
+                )
+                page_start = args.get("page_start")
+                page_end = args.get("page_end")
+                text, truncated = get_extraction_pool().extract(
+                    filename=storage_path,
+                    mime_type=None,
+                    content=raw,
+                    max_chars=DOCUMENT_TEXT_MAX_CHARS,
+                    page_start=page_start - 1 if isinstance(page_start, int) and page_start > 0 else 0,
+                    page_end=page_end if isinstance(page_end, int) and page_end > 0 else None,
+                )
+                result = {"ok": True, "text": text or "", "truncated": truncated}
+            except ExtractionTimeoutError:
+                logger.warning("Document text extraction timed out: %s", storage_path)
+                result = {"ok": False, "error": "read_timeout"}
             except Exception:
                 logger.exception("Failed to read document text")
                 result = {"ok": False, "error": "read_failed"}
@@ -955,9 +1054,12 @@ def run_ai_command(*, user_id: str, message: str, first_name: str | None = None)
     )
 
     try:
-        final = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=messages,
+        final = openai_call(
+            lambda: client.chat.completions.create(
+                model=settings.openai_model,
+                messages=messages,
+            ),
+            operation="chat",
         )
     except Exception:
         logger.exception("OpenAI ai_command final call failed")
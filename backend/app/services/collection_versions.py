@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.services.metrics import record_cache
+from app.services.resilience import supabase_call
+from app.services.single_flight import get_single_flight
+from app.services.supabase_client import get_supabase_admin
+
+
+logger = logging.getLogger(__name__)
+
+
+ITEMS = "items"
+DOCUMENTS = "documents"
+ACTIVITY = "activity"
+
+
+class CollectionVersions:
+    """Per-user collection version counters used to build list ETags.
+
+    The counters live in ``user_collection_versions`` and are bumped by
+    triggers, so every writer (this process, other workers, SQL) is covered.
+    Reads are cached for ``ttl_seconds``; repository write functions call
+    ``mark_changed`` so this process never serves a stale version after its
+    own writes, and other workers converge within the TTL.
+    """
+
+    def __init__(self, *, ttl_seconds: float = 2.0, max_entries: int = 10_000) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], tuple[int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, *, user_id: str, collection: str) -> int | None:
+        """Current version, or None if it can't be determined (callers then skip ETags)."""
+        key = (user_id, collection)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                record_cache("collection_versions", hits=1)
+                return entry[0]
+        record_cache("collection_versions", misses=1)
+
+        try:
+            resp = supabase_call(
+                lambda: get_supabase_admin()
+                .table("user_collection_versions")
+                .select("version")
+                .eq("user_id", user_id)
+                .eq("collection", collection)
+                .limit(1)
+                .execute(),
+                retry=False,
+            )
+        except Exception:
+            logger.warning("Failed to read collection version: collection=%s", collection, exc_info=True)
+            return None
+
+        rows = resp.data or []
+        version = int(rows[0].get("version") or 0) if rows else 0
+        with self._lock:
+            self._entries[key] = (version, now + self._ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return version
+
+    def mark_changed(self, *, user_id: str, collection: str) -> None:
+        with self._lock:
+            self._entries.pop((user_id, collection), None)
+
+
+@lru_cache
+def get_collection_versions() -> CollectionVersions:
+    return CollectionVersions(ttl_seconds=get_settings().collection_version_ttl_seconds)
+
+
+def mark_changed(*, user_id: str, collection: str) -> None:
+    get_collection_versions().mark_changed(user_id=user_id, collection=collection)
+    get_single_flight().invalidate(user_id=user_id, scope=collection)
+
+
+def collection_etag(*, user_id: str, collection: str, variant: tuple = ()) -> str | None:
+    """Weak ETag for one user's view of ``collection``; ``variant`` covers query params and the like."""
+    version = get_collection_versions().get(user_id=user_id, collection=collection)
+    if version is None:
+        return None
+    raw = "|".join(str(p) for p in (user_id, collection, version, *variant))
+    return f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
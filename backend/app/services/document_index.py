@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import logging
+
+from app.services.documents_repo import replace_document_chunks
+from app.services.embeddings import embed_texts
+from app.services.extraction_pool import get_extraction_pool
+from app.services.resilience import supabase_call
+from app.services.supabase_client import get_supabase_admin
+
+
+logger = logging.getLogger(__name__)
+
+
+# Target chunk size for indexed passages; small enough that a ranked hit is a
+# readable passage, large enough to keep related sentences together.
+CHUNK_CHARS = 1_500
+# Upper bound on indexed text per document.
+INDEX_MAX_CHARS = 500_000
+
+
+def _split_long(text: str, limit: int) -> list[str]:
+    pieces: list[str] = []
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit)
+        if cut <= limit // 2:
+            cut = limit
+        pieces.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def chunk_pages(pages: list[tuple[int, str]], *, chunk_chars: int = CHUNK_CHARS) -> list[dict]:
+    """Group page texts into passages of roughly ``chunk_chars``, keeping 1-based page ranges."""
+    chunks: list[dict] = []
+    current: list[str] = []
+    size = 0
+    first_page = last_page = 0
+
+    def _emit() -> None:
+        chunks.append(
+            {
+                "chunk_index": len(chunks),
+                "page_start": first_page + 1,
+                "page_end": last_page + 1,
+                "content": "\n\n".join(current),
+            }
+        )
+
+    for page_idx, text in pages:
+        for paragraph in text.split("\n\n"):
+            for piece in _split_long(paragraph.strip(), chunk_chars):
+                if current and size + len(piece) > chunk_chars:
+                    _emit()
+                    current, size = [], 0
+                if not current:
+                    first_page = page_idx
+                current.append(piece)
+                size += len(piece) + 2
+                last_page = page_idx
+
+    if current:
+        _emit()
+    return chunks
+
+
+def index_document(*, user_id: str, storage_path: str, filename: str | None, mime_type: str | None) -> int:
+    """(Re)build the searchable chunks for one document; returns the number of chunks stored."""
+    raw = supabase_call(
+        lambda: get_supabase_admin().storage.from_("documents").download(storage_path), operation="storage.download"
+    )
+    pages = get_extraction_pool().extract_pages(
+        filename=filename or storage_path,
+        mime_type=mime_type,
+        content=raw,
+        max_chars=INDEX_MAX_CHARS,
+    )
+    chunks = chunk_pages(pages)
+    if chunks:
+        try:
+            vectors = embed_texts([c["content"] for c in chunks])
+            chunks = [{**c, "embedding": v} for c, v in zip(chunks, vectors)]
+        except Exception:
+            logger.exception("Chunk embedding failed; indexing for full-text search only")
+    replace_document_chunks(user_id=user_id, storage_path=storage_path, chunks=chunks)
+    return len(chunks)
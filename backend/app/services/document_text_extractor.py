@@ -1,48 +1,116 @@
 from __future__ import annotations
 
 import re
+from collections.abc import Iterator
 from io import BytesIO
 
 
+_INLINE_WS_RE = re.compile(r"[ \t\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
 def _clean_text(text: str) -> str:
     text = text.replace("\x00", " ")
-    text = re.sub(r"[ \t\f\v]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _INLINE_WS_RE.sub(" ", text)
+    text = _BLANK_LINES_RE.sub("\n\n", text)
     return text.strip()
 
 
-def extract_text_from_pdf(*, pdf_bytes: bytes, max_chars: int = 200_000) -> tuple[str, bool]:
+def iter_pdf_pages(*, pdf_bytes: bytes, page_start: int = 0, page_end: int | None = None) -> Iterator[tuple[int, str]]:
+    """Yield ``(page_index, cleaned_text)`` for each non-empty page in ``[page_start, page_end)``.
+
+    Pages are parsed lazily, so a consumer that stops iterating early never
+    pays for the remaining pages.
+    """
     from pypdf import PdfReader
 
     reader = PdfReader(BytesIO(pdf_bytes))
-    parts: list[str] = []
-    for page in reader.pages:
+    total = len(reader.pages)
+    end = total if page_end is None else min(page_end, total)
+
+    for idx in range(max(page_start, 0), end):
         try:
-            t = page.extract_text() or ""
+            t = reader.pages[idx].extract_text() or ""
         except Exception:
             t = ""
+        t = _clean_text(t)
         if t:
-            parts.append(t)
-        if sum(len(p) for p in parts) >= max_chars:
+            yield idx, t
+
+
+def extract_text_from_pdf(
+    *,
+    pdf_bytes: bytes,
+    max_chars: int = 200_000,
+    page_start: int = 0,
+    page_end: int | None = None,
+) -> tuple[str, bool]:
+    parts: list[str] = []
+    total = 0
+    truncated = False
+
+    for _idx, text in iter_pdf_pages(pdf_bytes=pdf_bytes, page_start=page_start, page_end=page_end):
+        sep = 2 if parts else 0
+        if total + sep + len(text) > max_chars:
+            remaining = max_chars - total - sep
+            if remaining > 0:
+                parts.append(text[:remaining])
+            truncated = True
             break
+        parts.append(text)
+        total += sep + len(text)
+
+    return "\n\n".join(parts), truncated
 
-    raw = "\n\n".join(parts)
-    cleaned = _clean_text(raw)
 
-    truncated = len(cleaned) > max_chars
-    if truncated:
-        cleaned = cleaned[:max_chars]
+def extract_pages_from_upload(
+    *,
+    filename: str,
+    mime_type: str | None,
+    content: bytes,
+    max_chars: int = 500_000,
+) -> list[tuple[int, str]]:
+    """Return ``(page_index, cleaned_text)`` pairs up to ``max_chars`` in total; plain text is one page."""
+    mime = (mime_type or "").lower().strip()
+    name = (filename or "").lower()
+
+    if mime == "application/pdf" or name.endswith(".pdf"):
+        pages: list[tuple[int, str]] = []
+        total = 0
+        try:
+            for idx, text in iter_pdf_pages(pdf_bytes=content):
+                pages.append((idx, text[: max_chars - total]))
+                total += len(pages[-1][1])
+                if total >= max_chars:
+                    break
+        except Exception:
+            pass
+        return pages
 
-    return cleaned, truncated
+    text, _truncated = extract_text_from_upload(filename=filename, mime_type=mime_type, content=content, max_chars=max_chars)
+    return [(0, text)] if text else []
 
 
-def extract_text_from_upload(*, filename: str, mime_type: str | None, content: bytes) -> tuple[str | None, bool]:
+def extract_text_from_upload(
+    *,
+    filename: str,
+    mime_type: str | None,
+    content: bytes,
+    max_chars: int = 200_000,
+    page_start: int = 0,
+    page_end: int | None = None,
+) -> tuple[str | None, bool]:
     mime = (mime_type or "").lower().strip()
     name = (filename or "").lower()
 
     if mime == "application/pdf" or name.endswith(".pdf"):
         try:
-            text, truncated = extract_text_from_pdf(pdf_bytes=content)
+            text, truncated = extract_text_from_pdf(
+                pdf_bytes=content,
+                max_chars=max_chars,
+                page_start=page_start,
+                page_end=page_end,
+            )
             return (text if text.strip() else None), truncated
         except Exception:
             return None, False
@@ -54,9 +122,9 @@ def extract_text_from_upload(*, filename: str, mime_type: str | None, content: b
             return None, False
 
         cleaned = _clean_text(text)
-        truncated = len(cleaned) > 200_000
+        truncated = len(cleaned) > max_chars
         if truncated:
-            cleaned = cleaned[:200_000]
+            cleaned = cleaned[:max_chars]
         return (cleaned if cleaned.strip() else None), truncated
 
     return None, False
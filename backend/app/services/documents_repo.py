@@ -2,38 +2,22 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 import logging
-import time
 from uuid import uuid4
 
-import httpx
-
+from app.services.activity_writer import get_activity_writer
+from app.services.collection_versions import ACTIVITY, DOCUMENTS, mark_changed
+from app.services.events import publish_event
+from app.services.resilience import supabase_call
+from app.services.single_flight import shared_read
+from app.services.storage import acquire_object
 from app.services.supabase_client import get_supabase_admin
+from app.services.tracing import traced
 
 
 logger = logging.getLogger(__name__)
 
 
-def _execute_with_retry(fn, *, retries: int = 2, base_sleep: float = 0.2):
-    last_exc: Exception | None = None
-    for attempt in range(retries + 1):
-        try:
-            return fn()
-        except httpx.RemoteProtocolError as e:
-            last_exc = e
-            logger.warning("Supabase connection dropped (RemoteProtocolError), attempt=%s", attempt + 1)
-            time.sleep(base_sleep * (attempt + 1))
-        except httpx.HTTPError as e:
-            last_exc = e
-            logger.warning("Supabase HTTP error, attempt=%s", attempt + 1)
-            time.sleep(base_sleep * (attempt + 1))
-        except Exception as e:
-            last_exc = e
-            break
-
-    if last_exc:
-        raise last_exc
-
-
+@traced()
 def create_document(
     *,
     user_id: str,
@@ -53,17 +37,100 @@ def create_document(
         "size_bytes": size_bytes,
     }
 
-    resp = _execute_with_retry(lambda: supabase.table("documents").insert(payload).execute())
+    resp = supabase_call(lambda: supabase.table("documents").insert(payload).execute())
+    try:
+        acquire_object(bucket="documents", path=storage_path, user_id=user_id, size_bytes=size_bytes)
+    except Exception:
+        logger.exception("Failed to acquire document object reference")
+    mark_changed(user_id=user_id, collection=DOCUMENTS)
     data = (resp.data or [payload])[0]
     if isinstance(data, dict):
         data.setdefault("storage_path", storage_path)
+    publish_event(user_id=user_id, type="document.created", document=data)
     return data
 
 
+@traced()
+def get_document(*, user_id: str, storage_path: str) -> dict | None:
+    supabase = get_supabase_admin()
+    resp = supabase_call(
+        lambda: supabase.table("documents")
+        .select("user_id,filename,storage_path,mime_type,file_type,size_bytes,created_at")
+        .eq("user_id", user_id)
+        .eq("storage_path", storage_path)
+        .limit(1)
+        .execute()
+    )
+    data = resp.data or []
+    return data[0] if data else None
+
+
+@traced()
+def delete_document(*, user_id: str, storage_path: str) -> bool:
+    supabase = get_supabase_admin()
+    resp = supabase_call(
+        lambda: supabase.table("documents").delete().eq("user_id", user_id).eq("storage_path", storage_path).execute()
+    )
+    mark_changed(user_id=user_id, collection=DOCUMENTS)
+    if resp.data:
+        publish_event(user_id=user_id, type="document.deleted", storage_path=storage_path)
+    try:
+        supabase_call(
+            lambda: supabase.table("document_chunks").delete().eq("user_id", user_id).eq("storage_path", storage_path).execute()
+        )
+    except Exception:
+        logger.exception("Failed to delete document chunks")
+    return bool(resp.data)
+
+
+@traced()
+def replace_document_chunks(*, user_id: str, storage_path: str, chunks: list[dict], batch_size: int = 200) -> None:
+    supabase = get_supabase_admin()
+    supabase_call(
+        lambda: supabase.table("document_chunks").delete().eq("user_id", user_id).eq("storage_path", storage_path).execute()
+    )
+
+    rows = [{**c, "user_id": user_id, "storage_path": storage_path} for c in chunks]
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start : start + batch_size]
+        supabase_call(lambda: supabase.table("document_chunks").insert(batch).execute())
+
+
+@traced()
+def search_document_chunks(
+    *,
+    user_id: str,
+    query: str,
+    limit: int = 10,
+    require_ai_access: bool = False,
+    embedding: list[float] | None = None,
+) -> list[dict]:
+    query = (query or "").strip()
+    if not query:
+        return []
+
+    supabase = get_supabase_admin()
+    resp = supabase_call(
+        lambda: supabase.rpc(
+            "search_document_chunks",
+            {
+                "p_user_id": user_id,
+                "p_query": query,
+                "p_limit": limit,
+                "p_require_ai_access": require_ai_access,
+                "p_embedding": embedding,
+            },
+        ).execute()
+    )
+    return resp.data or []
+
+
+@traced()
+@shared_read(DOCUMENTS)
 def list_documents(*, user_id: str, limit: int = 50) -> list[dict]:
     supabase = get_supabase_admin()
     try:
-        resp = _execute_with_retry(
+        resp = supabase_call(
             lambda: supabase.table("documents")
             .select("user_id,filename,storage_path,mime_type,file_type,size_bytes,created_at,ai_access_granted,ai_access_granted_at")
             .eq("user_id", user_id)
@@ -73,7 +140,7 @@ def list_documents(*, user_id: str, limit: int = 50) -> list[dict]:
         )
         return resp.data or []
     except Exception:
-        resp = _execute_with_retry(
+        resp = supabase_call(
             lambda: supabase.table("documents")
             .select("user_id,filename,storage_path,mime_type,file_type,size_bytes,created_at")
             .eq("user_id", user_id)
@@ -84,10 +151,11 @@ def list_documents(*, user_id: str, limit: int = 50) -> list[dict]:
         return resp.data or []
 
 
+@traced()
 def get_ai_access_granted(*, user_id: str, storage_path: str) -> bool:
     supabase = get_supabase_admin()
     try:
-        resp = _execute_with_retry(
+        resp = supabase_call(
             lambda: supabase.table("documents")
             .select("ai_access_granted")
             .eq("user_id", user_id)
@@ -101,17 +169,20 @@ def get_ai_access_granted(*, user_id: str, storage_path: str) -> bool:
         return False
 
 
+@traced()
 def grant_ai_access(*, user_id: str, storage_path: str) -> bool:
     supabase = get_supabase_admin()
     try:
         now = datetime.now(timezone.utc).isoformat()
-        _execute_with_retry(
+        supabase_call(
             lambda: supabase.table("documents")
             .update({"ai_access_granted": True, "ai_access_granted_at": now})
             .eq("user_id", user_id)
             .eq("storage_path", storage_path)
             .execute()
         )
+        mark_changed(user_id=user_id, collection=DOCUMENTS)
+        publish_event(user_id=user_id, type="document.updated", storage_path=storage_path, ai_access_granted=True)
         return True
     except Exception:
         logger.exception("Failed to grant ai access")
@@ -119,6 +190,7 @@ def grant_ai_access(*, user_id: str, storage_path: str) -> bool:
 
 
 
+@traced()
 def create_activity(*, user_id: str, summary: str, metadata: dict | None = None, actor_name: str | None = None) -> dict:
     supabase = get_supabase_admin()
     now = datetime.now(timezone.utc).isoformat()
@@ -138,22 +210,44 @@ def create_activity(*, user_id: str, summary: str, metadata: dict | None = None,
     if actor_name is not None and actor_name.strip():
         payload["actor_name"] = actor_name.strip()
 
+    writer = get_activity_writer()
+    if writer.running:
+        writer.submit(payload)
+        return payload
+
     try:
-        resp = _execute_with_retry(lambda: supabase.table("activity_log").insert(payload).execute())
-        return (resp.data or [payload])[0]
+        resp = supabase_call(lambda: supabase.table("activity_log").insert(payload).execute())
     except Exception:
-        if "actor_name" in payload:
-            payload.pop("actor_name", None)
-            resp = _execute_with_retry(lambda: supabase.table("activity_log").insert(payload).execute())
-            return (resp.data or [payload])[0]
-        raise
+        if "actor_name" not in payload:
+            raise
+        payload.pop("actor_name", None)
+        resp = supabase_call(lambda: supabase.table("activity_log").insert(payload).execute())
+    created = (resp.data or [payload])[0]
+    mark_changed(user_id=user_id, collection=ACTIVITY)
+    publish_event(user_id=user_id, type="activity.created", activity=created)
+    return created
 
 
 
 
+@traced()
+def update_activity_summary(*, activity_id: str, summary: str) -> bool:
+    supabase = get_supabase_admin()
+    resp = supabase_call(
+        lambda: supabase.table("activity_log").update({"summary": summary}).eq("activity_id", activity_id).execute()
+    )
+    for row in resp.data or []:
+        if isinstance(row, dict) and row.get("user_id"):
+            mark_changed(user_id=str(row["user_id"]), collection=ACTIVITY)
+            publish_event(user_id=str(row["user_id"]), type="activity.updated", activity=row)
+    return bool(resp.data)
+
+
+@traced()
+@shared_read(ACTIVITY)
 def list_recent_activity(*, user_id: str, limit: int = 10) -> list[dict]:
     supabase = get_supabase_admin()
-    resp = _execute_with_retry(
+    resp = supabase_call(
         lambda: supabase.table("activity_log").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
     )
     return resp.data or []
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from app.core.config import get_settings
+from app.services.documents_repo import search_document_chunks
+from app.services.items_repo import get_items_by_ids, hybrid_search_items_rpc, search_items_basic, set_item_embedding
+from app.services.job_queue import job_handler
+from app.services.metrics import record_cache
+from app.services.openai_service import create_embeddings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Inputs per embeddings request; well under the provider's per-request limit.
+EMBED_BATCH_SIZE = 256
+
+
+class EmbeddingCache:
+    """In-process LRU of embeddings keyed by a hash of (model, dimensions, text)."""
+
+    def __init__(self, *, max_entries: int = 4_096) -> None:
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is not None:
+                self._entries.move_to_end(key)
+            return vec
+
+    def put(self, key: str, vec: list[float]) -> None:
+        with self._lock:
+            self._entries[key] = vec
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+_cache = EmbeddingCache()
+
+
+def _content_hash(text: str) -> str:
+    settings = get_settings()
+    return hashlib.sha256(f"{settings.openai_embedding_model}:{settings.embedding_dimensions}:{text}".encode()).hexdigest()
+
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """Embed ``texts``, serving repeats from the cache and batching the rest."""
+    keys = [_content_hash(t) for t in texts]
+    out: list[list[float] | None] = [_cache.get(k) for k in keys]
+
+    missing = [i for i, v in enumerate(out) if v is None]
+    record_cache("embeddings", hits=len(out) - len(missing), misses=len(missing))
+    for start in range(0, len(missing), EMBED_BATCH_SIZE):
+        idxs = missing[start : start + EMBED_BATCH_SIZE]
+        vectors = create_embeddings(texts=[texts[i] for i in idxs])
+        for i, vec in zip(idxs, vectors):
+            _cache.put(keys[i], vec)
+            out[i] = vec
+
+    return [v or [] for v in out]
+
+
+def item_embedding_text(item: dict) -> str:
+    parts = [
+        item.get("name"),
+        item.get("category"),
+        item.get("subcategory"),
+        item.get("brand"),
+        " ".join(item.get("tags") or []),
+        item.get("location"),
+        item.get("notes"),
+    ]
+    return " | ".join(str(p).strip() for p in parts if p and str(p).strip())
+
+
+def refresh_item_embeddings(*, user_id: str, item_ids: list[str] | None) -> int:
+    """Re-embed items whose text changed since their last embedding; returns the count updated.
+
+    ``item_ids=None`` covers all of the user's items, which backfills
+    inventories created before embeddings existed.
+    """
+    items = get_items_by_ids(user_id=user_id, item_ids=item_ids)
+
+    pending: list[tuple[str, str, str]] = []
+    for it in items:
+        text = item_embedding_text(it)
+        if not text:
+            continue
+        content_hash = _content_hash(text)
+        if it.get("embedding_hash") == content_hash:
+            continue
+        pending.append((str(it["item_id"]), text, content_hash))
+
+    if not pending:
+        return 0
+
+    vectors = embed_texts([text for _id, text, _h in pending])
+    for (item_id, _text, content_hash), vec in zip(pending, vectors):
+        set_item_embedding(user_id=user_id, item_id=item_id, embedding=vec, embedding_hash=content_hash)
+    return len(pending)
+
+
+@job_handler("embed_items")
+def _embed_items_job(payload: dict) -> dict:
+    return {"updated": refresh_item_embeddings(user_id=payload["user_id"], item_ids=payload.get("item_ids"))}
+
+
+def hybrid_search_items(*, user_id: str, q: str, limit: int = 50) -> list[dict]:
+    """Rank items by blended vector similarity and full-text rank; falls back to substring search."""
+    q = (q or "").strip()
+    if not q:
+        return search_items_basic(user_id=user_id, q="")
+
+    try:
+        embedding = embed_texts([q])[0]
+    except Exception:
+        logger.exception("Query embedding failed; using lexical ranking only")
+        embedding = None
+
+    try:
+        return hybrid_search_items_rpc(user_id=user_id, q=q, embedding=embedding, limit=limit)
+    except Exception:
+        logger.exception("Hybrid item search failed; falling back to substring search")
+        return search_items_basic(user_id=user_id, q=q)
+
+
+def hybrid_search_documents(*, user_id: str, query: str, limit: int = 10, require_ai_access: bool = False) -> list[dict]:
+    """Rank document passages by blended vector similarity and full-text rank."""
+    query = (query or "").strip()
+    if not query:
+        return []
+
+    try:
+        embedding = embed_texts([query])[0]
+    except Exception:
+        logger.exception("Query embedding failed; using lexical ranking only")
+        embedding = None
+
+    return search_document_chunks(
+        user_id=user_id,
+        query=query,
+        limit=limit,
+        require_ai_access=require_ai_access,
+        embedding=embedding,
+    )
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+_NOTIFY_MAX_BYTES = 7_900
+
+# Kept from nested records when an event is too large for NOTIFY, so clients
+# can still tell which record changed and refetch it.
+_IDENTITY_FIELDS = ("item_id", "storage_path", "activity_id")
+
+# Events waiting for the NOTIFY thread; beyond this they are delivered locally.
+_OUTBOX_MAX = 10_000
+
+
+def _slim_event(event: dict) -> dict:
+    slim: dict = {}
+    for k, v in event.items():
+        if isinstance(v, dict):
+            ids = {f: v[f] for f in _IDENTITY_FIELDS if v.get(f) is not None}
+            if ids:
+                slim[k] = ids
+        elif not isinstance(v, list):
+            slim[k] = v
+    return {**slim, "partial": True}
+
+
+class Subscription:
+    """One client's view of the change feed: a bounded queue owned by the event loop that created it."""
+
+    def __init__(self, *, user_id: str, loop: asyncio.AbstractEventLoop, max_pending: int) -> None:
+        self.user_id = user_id
+        self._loop = loop
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=max_pending)
+        self._overflowed = False
+
+    def _offer(self, event: dict) -> None:
+        # Runs on the owning loop. A client that falls this far behind is told
+        # to resync instead of receiving a feed with gaps.
+        if self._overflowed:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._overflowed = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait({"type": "resync"})
+
+    async def get(self, *, timeout: float) -> dict | None:
+        try:
+            event = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event.get("type") == "resync":
+            self._overflowed = False
+        return event
+
+
+class EventBus:
+    """Per-user in-process pub/sub for change events.
+
+    Repository write paths call ``publish`` from any thread. Without a bridge,
+    events fan out to subscribers in this process only. With ``database_url``
+    set, events are sent through Postgres NOTIFY and every worker (this one
+    included) delivers what it receives via LISTEN, so clients see writes made
+    by any worker. The bridge needs the optional ``psycopg`` package; NOTIFY
+    runs on a dedicated thread so ``publish`` never blocks the caller (which
+    may be the event loop) on the database.
+    """
+
+    def __init__(self, *, database_url: str | None = None, channel: str = "app_events", max_pending: int = 256) -> None:
+        self._database_url = database_url
+        self._channel = channel
+        self._max_pending = max_pending
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._notify_conn = None
+        self._notify_lock = threading.Lock()
+        self._listener: asyncio.Task | None = None
+        self._outbox: queue.Queue[tuple[str, dict] | None] | None = None
+        self._notifier: threading.Thread | None = None
+
+    @property
+    def bridged(self) -> bool:
+        return self._listener is not None and not self._listener.done()
+
+    def subscribe(self, *, user_id: str) -> Subscription:
+        sub = Subscription(user_id=user_id, loop=asyncio.get_running_loop(), max_pending=self._max_pending)
+        with self._lock:
+            self._subscribers[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is None:
+                return
+            subs.discard(sub)
+            if not subs:
+                self._subscribers.pop(sub.user_id, None)
+
+    def publish(self, *, user_id: str, event: dict) -> None:
+        outbox = self._outbox
+        if self.bridged and outbox is not None:
+            try:
+                outbox.put_nowait((user_id, event))
+                return
+            except queue.Full:
+                logger.warning("Event NOTIFY backlog full; delivering locally only")
+        self._dispatch_local(user_id=user_id, event=event)
+
+    def _run_notifier(self, outbox: queue.Queue[tuple[str, dict] | None]) -> None:
+        while (entry := outbox.get()) is not None:
+            user_id, event = entry
+            if not self._notify(user_id=user_id, event=event):
+                self._dispatch_local(user_id=user_id, event=event)
+
+    def _dispatch_local(self, *, user_id: str, event: dict) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(user_id) or ())
+        for sub in subs:
+            try:
+                sub._loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:
+                # Owning loop already closed.
+                self.unsubscribe(sub)
+
+    def _notify(self, *, user_id: str, event: dict) -> bool:
+        payload = json.dumps({"user_id": user_id, "event": event}, default=str, separators=(",", ":"))
+        if len(payload.encode()) > _NOTIFY_MAX_BYTES:
+            # Too big to ship whole; send the envelope and let clients refetch the record.
+            payload = json.dumps({"user_id": user_id, "event": _slim_event(event)}, default=str, separators=(",", ":"))
+
+        with self._notify_lock:
+            try:
+                if self._notify_conn is None or self._notify_conn.closed:
+                    import psycopg
+
+                    self._notify_conn = psycopg.connect(self._database_url, autocommit=True)
+                self._notify_conn.execute("select pg_notify(%s, %s)", (self._channel, payload))
+                return True
+            except Exception:
+                logger.warning("Event NOTIFY failed; delivering locally only", exc_info=True)
+                self._notify_conn = None
+                return False
+
+    async def start(self) -> None:
+        if not self._database_url or self._listener is not None:
+            return
+        try:
+            import psycopg  # noqa: F401
+        except ImportError:
+            logger.warning("EVENTS_DATABASE_URL is set but psycopg is not installed; change events stay in-process")
+            return
+        self._listener = asyncio.create_task(self._listen(), name="events-listener")
+        self._outbox = queue.Queue(maxsize=_OUTBOX_MAX)
+        self._notifier = threading.Thread(target=self._run_notifier, args=(self._outbox,), name="events-notifier", daemon=True)
+        self._notifier.start()
+
+    async def stop(self) -> None:
+        task, self._listener = self._listener, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        outbox, self._outbox = self._outbox, None
+        notifier, self._notifier = self._notifier, None
+        if outbox is not None and notifier is not None:
+            # Drain what was already published, then stop.
+            outbox.put(None)
+            await asyncio.to_thread(notifier.join, 10.0)
+        with self._notify_lock:
+            conn, self._notify_conn = self._notify_conn, None
+        if conn is not None:
+            conn.close()
+
+    async def _listen(self) -> None:
+        import psycopg
+
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._database_url, autocommit=True) as conn:
+                    await conn.execute(f'listen "{self._channel}"')
+                    delay = 1.0
+                    async for notify in conn.notifies():
+                        try:
+                            msg = json.loads(notify.payload)
+                            self._dispatch_local(user_id=str(msg["user_id"]), event=msg["event"])
+                        except Exception:
+                            logger.warning("Ignoring malformed change event")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Change event listener disconnected; retrying in %.0fs", delay, exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+@lru_cache
+def get_event_bus() -> EventBus:
+    settings = get_settings()
+    return EventBus(database_url=settings.events_database_url, channel=settings.events_channel)
+
+
+def publish_event(*, user_id: str, type: str, **data) -> None:
+    """Publish a change event; never raises, since it runs after the write already succeeded."""
+    try:
+        get_event_bus().publish(user_id=user_id, event={"type": type, **data})
+    except Exception:
+        logger.exception("Failed to publish change event: type=%s", type)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.services.document_text_extractor import extract_pages_from_upload, extract_text_from_upload
+from app.services.metrics import observe
+from app.services.tracing import traced
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionTimeoutError(TimeoutError):
+    pass
+
+
+class ExtractionFailedError(RuntimeError):
+    pass
+
+
+def _limit_worker_memory(memory_limit_mb: int) -> None:
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+class ExtractionPool:
+    """Runs document text extraction in a bounded pool of worker processes.
+
+    pypdf parsing is CPU-bound and holds the GIL, so it must not run on API
+    worker threads. Each job has a timeout; a job that overruns (or is
+    cancelled while running) gets its worker processes killed and the pool is
+    rebuilt, since a stuck parser can't be interrupted any other way. Workers
+    run under an address-space limit so a hostile PDF can't exhaust memory.
+    """
+
+    def __init__(self, *, max_workers: int = 2, timeout_seconds: float = 20.0, memory_limit_mb: int = 512) -> None:
+        self._max_workers = max_workers
+        self._timeout_seconds = timeout_seconds
+        self._memory_limit_mb = memory_limit_mb
+        # Bounds queued + running jobs so a burst can't pile up unbounded pickled payloads.
+        self._slots = threading.BoundedSemaphore(max_workers * 2)
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_limit_worker_memory,
+                    initargs=(self._memory_limit_mb,),
+                )
+            return self._executor
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+
+        logger.warning("Recycling document extraction workers")
+        for proc in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                proc.kill()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *, timeout: float, **kwargs) -> tuple[ProcessPoolExecutor, Future]:
+        if not self._slots.acquire(timeout=timeout):
+            raise ExtractionTimeoutError("Document extraction queue is full")
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._slots.release())
+        return executor, future
+
+    def _run(self, fn, *, timeout: float, **kwargs):
+        executor, future = self._submit(fn, timeout=timeout, **kwargs)
+        try:
+            with observe("document.extract_text"):
+                return future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            if not future.cancel():
+                self._recycle(executor)
+            raise ExtractionTimeoutError(f"Document extraction exceeded {timeout}s")
+        except BrokenProcessPool as e:
+            # Typically the worker hit its memory limit; start fresh for the next job.
+            self._recycle(executor)
+            raise ExtractionFailedError("Document extraction worker crashed") from e
+
+    @traced("extraction.extract_text")
+    def extract(
+        self,
+        *,
+        filename: str,
+        mime_type: str | None,
+        content: bytes,
+        max_chars: int = 200_000,
+        page_start: int = 0,
+        page_end: int | None = None,
+        timeout: float | None = None,
+    ) -> tuple[str | None, bool]:
+        return self._run(
+            extract_text_from_upload,
+            timeout=timeout or self._timeout_seconds,
+            filename=filename,
+            mime_type=mime_type,
+            content=content,
+            max_chars=max_chars,
+            page_start=page_start,
+            page_end=page_end,
+        )
+
+    @traced("extraction.extract_pages")
+    def extract_pages(
+        self,
+        *,
+        filename: str,
+        mime_type: str | None,
+        content: bytes,
+        max_chars: int = 500_000,
+        timeout: float | None = None,
+    ) -> list[tuple[int, str]]:
+        return self._run(
+            extract_pages_from_upload,
+            timeout=timeout or self._timeout_seconds,
+            filename=filename,
+            mime_type=mime_type,
+            content=content,
+            max_chars=max_chars,
+        )
+
+    @traced("extraction.extract_text")
+    async def extract_async(
+        self,
+        *,
+        filename: str,
+        mime_type: str | None,
+        content: bytes,
+        max_chars: int = 200_000,
+        page_start: int = 0,
+        page_end: int | None = None,
+        timeout: float | None = None,
+    ) -> tuple[str | None, bool]:
+        timeout = timeout or self._timeout_seconds
+        executor, future = await asyncio.to_thread(
+            self._submit,
+            extract_text_from_upload,
+            timeout=timeout,
+            filename=filename,
+            mime_type=mime_type,
+            content=content,
+            max_chars=max_chars,
+            page_start=page_start,
+            page_end=page_end,
+        )
+        try:
+            with observe("document.extract_text"):
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if not future.cancel():
+                self._recycle(executor)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise ExtractionTimeoutError(f"Document extraction exceeded {timeout}s")
+        except BrokenProcessPool as e:
+            self._recycle(executor)
+            raise ExtractionFailedError("Document extraction worker crashed") from e
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache
+def get_extraction_pool() -> ExtractionPool:
+    settings = get_settings()
+    return ExtractionPool(
+        max_workers=settings.extraction_workers,
+        timeout_seconds=settings.extraction_timeout_seconds,
+        memory_limit_mb=settings.extraction_memory_limit_mb,
+    )
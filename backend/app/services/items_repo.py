@@ -2,53 +2,135 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 import logging
-import time
 from uuid import uuid4
 
-import httpx
-
+from app.core.config import get_settings
+from app.services.collection_versions import ITEMS, mark_changed
+from app.services.events import publish_event
+from app.services.job_queue import get_job_queue
+from app.services.storage import ForeignObjectError, acquire_object, owned_objects, release_object
+from app.services.resilience import supabase_call
+from app.services.single_flight import shared_read
 from app.services.supabase_client import get_supabase_admin
+from app.services.tracing import traced
 
 
 logger = logging.getLogger(__name__)
 
 
-def _execute_with_retry(fn, *, retries: int = 2, base_sleep: float = 0.2):
-    last_exc: Exception | None = None
-    for attempt in range(retries + 1):
-        try:
-            return fn()
-        except httpx.RemoteProtocolError as e:
-            last_exc = e
-            logger.warning("Supabase connection dropped (RemoteProtocolError), attempt=%s", attempt + 1)
-            time.sleep(base_sleep * (attempt + 1))
-        except httpx.HTTPError as e:
-            last_exc = e
-            logger.warning("Supabase HTTP error, attempt=%s", attempt + 1)
-            time.sleep(base_sleep * (attempt + 1))
-        except Exception as e:
-            last_exc = e
-            break
-
-    if last_exc:
-        raise last_exc
+# Columns returned to clients; excludes the embedding vector and search tsvector.
+ITEM_COLUMNS = (
+    "item_id,user_id,name,category,subcategory,brand,part_number,tags,confidence,quantity,"
+    "location,image_url,image_path,barcode,purchase_source,notes,created_at,updated_at"
+)
+
+_INTERNAL_COLUMNS = ("embedding", "embedding_hash", "search_tsv")
+
+
+def _public_item(row: dict) -> dict:
+    if not isinstance(row, dict):
+        return row
+    return {k: v for k, v in row.items() if k not in _INTERNAL_COLUMNS}
+
+
+def _check_image_paths(*, user_id: str, paths: list[str | None]) -> None:
+    """Raise ``ForeignObjectError`` unless every given path is one of the user's stored images."""
+    wanted = {p for p in paths if p}
+    if not wanted:
+        return
+    owned = owned_objects(bucket=get_settings().supabase_storage_bucket, user_id=user_id, paths=list(wanted))
+    if wanted - owned:
+        raise ForeignObjectError("image_path is not one of the user's stored images")
+
+
+def _acquire_image(*, user_id: str, image_path: str | None) -> None:
+    if not image_path:
+        return
+    try:
+        acquire_object(bucket=get_settings().supabase_storage_bucket, path=image_path, user_id=user_id)
+    except Exception:
+        logger.exception("Failed to acquire item image reference")
+
+
+def _release_image(*, user_id: str, image_path: str | None) -> None:
+    if not image_path:
+        return
+    try:
+        release_object(bucket=get_settings().supabase_storage_bucket, path=image_path, user_id=user_id)
+    except Exception:
+        logger.exception("Failed to release item image")
+
 
+def _queue_embedding_refresh(*, user_id: str, item_ids: list[str]) -> None:
+    ids = [str(i) for i in item_ids if i]
+    if not ids:
+        return
+    try:
+        get_job_queue().enqueue(user_id=user_id, kind="embed_items", payload={"user_id": user_id, "item_ids": ids})
+    except Exception:
+        logger.exception("Failed to queue item embedding refresh")
 
+
+@traced()
+@shared_read(ITEMS)
 def list_items(*, user_id: str) -> list[dict]:
     supabase = get_supabase_admin()
-    resp = _execute_with_retry(
-        lambda: supabase.table("items").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+    resp = supabase_call(
+        lambda: supabase.table("items").select(ITEM_COLUMNS).eq("user_id", user_id).order("created_at", desc=True).execute()
     )
     return resp.data or []
 
 
-def bulk_create_items(*, user_id: str, items: list[dict]) -> tuple[list[dict], list[dict]]:
+@traced()
+def get_items_by_ids(*, user_id: str, item_ids: list[str] | None) -> list[dict]:
+    """Fetch items with their ``embedding_hash``; ``item_ids=None`` returns all of the user's items."""
+    if item_ids is not None and not item_ids:
+        return []
     supabase = get_supabase_admin()
-    inserted: list[dict] = []
-    failures: list[dict] = []
 
-    now = datetime.now(timezone.utc).isoformat()
+    def _query():
+        query = supabase.table("items").select(f"{ITEM_COLUMNS},embedding_hash").eq("user_id", user_id)
+        if item_ids is not None:
+            query = query.in_("item_id", item_ids)
+        return query.execute()
+
+    resp = supabase_call(_query)
+    return resp.data or []
+
+
+@traced()
+def set_item_embedding(*, user_id: str, item_id: str, embedding: list[float], embedding_hash: str) -> None:
+    supabase = get_supabase_admin()
+    supabase_call(
+        lambda: supabase.table("items")
+        .update({"embedding": embedding, "embedding_hash": embedding_hash})
+        .eq("user_id", user_id)
+        .eq("item_id", item_id)
+        .execute()
+    )
+
+
+@traced()
+def hybrid_search_items_rpc(*, user_id: str, q: str, embedding: list[float] | None, limit: int = 50) -> list[dict]:
+    supabase = get_supabase_admin()
+    resp = supabase_call(
+        lambda: supabase.rpc(
+            "match_items_hybrid",
+            {"p_user_id": user_id, "p_query": q, "p_embedding": embedding, "p_limit": limit},
+        ).execute()
+    )
+    out: list[dict] = []
+    for row in resp.data or []:
+        item = row.get("item") if isinstance(row, dict) else None
+        if isinstance(item, dict):
+            out.append({**_public_item(item), "score": row.get("score")})
+    return out
+
+
+def _bulk_payloads(*, user_id: str, items: list[dict], now: str) -> tuple[list[dict], list[dict]]:
+    """Validate ``bulk_create_items`` input into insert rows; returns ``(payloads, failures)``."""
     payloads: list[dict] = []
+    failures: list[dict] = []
 
     for idx, it in enumerate(items or []):
         name = (it.get("name") or "").strip()
@@ -86,21 +168,38 @@ def bulk_create_items(*, user_id: str, items: list[dict]) -> tuple[list[dict], l
                 "quantity": quantity,
                 "location": location,
                 "image_url": it.get("image_url"),
+                "image_path": it.get("image_path"),
                 "barcode": it.get("barcode"),
                 "purchase_source": it.get("purchase_source"),
                 "notes": it.get("notes"),
             }
         )
 
+    return (payloads, failures)
+
+
+@traced()
+def bulk_create_items(*, user_id: str, items: list[dict]) -> tuple[list[dict], list[dict]]:
+    supabase = get_supabase_admin()
+    payloads, failures = _bulk_payloads(user_id=user_id, items=items, now=datetime.now(timezone.utc).isoformat())
+
     if not payloads:
         return ([], failures)
 
-    resp = _execute_with_retry(lambda: supabase.table("items").insert(payloads).execute())
-    inserted = resp.data or []
+    _check_image_paths(user_id=user_id, paths=[p.get("image_path") for p in payloads])
+    resp = supabase_call(lambda: supabase.table("items").insert(payloads).execute())
+    inserted = [_public_item(r) for r in resp.data or []]
+    for p in payloads:
+        _acquire_image(user_id=user_id, image_path=p.get("image_path"))
+    mark_changed(user_id=user_id, collection=ITEMS)
+    for row in inserted:
+        publish_event(user_id=user_id, type="item.created", item=row)
+    _queue_embedding_refresh(user_id=user_id, item_ids=[p["item_id"] for p in payloads])
 
     return (inserted, failures)
 
 
+@traced()
 def add_item(*, user_id: str, item: dict) -> dict:
     supabase = get_supabase_admin()
 
@@ -112,16 +211,31 @@ def add_item(*, user_id: str, item: dict) -> dict:
         "created_at": now,
     }
 
-    resp = _execute_with_retry(lambda: supabase.table("items").insert(payload).execute())
-    return (resp.data or [payload])[0]
+    _check_image_paths(user_id=user_id, paths=[payload.get("image_path")])
+    resp = supabase_call(lambda: supabase.table("items").insert(payload).execute())
+    created = _public_item((resp.data or [payload])[0])
+    _acquire_image(user_id=user_id, image_path=payload.get("image_path"))
+    mark_changed(user_id=user_id, collection=ITEMS)
+    publish_event(user_id=user_id, type="item.created", item=created)
+    _queue_embedding_refresh(user_id=user_id, item_ids=[payload["item_id"]])
+    return created
 
 
+@traced()
 def delete_item(*, user_id: str, item_id: str) -> bool:
     supabase = get_supabase_admin()
-    resp = _execute_with_retry(lambda: supabase.table("items").delete().eq("user_id", user_id).eq("item_id", item_id).execute())
+    resp = supabase_call(lambda: supabase.table("items").delete().eq("user_id", user_id).eq("item_id", item_id).execute())
+    mark_changed(user_id=user_id, collection=ITEMS)
+    if resp.data:
+        publish_event(user_id=user_id, type="item.deleted", item_id=item_id)
+
+    for row in resp.data or []:
+        _release_image(user_id=user_id, image_path=row.get("image_path") if isinstance(row, dict) else None)
+
     return bool(resp.data)
 
 
+@traced()
 def update_item(*, user_id: str, item_id: str, updates: dict) -> dict | None:
     supabase = get_supabase_admin()
 
@@ -136,6 +250,7 @@ def update_item(*, user_id: str, item_id: str, updates: dict) -> dict | None:
         "quantity",
         "location",
         "image_url",
+        "image_path",
         "barcode",
         "purchase_source",
         "notes",
@@ -145,22 +260,47 @@ def update_item(*, user_id: str, item_id: str, updates: dict) -> dict | None:
     if not payload:
         return None
 
+    # The old image's reference is dropped only once the row points elsewhere.
+    old_image_path: str | None = None
+    if "image_path" in payload:
+        current = supabase_call(
+            lambda: supabase.table("items").select("image_path").eq("user_id", user_id).eq("item_id", item_id).limit(1).execute()
+        )
+        rows = current.data or []
+        if not rows:
+            return None
+        old_image_path = rows[0].get("image_path")
+        if payload["image_path"] != old_image_path:
+            _check_image_paths(user_id=user_id, paths=[payload["image_path"]])
+
     try:
-        resp = _execute_with_retry(
+        resp = supabase_call(
             lambda: supabase.table("items").update(payload).eq("user_id", user_id).eq("item_id", item_id).select("*").execute()
         )
 
         data = resp.data or []
-        return data[0] if data else None
+        updated = _public_item(data[0]) if data else None
     except Exception:
         logger.exception("Failed to update item (select fallback)")
-        _execute_with_retry(lambda: supabase.table("items").update(payload).eq("user_id", user_id).eq("item_id", item_id).execute())
-        resp = _execute_with_retry(
-            lambda: supabase.table("items").select("*").eq("user_id", user_id).eq("item_id", item_id).maybe_single().execute()
+        supabase_call(lambda: supabase.table("items").update(payload).eq("user_id", user_id).eq("item_id", item_id).execute())
+        resp = supabase_call(
+            lambda: supabase.table("items").select(ITEM_COLUMNS).eq("user_id", user_id).eq("item_id", item_id).maybe_single().execute()
         )
-        return resp.data if isinstance(resp.data, dict) else None
+        updated = resp.data if isinstance(resp.data, dict) else None
+
+    if updated and "image_path" in payload and payload["image_path"] != old_image_path:
+        _acquire_image(user_id=user_id, image_path=payload["image_path"])
+        _release_image(user_id=user_id, image_path=old_image_path)
+
+    mark_changed(user_id=user_id, collection=ITEMS)
+    if updated:
+        publish_event(user_id=user_id, type="item.updated", item=updated)
+        _queue_embedding_refresh(user_id=user_id, item_ids=[item_id])
+    return updated
 
 
+@traced()
+@shared_read(ITEMS)
 def search_items_basic(*, user_id: str, q: str) -> list[dict]:
     q = (q or "").strip()
     if not q:
@@ -169,9 +309,9 @@ def search_items_basic(*, user_id: str, q: str) -> list[dict]:
     supabase = get_supabase_admin()
     pattern = f"%{q}%"
 
-    resp = _execute_with_retry(
+    resp = supabase_call(
         lambda: supabase.table("items")
-        .select("*")
+        .select(ITEM_COLUMNS)
         .eq("user_id", user_id)
         .or_(
             f"name.ilike.{pattern},category.ilike.{pattern},location.ilike.{pattern},notes.ilike.{pattern},purchase_source.ilike.{pattern},barcode.ilike.{pattern}"
@@ -181,3 +321,31 @@ def search_items_basic(*, user_id: str, q: str) -> list[dict]:
     )
 
     return resp.data or []
+
+
+@traced()
+@shared_read(ITEMS)
+def get_inventory_stats(*, user_id: str) -> dict:
+    """Read the trigger-maintained aggregates in ``user_inventory_stats`` for one user."""
+    supabase = get_supabase_admin()
+    resp = supabase_call(
+        lambda: supabase.table("user_inventory_stats")
+        .select("dimension,key,item_count,total_quantity")
+        .eq("user_id", user_id)
+        .execute()
+    )
+
+    stats: dict = {"total_items": 0, "total_quantity": 0, "by_category": [], "by_location": []}
+    for row in resp.data or []:
+        dimension = row.get("dimension")
+        if dimension == "total":
+            stats["total_items"] = int(row.get("item_count") or 0)
+            stats["total_quantity"] = int(row.get("total_quantity") or 0)
+        elif dimension in ("category", "location"):
+            stats[f"by_{dimension}"].append(
+                {"key": row.get("key"), "item_count": int(row.get("item_count") or 0), "total_quantity": int(row.get("total_quantity") or 0)}
+            )
+
+    for key in ("by_category", "by_location"):
+        stats[key].sort(key=lambda r: (-r["item_count"], str(r["key"]).lower()))
+    return stats
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from uuid import uuid4
+
+from app.core.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+JobHandler = Callable[[dict], "dict | None"]
+
+_handlers: dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register ``fn`` as the handler for jobs of ``kind``.
+
+    Handlers are plain sync functions taking the job payload; they run in a
+    worker thread and may return a JSON-serializable result.
+    """
+
+    def _register(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+
+    return _register
+
+
+@dataclass
+class Job:
+    job_id: str
+    user_id: str
+    kind: str
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    last_error: str | None
+    result: dict | None
+    created_at: float
+    updated_at: float
+
+
+_SCHEMA = """
+create table if not exists jobs (
+  job_id text primary key,
+  user_id text not null,
+  kind text not null,
+  payload text not null,
+  status text not null,
+  attempts integer not null default 0,
+  max_attempts integer not null,
+  run_after real not null,
+  last_error text,
+  result text,
+  owner text,
+  lease_until real,
+  created_at real not null,
+  updated_at real not null
+);
+create index if not exists idx_jobs_status_run_after on jobs (status, run_after);
+create index if not exists idx_jobs_user on jobs (user_id, created_at);
+"""
+
+# Columns added after the first release; ``create table if not exists`` leaves
+# older files without them.
+_ADDED_COLUMNS = {"owner": "text", "lease_until": "real"}
+
+# What ``GET /jobs`` reports for a failed job; the exception itself is logged.
+_JOB_FAILED_MESSAGE = "Job failed"
+
+
+class JobQueue:
+    """Durable in-process job queue: a SQLite table drained by asyncio workers.
+
+    Several processes (uvicorn workers) may share one file. A job is claimed
+    with a single ``UPDATE ... RETURNING`` that records the claiming process and
+    a lease, which the worker renews while the handler runs. A running job
+    whose lease has expired (its process died) is claimed again by any worker;
+    ``stop`` hands this process's unfinished jobs back to the queue. Failed
+    jobs are retried with exponential backoff until ``max_attempts`` is
+    reached. SQLite calls from the workers run in threads, so a locked file
+    never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        retention_seconds: int = 86_400,
+        lease_seconds: float = 60.0,
+    ) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._db.execute("pragma journal_mode=wal")
+        self._db.executescript(_SCHEMA)
+        existing = {row[1] for row in self._db.execute("pragma table_info(jobs)")}
+        for column, decl in _ADDED_COLUMNS.items():
+            if column not in existing:
+                try:
+                    self._db.execute(f"alter table jobs add column {column} {decl}")
+                except sqlite3.OperationalError:
+                    # Another process added it first.
+                    pass
+        self._owner = f"{os.getpid()}-{uuid4().hex[:8]}"
+        self._lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._poll_interval = poll_interval
+        self._retention_seconds = retention_seconds
+        self._tasks: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+
+    def enqueue(self, *, user_id: str, kind: str, payload: dict, max_attempts: int = 5) -> str:
+        if kind not in _handlers:
+            raise ValueError(f"No handler registered for job kind {kind!r}")
+
+        job_id = str(uuid4())
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "insert into jobs (job_id, user_id, kind, payload, status, max_attempts, run_after, created_at, updated_at) "
+                "values (?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, user_id, kind, json.dumps(payload), max_attempts, now, now, now),
+            )
+        self._notify()
+        return job_id
+
+    def get(self, *, user_id: str, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._db.execute(
+                "select job_id, user_id, kind, payload, status, attempts, max_attempts, last_error, result, created_at, updated_at "
+                "from jobs where job_id = ? and user_id = ?",
+                (job_id, user_id),
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(
+            job_id=row[0],
+            user_id=row[1],
+            kind=row[2],
+            payload=json.loads(row[3]),
+            status=row[4],
+            attempts=row[5],
+            max_attempts=row[6],
+            last_error=row[7],
+            result=json.loads(row[8]) if row[8] else None,
+            created_at=row[9],
+            updated_at=row[10],
+        )
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+        await asyncio.to_thread(self._prune)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self._workers)]
+
+    async def stop(self, *, timeout: float = 10.0) -> None:
+        self._stopping = True
+        self._notify()
+        if not self._tasks:
+            return
+
+        _done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        # Jobs interrupted by the shutdown would otherwise wait for their lease to expire.
+        await asyncio.to_thread(self._release_owned)
+
+    def _prune(self) -> None:
+        with self._lock:
+            self._db.execute(
+                "delete from jobs where status in ('succeeded', 'failed') and updated_at < ?",
+                (time.time() - self._retention_seconds,),
+            )
+
+    def _release_owned(self) -> None:
+        with self._lock:
+            self._db.execute(
+                "update jobs set status = 'queued', owner = null, lease_until = null, updated_at = ? "
+                "where status = 'running' and owner = ?",
+                (time.time(), self._owner),
+            )
+
+    def _notify(self) -> None:
+        if self._loop is None or self._wakeup is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _claim(self) -> tuple[str, str, dict, int, int] | None:
+        """Take the next due job, or a running one whose process stopped renewing its lease."""
+        now = time.time()
+        with self._lock:
+            # An abandoned job that has used up its attempts (e.g. it keeps
+            # killing its process) is failed rather than run again.
+            self._db.execute(
+                "update jobs set status = 'failed', last_error = ?, owner = null, lease_until = null, updated_at = ? "
+                "where status = 'running' and coalesce(lease_until, 0) < ? and attempts >= max_attempts",
+                (_JOB_FAILED_MESSAGE, now, now),
+            )
+            row = self._db.execute(
+                "update jobs set status = 'running', owner = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                "where job_id = ("
+                "  select job_id from jobs"
+                "  where (status = 'queued' and run_after <= ?) or (status = 'running' and coalesce(lease_until, 0) < ?)"
+                "  order by run_after limit 1"
+                ") and ((status = 'queued' and run_after <= ?) or (status = 'running' and coalesce(lease_until, 0) < ?)) "
+                "returning job_id, kind, payload, attempts, max_attempts",
+                (self._owner, now + self._lease_seconds, now, now, now, now, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2]), row[3], row[4]
+
+    def _renew(self, job_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "update jobs set lease_until = ?, updated_at = ? where job_id = ? and owner = ? and status = 'running'",
+                (now + self._lease_seconds, now, job_id, self._owner),
+            )
+
+    async def _keep_leased(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self._lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._renew, job_id)
+            except sqlite3.Error:
+                logger.exception("Failed to renew job lease: job_id=%s", job_id)
+
+    def _finish(self, job_id: str, *, result: dict | None) -> None:
+        with self._lock:
+            self._db.execute(
+                "update jobs set status = 'succeeded', result = ?, last_error = null, owner = null, lease_until = null, "
+                "updated_at = ? where job_id = ? and owner = ?",
+                (json.dumps(result) if result is not None else None, time.time(), job_id, self._owner),
+            )
+
+    def _fail(self, job_id: str, *, attempts: int, max_attempts: int) -> None:
+        now = time.time()
+        with self._lock:
+            if attempts >= max_attempts:
+                self._db.execute(
+                    "update jobs set status = 'failed', last_error = ?, owner = null, lease_until = null, updated_at = ? "
+                    "where job_id = ? and owner = ?",
+                    (_JOB_FAILED_MESSAGE, now, job_id, self._owner),
+                )
+            else:
+                delay = min(300.0, 2.0**attempts)
+                self._db.execute(
+                    "update jobs set status = 'queued', last_error = ?, run_after = ?, owner = null, lease_until = null, "
+                    "updated_at = ? where job_id = ? and owner = ?",
+                    (_JOB_FAILED_MESSAGE, now + delay, now, job_id, self._owner),
+                )
+
+    async def _worker(self) -> None:
+        assert self._wakeup is not None
+        while not self._stopping:
+            try:
+                claimed = await asyncio.to_thread(self._claim)
+            except sqlite3.Error:
+                logger.exception("Failed to claim a job")
+                claimed = None
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, kind, payload, attempts, max_attempts = claimed
+            handler = _handlers.get(kind)
+            if handler is None:
+                logger.error("No handler for job kind %r: job_id=%s", kind, job_id)
+                await asyncio.to_thread(self._fail, job_id, attempts=max_attempts, max_attempts=max_attempts)
+                continue
+
+            renewer = asyncio.create_task(self._keep_leased(job_id))
+            try:
+                result = await asyncio.to_thread(handler, payload)
+            except Exception:
+                logger.exception("Job failed: kind=%s job_id=%s attempt=%s", kind, job_id, attempts)
+                await asyncio.to_thread(self._fail, job_id, attempts=attempts, max_attempts=max_attempts)
+                continue
+            finally:
+                renewer.cancel()
+
+            await asyncio.to_thread(self._finish, job_id, result=result if isinstance(result, dict) else None)
+
+
+@lru_cache
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        settings.job_queue_path,
+        workers=settings.job_queue_workers,
+        lease_seconds=settings.job_queue_lease_seconds,
+    )
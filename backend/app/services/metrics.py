@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+
+logger = logging.getLogger(__name__)
+
+# With several worker processes (uvicorn --workers N), PROMETHEUS_MULTIPROC_DIR
+# must point at an empty directory shared by all of them, set before start-up.
+# Each process then writes its samples there and a scrape of any worker
+# aggregates them all; gauges declare how per-process values are combined.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# How often each worker refreshes its point-in-time gauges in multiprocess
+# mode, since a scrape only runs in one of them.
+SAMPLE_INTERVAL_SECONDS = 5.0
+
+
+# Buckets span fast cache hits to multi-second LLM calls.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (256, 1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response (headers) per route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SIZE = Histogram(
+    "http_request_size_bytes", "Request body size per route (from Content-Length).", ["method", "route"], buckets=SIZE_BUCKETS
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size per route (from Content-Length).", ["method", "route"], buckets=SIZE_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled.", multiprocess_mode="livesum")
+
+UPSTREAM_DURATION = Histogram(
+    "upstream_call_duration_seconds",
+    "Latency of individual upstream call attempts.",
+    ["upstream", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+OPERATION_DURATION = Histogram(
+    "app_operation_duration_seconds",
+    "Latency of named in-process operations (auth, text extraction, ...).",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+OPENAI_TOKENS = Counter("openai_tokens_total", "Tokens reported in OpenAI usage.", ["operation", "model", "kind"])
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by outcome.", ["cache", "result"])
+
+COMPRESSION_SECONDS = Counter("http_compression_seconds_total", "Time spent compressing response bodies.", ["encoding"])
+COMPRESSION_BYTES = Counter(
+    "http_compression_bytes_total", "Response bytes before (in) and after (out) compression.", ["encoding", "direction"]
+)
+
+THREADPOOL_BUSY = Gauge(
+    "threadpool_workers_busy", "Threadpool workers running sync routes and dependencies.", multiprocess_mode="livesum"
+)
+THREADPOOL_LIMIT = Gauge("threadpool_workers_limit", "Threadpool size.", multiprocess_mode="livesum")
+THREADPOOL_WAITING = Gauge("threadpool_tasks_waiting", "Tasks queued for a threadpool worker.", multiprocess_mode="livesum")
+
+OPENAI_POOL_CONNECTIONS = Gauge(
+    "openai_pool_connections", "OpenAI HTTP pool connections.", ["client", "state"], multiprocess_mode="livesum"
+)
+OPENAI_POOL_WAITING = Gauge(
+    "openai_pool_requests_waiting", "Requests waiting for an OpenAI pool connection.", ["client"], multiprocess_mode="livesum"
+)
+OPENAI_POOL_SATURATED = Gauge(
+    "openai_pool_saturated_requests", "Requests issued while every OpenAI pool connection was busy.", multiprocess_mode="livesum"
+)
+# Each worker has its own breaker; report the most open one.
+CIRCUIT_STATE = Gauge(
+    "upstream_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).", ["upstream"], multiprocess_mode="livemax"
+)
+
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+@contextmanager
+def observe(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        OPERATION_DURATION.labels(operation=operation).observe(time.perf_counter() - start)
+
+
+def timed(operation: str):
+    """Decorator form of ``observe`` for sync and async functions."""
+
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with observe(operation):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with observe(operation):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def record_upstream(*, upstream: str, operation: str, outcome: str, seconds: float) -> None:
+    UPSTREAM_DURATION.labels(upstream=upstream, operation=operation, outcome=outcome).observe(seconds)
+
+
+def record_openai_usage(*, operation: str, model: str | None, usage) -> None:
+    """Count tokens from an OpenAI ``usage`` object (chat or embeddings); ignores responses without one."""
+    if usage is None:
+        return
+    model = model or "unknown"
+    for kind in ("prompt_tokens", "completion_tokens"):
+        n = getattr(usage, kind, None)
+        if n:
+            OPENAI_TOKENS.labels(operation=operation, model=model, kind=kind.removesuffix("_tokens")).inc(n)
+
+
+def record_cache(cache: str, *, hits: int = 0, misses: int = 0, shared: int = 0) -> None:
+    """``shared`` counts lookups that joined an identical call already in flight."""
+    if hits:
+        CACHE_LOOKUPS.labels(cache=cache, result="hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache=cache, result="miss").inc(misses)
+    if shared:
+        CACHE_LOOKUPS.labels(cache=cache, result="shared").inc(shared)
+
+
+def _sample_threadpool() -> None:
+    # Must run on the event loop: anyio's default limiter is per-loop state.
+    from anyio import to_thread
+
+    limiter = to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    THREADPOOL_BUSY.set(stats.borrowed_tokens)
+    THREADPOOL_LIMIT.set(stats.total_tokens)
+    THREADPOOL_WAITING.set(stats.tasks_waiting)
+
+
+def _sample_upstreams() -> None:
+    from app.services.openai_clients import get_openai_clients
+    from app.services.resilience import get_upstream
+
+    if get_openai_clients.cache_info().currsize:
+        stats = get_openai_clients().pool_stats()
+        OPENAI_POOL_SATURATED.set(stats["saturated_total"])
+        for client in ("sync", "async"):
+            pool = stats[client]
+            OPENAI_POOL_CONNECTIONS.labels(client=client, state="in_use").set(pool["in_use"])
+            OPENAI_POOL_CONNECTIONS.labels(client=client, state="idle").set(pool["idle"])
+            OPENAI_POOL_WAITING.labels(client=client).set(pool["waiting"])
+
+    for upstream in ("supabase", "openai"):
+        CIRCUIT_STATE.labels(upstream=upstream).set(_CIRCUIT_STATES[get_upstream(upstream).breaker.state])
+
+
+async def sample_periodically(interval: float = SAMPLE_INTERVAL_SECONDS) -> None:
+    """Keep this worker's point-in-time gauges fresh for scrapes served by other workers (multiprocess mode)."""
+    while True:
+        try:
+            _sample_threadpool()
+            _sample_upstreams()
+        except Exception:
+            logger.exception("Failed to sample metrics")
+        await asyncio.sleep(interval)
+
+
+def mark_worker_exited() -> None:
+    """Drop this process's live gauges from the shared multiprocess directory."""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Sample point-in-time gauges and render every metric in the Prometheus text format.
+
+    In multiprocess mode the output aggregates every worker, not just this one.
+    """
+    _sample_threadpool()
+    _sample_upstreams()
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
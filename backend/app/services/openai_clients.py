@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+import threading
+from functools import lru_cache
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from app.core.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Read timeouts per kind of call; connect stays short everywhere so a dead
+# upstream is noticed quickly.
+OPERATION_TIMEOUTS: dict[str, httpx.Timeout] = {
+    "chat": httpx.Timeout(120.0, connect=5.0),
+    "vision": httpx.Timeout(90.0, connect=5.0),
+    "parse": httpx.Timeout(15.0, connect=5.0),
+    "barcode": httpx.Timeout(15.0, connect=5.0),
+    "summary": httpx.Timeout(20.0, connect=5.0),
+    "embeddings": httpx.Timeout(20.0, connect=5.0),
+}
+
+_DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _pool_snapshot(client: httpx.Client | httpx.AsyncClient) -> tuple[int, int, int]:
+    """(open connections, idle connections, requests waiting for a connection) from httpcore's pool."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    if pool is None:
+        return 0, 0, 0
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for c in connections if c.is_idle())
+    waiting = sum(1 for r in list(getattr(pool, "_requests", []) or []) if getattr(r, "connection", None) is None)
+    return len(connections), idle, waiting
+
+
+class OpenAIClients:
+    """Process-wide OpenAI clients sharing one tuned connection pool per flavour (sync/async).
+
+    Clients for each operation type are derived with ``with_options`` so they
+    reuse the same pool and only differ in timeouts. ``saturated_total``
+    counts requests issued while every pooled connection was busy.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_key: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+    ) -> None:
+        self.max_connections = max_connections
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning("h2 is not installed; OpenAI client falls back to HTTP/1.1")
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._lock = threading.Lock()
+        self.saturated_total = 0
+
+        self._http = httpx.Client(
+            http2=self.http2, limits=limits, timeout=_DEFAULT_TIMEOUT, event_hooks={"request": [self._on_request]}
+        )
+        self._async_http = httpx.AsyncClient(
+            http2=self.http2, limits=limits, timeout=_DEFAULT_TIMEOUT, event_hooks={"request": [self._on_async_request]}
+        )
+
+        # Retries are handled by app.services.resilience, not the SDK.
+        self.sync = OpenAI(api_key=api_key, http_client=self._http, max_retries=0)
+        self.async_ = AsyncOpenAI(api_key=api_key, http_client=self._async_http, max_retries=0)
+        self._sync_ops = {op: self.sync.with_options(timeout=t) for op, t in OPERATION_TIMEOUTS.items()}
+        self._async_ops = {op: self.async_.with_options(timeout=t) for op, t in OPERATION_TIMEOUTS.items()}
+
+    def for_operation(self, operation: str) -> OpenAI:
+        return self._sync_ops.get(operation) or self.sync
+
+    def async_for_operation(self, operation: str) -> AsyncOpenAI:
+        return self._async_ops.get(operation) or self.async_
+
+    def _note_saturation(self, client: httpx.Client | httpx.AsyncClient) -> None:
+        total, idle, _waiting = _pool_snapshot(client)
+        if total >= self.max_connections and idle == 0:
+            with self._lock:
+                self.saturated_total += 1
+
+    def _on_request(self, request: httpx.Request) -> None:
+        self._note_saturation(self._http)
+
+    async def _on_async_request(self, request: httpx.Request) -> None:
+        self._note_saturation(self._async_http)
+
+    def pool_stats(self) -> dict:
+        stats: dict = {"max_connections": self.max_connections, "http2": self.http2, "saturated_total": self.saturated_total}
+        for name, client in (("sync", self._http), ("async", self._async_http)):
+            total, idle, waiting = _pool_snapshot(client)
+            stats[name] = {"connections": total, "idle": idle, "in_use": total - idle, "waiting": waiting}
+        return stats
+
+    async def aclose(self) -> None:
+        self._http.close()
+        await self._async_http.aclose()
+
+
+@lru_cache
+def get_openai_clients() -> OpenAIClients:
+    settings = get_settings()
+    return OpenAIClients(
+        api_key=settings.openai_api_key,
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_keepalive_connections,
+        keepalive_expiry=settings.openai_keepalive_expiry_seconds,
+        http2=settings.openai_http2,
+    )
+
+
+async def close_openai_clients() -> None:
+    if get_openai_clients.cache_info().currsize:
+        await get_openai_clients().aclose()
+        get_openai_clients.cache_clear()
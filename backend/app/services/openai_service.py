@@ -4,22 +4,27 @@ import base64
 import json
 import logging
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from app.core.config import get_settings
+from app.services.openai_clients import get_openai_clients
+from app.services.resilience import openai_acall, openai_call
 
 
 logger = logging.getLogger(__name__)
 
 
-def _client() -> OpenAI:
-    settings = get_settings()
-    return OpenAI(api_key=settings.openai_api_key)
+def _client(operation: str) -> OpenAI:
+    return get_openai_clients().for_operation(operation)
+
 
+def _async_client(operation: str) -> AsyncOpenAI:
+    return get_openai_clients().async_for_operation(operation)
 
-def extract_item_from_image(*, filename: str, image_bytes: bytes) -> dict:
+
+async def extract_item_from_image(*, filename: str, image_bytes: bytes) -> dict:
     settings = get_settings()
-    client = _client()
+    client = _async_client("vision")
 
     b64 = base64.b64encode(image_bytes).decode("utf-8")
 
@@ -50,26 +55,29 @@ def extract_item_from_image(*, filename: str, image_bytes: bytes) -> dict:
     ]
 
     try:
-        resp = client.chat.completions.create(
-            model=settings.openai_vision_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You extract inventory fields. If uncertain, make best effort and keep strings short.",
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Extract inventory fields from this image."},
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": f"data:image/png;base64,{b64}"},
-                        },
-                    ],
-                },
-            ],
-            tools=tools,
-            tool_choice={"type": "function", "function": {"name": "extract_inventory_fields"}},
+        resp = await openai_acall(
+            lambda: client.chat.completions.create(
+                model=settings.openai_vision_model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You extract inventory fields. If uncertain, make best effort and keep strings short.",
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": "Extract inventory fields from this image."},
+                            {
+                                "type": "image_url",
+                                "image_url": {"url": f"data:image/png;base64,{b64}"},
+                            },
+                        ],
+                    },
+                ],
+                tools=tools,
+                tool_choice={"type": "function", "function": {"name": "extract_inventory_fields"}},
+            ),
+            operation="vision",
         )
     except Exception:
         logger.exception("OpenAI vision extraction failed")
@@ -86,9 +94,9 @@ def extract_item_from_image(*, filename: str, image_bytes: bytes) -> dict:
         return {}
 
 
-def extract_items_from_image_multi(*, filename: str, image_bytes: bytes) -> dict:
+async def extract_items_from_image_multi(*, filename: str, image_bytes: bytes) -> dict:
     settings = get_settings()
-    client = _client()
+    client = _async_client("vision")
 
     b64 = base64.b64encode(image_bytes).decode("utf-8")
 
@@ -142,28 +150,31 @@ def extract_items_from_image_multi(*, filename: str, image_bytes: bytes) -> dict
     ]
 
     try:
-        resp = client.chat.completions.create(
-            model=settings.openai_vision_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You extract multiple inventory items from an image. "
-                        "Return only items you can see with reasonable confidence. "
-                        "If uncertain about quantity, use 1. Keep names short. "
-                        "If you can infer a storage folder/location (e.g., Kitchen, Garage, Office, Closet), set location; otherwise null."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Detect and extract inventory items from this image."},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64}"}},
-                    ],
-                },
-            ],
-            tools=tools,
-            tool_choice={"type": "function", "function": {"name": "extract_inventory_items"}},
+        resp = await openai_acall(
+            lambda: client.chat.completions.create(
+                model=settings.openai_vision_model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You extract multiple inventory items from an image. "
+                            "Return only items you can see with reasonable confidence. "
+                            "If uncertain about quantity, use 1. Keep names short. "
+                            "If you can infer a storage folder/location (e.g., Kitchen, Garage, Office, Closet), set location; otherwise null."
+                        ),
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": "Detect and extract inventory items from this image."},
+                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64}"}},
+                        ],
+                    },
+                ],
+                tools=tools,
+                tool_choice={"type": "function", "function": {"name": "extract_inventory_items"}},
+            ),
+            operation="vision",
         )
     except Exception:
         logger.exception("OpenAI multi-item vision extraction failed")
@@ -183,7 +194,7 @@ def extract_items_from_image_multi(*, filename: str, image_bytes: bytes) -> dict
 
 def parse_search_query_to_keywords(*, query: str) -> dict:
     settings = get_settings()
-    client = _client()
+    client = _client("parse")
 
     tools = [
         {
@@ -206,17 +217,20 @@ def parse_search_query_to_keywords(*, query: str) -> dict:
     ]
 
     try:
-        resp = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You convert a natural language inventory intent into a compact search query. Return a short keyword-style search text plus optional category/location filters when clearly implied. Prefer action-oriented keywords (e.g., 'woodworking clamps', 'restock batteries', 'garage hand tools') over repeating the user's full sentence.",
-                },
-                {"role": "user", "content": query},
-            ],
-            tools=tools,
-            tool_choice={"type": "function", "function": {"name": "parse_inventory_search"}},
+        resp = openai_call(
+            lambda: client.chat.completions.create(
+                model=settings.openai_model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You convert a natural language inventory intent into a compact search query. Return a short keyword-style search text plus optional category/location filters when clearly implied. Prefer action-oriented keywords (e.g., 'woodworking clamps', 'restock batteries', 'garage hand tools') over repeating the user's full sentence.",
+                    },
+                    {"role": "user", "content": query},
+                ],
+                tools=tools,
+                tool_choice={"type": "function", "function": {"name": "parse_inventory_search"}},
+            ),
+            operation="parse",
         )
     except Exception:
         logger.exception("OpenAI search intent parsing failed")
@@ -234,7 +248,7 @@ def parse_search_query_to_keywords(*, query: str) -> dict:
 
 def interpret_barcode(*, barcode: str) -> dict:
     settings = get_settings()
-    client = _client()
+    client = _client("barcode")
 
     tools = [
         {
@@ -258,17 +272,20 @@ def interpret_barcode(*, barcode: str) -> dict:
     ]
 
     try:
-        resp = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You do not have access to online UPC databases. If you cannot infer, return null name/category and a brief note.",
-                },
-                {"role": "user", "content": f"Barcode: {barcode}"},
-            ],
-            tools=tools,
-            tool_choice={"type": "function", "function": {"name": "barcode_to_item_guess"}},
+        resp = openai_call(
+            lambda: client.chat.completions.create(
+                model=settings.openai_model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You do not have access to online UPC databases. If you cannot infer, return null name/category and a brief note.",
+                    },
+                    {"role": "user", "content": f"Barcode: {barcode}"},
+                ],
+                tools=tools,
+                tool_choice={"type": "function", "function": {"name": "barcode_to_item_guess"}},
+            ),
+            operation="barcode",
         )
     except Exception:
         logger.exception("OpenAI barcode interpretation failed")
@@ -286,24 +303,27 @@ def interpret_barcode(*, barcode: str) -> dict:
 
 def summarize_activity(*, action: str, details: dict) -> str:
     settings = get_settings()
-    client = _client()
+    client = _client("summary")
 
     try:
-        resp = client.chat.completions.create(
-            model=settings.openai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You write a single short activity log line describing what the user did. "
-                        "Be specific, factual, and concise. No extra punctuation beyond normal."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": json.dumps({"action": action, "details": details}),
-                },
-            ],
+        resp = openai_call(
+            lambda: client.chat.completions.create(
+                model=settings.openai_model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You write a single short activity log line describing what the user did. "
+                            "Be specific, factual, and concise. No extra punctuation beyond normal."
+                        ),
+                    },
+                    {
+                        "role": "user",
+                        "content": json.dumps({"action": action, "details": details}),
+                    },
+                ],
+            ),
+            operation="summary",
         )
     except Exception:
         logger.exception("OpenAI activity summarization failed")
@@ -311,3 +331,23 @@ def summarize_activity(*, action: str, details: dict) -> str:
 
     text = (resp.choices[0].message.content or "").strip()
     return text or f"{action}"
+
+
+def create_embeddings(*, texts: list[str]) -> list[list[float]]:
+    settings = get_settings()
+    client = _client("embeddings")
+
+    try:
+        resp = openai_call(
+            lambda: client.embeddings.create(
+                model=settings.openai_embedding_model,
+                input=texts,
+                dimensions=settings.embedding_dimensions,
+            ),
+            operation="embeddings",
+        )
+    except Exception:
+        logger.exception("OpenAI embeddings request failed")
+        raise
+
+    return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class InMemoryLimiterBackend:
+    """Token buckets and concurrency slots for a single worker process.
+
+    Slots are leases that lapse after ``lease_seconds``, so a request whose
+    release never runs (e.g. a stream dropped before it started) can't hold
+    one forever.
+    """
+
+    def __init__(self, *, max_buckets: int = 10_000) -> None:
+        self._max_buckets = max_buckets
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._slots: dict[str, dict[str, float]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def take_token(self, key: str, *, rate: float, burst: int) -> float:
+        """Take one token; return 0 on success, otherwise seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, at = self._buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - at) * rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now)
+                return (1.0 - tokens) / rate
+            self._buckets[key] = (tokens - 1.0, now)
+            if len(self._buckets) > self._max_buckets:
+                self._prune(now, rate=rate, burst=burst)
+            return 0.0
+
+    def _prune(self, now: float, *, rate: float, burst: int) -> None:
+        # A bucket that would be full again carries no state worth keeping.
+        full = [k for k, (tokens, at) in self._buckets.items() if tokens + (now - at) * rate >= burst]
+        for k in full:
+            del self._buckets[k]
+
+    def acquire_slot(self, key: str, *, limit: int, lease_seconds: float) -> str | None:
+        now = time.monotonic()
+        with self._lock:
+            held = self._slots[key]
+            for lease_id in [k for k, expires in held.items() if expires <= now]:
+                del held[lease_id]
+            if len(held) >= limit:
+                return None
+            lease_id = uuid.uuid4().hex
+            held[lease_id] = now + lease_seconds
+            return lease_id
+
+    def release_slot(self, key: str, lease_id: str) -> None:
+        with self._lock:
+            held = self._slots.get(key)
+            if held is None:
+                return
+            held.pop(lease_id, None)
+            if not held:
+                self._slots.pop(key, None)
+
+
+_TAKE_TOKEN_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - at) * rate)
+local wait = 0
+if tokens < 1 then
+  wait = (1 - tokens) / rate
+else
+  tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+_ACQUIRE_SLOT_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('PEXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2]) * 1000))
+return 1
+"""
+
+
+class RedisLimiterBackend:
+    """Buckets and slots shared by every worker through Redis (needs the optional ``redis`` package).
+
+    Slots are leases that lapse after ``lease_seconds``, which also covers
+    workers that crash while holding one.
+    """
+
+    def __init__(self, *, url: str, prefix: str = "ratelimit:") -> None:
+        import redis
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._prefix = prefix
+        self._take_token = self._redis.register_script(_TAKE_TOKEN_LUA)
+        self._acquire_slot = self._redis.register_script(_ACQUIRE_SLOT_LUA)
+
+    def take_token(self, key: str, *, rate: float, burst: int) -> float:
+        return float(self._take_token(keys=[f"{self._prefix}bucket:{key}"], args=[rate, burst]))
+
+    def acquire_slot(self, key: str, *, limit: int, lease_seconds: float) -> str | None:
+        lease_id = uuid.uuid4().hex
+        ok = self._acquire_slot(keys=[f"{self._prefix}slots:{key}"], args=[limit, lease_seconds, lease_id])
+        return lease_id if int(ok) else None
+
+    def release_slot(self, key: str, lease_id: str) -> None:
+        self._redis.zrem(f"{self._prefix}slots:{key}", lease_id)
+
+
+class LLMLease:
+    """Concurrency slots held by one LLM-backed request; ``release`` is idempotent."""
+
+    def __init__(self, limiter: LLMLimiter, slots: list[tuple[str, str]]) -> None:
+        self._limiter = limiter
+        self._slots = slots
+        self._lock = threading.Lock()
+        self.detached = False
+
+    def detach(self) -> LLMLease:
+        """Keep the slots past the end of the route; the caller must ``release`` (e.g. when a stream ends)."""
+        self.detached = True
+        return self
+
+    def release(self) -> None:
+        with self._lock:
+            slots, self._slots = self._slots, []
+        for key, lease_id in slots:
+            self._limiter._release(key, lease_id)
+
+
+class LLMLimiter:
+    """Per-user token bucket plus per-user and global concurrency caps for LLM-backed routes.
+
+    Over-limit requests are rejected immediately with ``RateLimitExceeded``
+    rather than queued, so a single busy client can't tie up the worker pool.
+    If the shared backend is unreachable the limiter fails open.
+    """
+
+    # Suggested Retry-After when only concurrency is exhausted; slots free up
+    # as soon as an in-flight call finishes.
+    BUSY_RETRY_AFTER = 1.0
+
+    def __init__(
+        self,
+        backend: InMemoryLimiterBackend | RedisLimiterBackend,
+        *,
+        rate_per_minute: float,
+        burst: int,
+        user_concurrency: int,
+        global_concurrency: int,
+        lease_seconds: float = 300.0,
+    ) -> None:
+        self._backend = backend
+        self._rate = rate_per_minute / 60.0
+        self._burst = burst
+        self._user_concurrency = user_concurrency
+        self._global_concurrency = global_concurrency
+        self._lease_seconds = lease_seconds
+
+    def acquire(self, *, user_id: str) -> LLMLease:
+        lease = LLMLease(self, [])
+        try:
+            self._acquire_slot(lease, f"user:{user_id}", self._user_concurrency, "Too many concurrent AI requests")
+            self._acquire_slot(lease, "global", self._global_concurrency, "AI is busy. Please try again shortly.")
+            wait = self._backend_call(lambda: self._backend.take_token(f"user:{user_id}", rate=self._rate, burst=self._burst), 0.0)
+        except BaseException:
+            lease.release()
+            raise
+        if wait > 0:
+            lease.release()
+            raise RateLimitExceeded("AI request rate limit exceeded", wait)
+        return lease
+
+    def _acquire_slot(self, lease: LLMLease, key: str, limit: int, reason: str) -> None:
+        if limit <= 0:
+            return
+        lease_id = self._backend_call(
+            lambda: self._backend.acquire_slot(key, limit=limit, lease_seconds=self._lease_seconds), ""
+        )
+        if lease_id is None:
+            raise RateLimitExceeded(reason, self.BUSY_RETRY_AFTER)
+        if lease_id:
+            lease._slots.append((key, lease_id))
+
+    def _release(self, key: str, lease_id: str) -> None:
+        self._backend_call(lambda: self._backend.release_slot(key, lease_id), None)
+
+    def _backend_call(self, fn, fallback):
+        try:
+            return fn()
+        except Exception:
+            logger.warning("Rate limit backend unavailable; allowing request", exc_info=True)
+            return fallback
+
+
+def retry_after_header(seconds: float) -> dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+@lru_cache
+def get_llm_limiter() -> LLMLimiter:
+    settings = get_settings()
+    backend: InMemoryLimiterBackend | RedisLimiterBackend = InMemoryLimiterBackend()
+    if settings.rate_limit_redis_url:
+        # lru_cache does not cache exceptions, so a failure here would fail every request.
+        try:
+            backend = RedisLimiterBackend(url=settings.rate_limit_redis_url)
+        except ImportError:
+            logger.error("RATE_LIMIT_REDIS_URL is set but redis is not installed; LLM limits are per worker")
+        except Exception:
+            logger.exception("Could not set up the Redis rate limiter; LLM limits are per worker")
+    return LLMLimiter(
+        backend,
+        rate_per_minute=settings.llm_rate_per_minute,
+        burst=settings.llm_burst,
+        user_concurrency=settings.llm_user_concurrency,
+        global_concurrency=settings.llm_global_concurrency,
+    )
@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TypeVar
+
+import httpx
+import openai
+from postgrest.exceptions import APIError
+from storage3.exceptions import StorageApiError
+
+from app.core.config import get_settings
+from app.services.metrics import record_openai_usage, record_upstream
+from app.services.tracing import Span, span
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SUPABASE = "supabase"
+OPENAI = "openai"
+
+
+class UpstreamUnavailableError(RuntimeError):
+    """An upstream call was refused or abandoned without reaching the upstream."""
+
+    retry_after: float | None = None
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    def __init__(self, upstream: str, retry_after: float) -> None:
+        super().__init__(f"{upstream} is temporarily unavailable")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    pass
+
+
+# Absolute time.monotonic() by which the current request must be answered.
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    """Bound upstream work in this context to ``seconds`` from now (never extends an outer deadline)."""
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(at, outer))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and fails fast for ``reset_timeout`` seconds.
+
+    After the timeout a single probe call is let through (half-open); its
+    outcome closes the circuit or re-opens it for another period.
+    """
+
+    def __init__(self, name: str, *, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self._reset_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self._reset_timeout:
+                raise CircuitOpenError(self.name, self._reset_timeout - waited)
+            if self._probing:
+                raise CircuitOpenError(self.name, 1.0)
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit closed: upstream=%s", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def abandon_probe(self) -> None:
+        """A probe was cancelled before finishing; let the next call probe instead."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self._failure_threshold):
+                if not self._probing:
+                    logger.warning("Circuit opened: upstream=%s failures=%s", self.name, self._failures)
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class RetryBudget:
+    """Caps retries at roughly ``ratio`` of recent calls so retries can't multiply load during an outage.
+
+    Each call deposits ``ratio`` tokens (up to ``max_tokens``); each retry spends one.
+    """
+
+    def __init__(self, *, ratio: float = 0.2, max_tokens: float = 10.0) -> None:
+        self._ratio = ratio
+        self._max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        with self._lock:
+            self._tokens = min(self._max_tokens, self._tokens + self._ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 2.0
+
+    def backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries from many workers instead of retrying in lockstep.
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class Upstream:
+    """Retry, circuit-breaking and deadline handling for calls to one upstream service."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        is_retryable: Callable[[BaseException], bool],
+        is_client_error: Callable[[BaseException], bool] = lambda exc: False,
+        policy: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        budget: RetryBudget | None = None,
+    ) -> None:
+        self.name = name
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(name)
+        self.budget = budget or RetryBudget()
+        self._is_retryable = is_retryable
+        self._is_client_error = is_client_error
+
+    def _before_attempt(self) -> None:
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceededError(f"Request deadline exceeded before calling {self.name}")
+        self.breaker.before_call()
+
+    def _after_failure(self, exc: Exception, *, attempt: int, retry: bool) -> float | None:
+        """Record ``exc``; return the delay before the next attempt, or None to give up."""
+        if not self._is_retryable(exc):
+            if self._is_client_error(exc):
+                # The upstream answered; the request itself was bad.
+                self.breaker.record_success()
+            else:
+                # Says nothing about the upstream's health (e.g. a bug in ``fn``).
+                self.breaker.abandon_probe()
+            return None
+
+        self.breaker.record_failure()
+        if not retry or attempt + 1 >= self.policy.max_attempts:
+            return None
+
+        delay = self.policy.backoff(attempt)
+        left = remaining()
+        if left is not None and left <= delay:
+            return None
+        if not self.budget.try_spend():
+            logger.warning("Retry budget exhausted: upstream=%s", self.name)
+            return None
+
+        logger.warning("Retrying %s call: attempt=%s error=%s", self.name, attempt + 1, type(exc).__name__)
+        return delay
+
+    def _record(self, operation: str, outcome: str, start: float) -> None:
+        record_upstream(upstream=self.name, operation=operation, outcome=outcome, seconds=time.perf_counter() - start)
+
+    def call(self, fn: Callable[[], T], *, retry: bool = True, operation: str = "call") -> T:
+        self.budget.record_call()
+        attempt = 0
+        while True:
+            self._before_attempt()
+            start = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                self._record(operation, "error", start)
+                delay = self._after_failure(e, attempt=attempt, retry=retry)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.abandon_probe()
+                raise
+            self._record(operation, "ok", start)
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], *, retry: bool = True, operation: str = "call") -> T:
+        self.budget.record_call()
+        attempt = 0
+        while True:
+            self._before_attempt()
+            start = time.perf_counter()
+            try:
+                result = await fn()
+            except Exception as e:
+                self._record(operation, "error", start)
+                delay = self._after_failure(e, attempt=attempt, retry=retry)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.abandon_probe()
+                raise
+            self._record(operation, "ok", start)
+            self.breaker.record_success()
+            return result
+
+
+# PostgREST codes for a database it can't reach or use, and SQLSTATE classes
+# for connection loss, exhausted resources, shutdowns and statement timeouts.
+_PGRST_UNAVAILABLE = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+_SQLSTATE_UNAVAILABLE = ("08", "53", "57P", "57014")
+
+
+def _supabase_status(exc: BaseException) -> int | None:
+    """HTTP status behind a Supabase client error, when the client kept it."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code
+    if isinstance(exc, StorageApiError):
+        status = exc.status
+    elif isinstance(exc, APIError):
+        # Non-JSON error bodies (gateway errors) carry the status as the code;
+        # JSON ones carry a PostgREST code or a SQLSTATE such as "23505".
+        if not isinstance(exc.code, int):
+            return None
+        status = exc.code
+    elif isinstance(exc.__context__, httpx.HTTPStatusError):
+        # storage3 fails to parse a non-JSON error body while handling the status error.
+        return exc.__context__.response.status_code
+    else:
+        return None
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def _supabase_retryable(exc: BaseException) -> bool:
+    status = _supabase_status(exc)
+    if status is not None:
+        return status >= 500 or status == 429
+    if isinstance(exc, httpx.HTTPError):
+        return True
+    if isinstance(exc, APIError):
+        code = str(exc.code or "")
+        return code in _PGRST_UNAVAILABLE or code.startswith(_SQLSTATE_UNAVAILABLE)
+    return False
+
+
+def _supabase_client_error(exc: BaseException) -> bool:
+    status = _supabase_status(exc)
+    if status is not None:
+        return 400 <= status < 500
+    # PostgREST answered with a database error about this request (constraint, missing column, ...).
+    return isinstance(exc, APIError) and not _supabase_retryable(exc)
+
+
+def _openai_retryable(exc: BaseException) -> bool:
+    # APIConnectionError covers timeouts; 429 and 5xx are transient by definition.
+    return isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+def _openai_client_error(exc: BaseException) -> bool:
+    return isinstance(exc, openai.APIStatusError) and exc.status_code < 500
+
+
+@lru_cache
+def get_upstream(name: str) -> Upstream:
+    settings = get_settings()
+    breaker = CircuitBreaker(
+        name,
+        failure_threshold=settings.circuit_failure_threshold,
+        reset_timeout=settings.circuit_reset_seconds,
+    )
+    if name == SUPABASE:
+        return Upstream(
+            name,
+            is_retryable=_supabase_retryable,
+            is_client_error=_supabase_client_error,
+            policy=RetryPolicy(max_attempts=3, base_delay=0.1),
+            breaker=breaker,
+        )
+    if name == OPENAI:
+        return Upstream(
+            name,
+            is_retryable=_openai_retryable,
+            is_client_error=_openai_client_error,
+            policy=RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=8.0),
+            breaker=breaker,
+        )
+    raise ValueError(f"Unknown upstream {name!r}")
+
+
+def supabase_call(fn: Callable[[], T], *, retry: bool = True, operation: str = "query") -> T:
+    with span(f"supabase.{operation}") as s:
+        resp = get_upstream(SUPABASE).call(fn, retry=retry, operation=operation)
+        data = getattr(resp, "data", None)
+        if isinstance(data, list):
+            s.set("rows", len(data))
+        return resp
+
+
+async def supabase_acall(fn: Callable[[], Awaitable[T]], *, retry: bool = True, operation: str = "query") -> T:
+    with span(f"supabase.{operation}"):
+        return await get_upstream(SUPABASE).acall(fn, retry=retry, operation=operation)
+
+
+def _record_openai_response(s: Span, operation: str, resp) -> None:
+    usage = getattr(resp, "usage", None)
+    record_openai_usage(operation=operation, model=getattr(resp, "model", None), usage=usage)
+    s.set("prompt_tokens", getattr(usage, "prompt_tokens", None))
+    s.set("completion_tokens", getattr(usage, "completion_tokens", None))
+
+
+def openai_call(fn: Callable[[], T], *, operation: str, retry: bool = True) -> T:
+    """Call OpenAI under the shared policy and count the response's token usage (streams report their own)."""
+    with span(f"openai.{operation}") as s:
+        resp = get_upstream(OPENAI).call(fn, retry=retry, operation=operation)
+        _record_openai_response(s, operation, resp)
+        return resp
+
+
+async def openai_acall(fn: Callable[[], Awaitable[T]], *, operation: str, retry: bool = True) -> T:
+    with span(f"openai.{operation}") as s:
+        resp = await get_upstream(OPENAI).acall(fn, retry=retry, operation=operation)
+        _record_openai_response(s, operation, resp)
+        return resp
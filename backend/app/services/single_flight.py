@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import lru_cache
+from typing import Any, TypeVar
+
+from app.core.config import get_settings
+from app.services.metrics import record_cache
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+def _clone(value):
+    # Callers decorate rows in place (signed URLs etc.), so every caller gets
+    # its own top-level containers; nested values are replaced, not mutated.
+    if isinstance(value, list):
+        return [dict(v) if isinstance(v, dict) else v for v in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class SingleFlight:
+    """Collapses concurrent identical reads into one execution, then caches the result briefly.
+
+    Keys start with ``(user_id, scope)``. Callers arriving while a call for
+    the same key is in flight wait for it and share its result; results are
+    then served for ``ttl_seconds``. Errors are shared with waiters but never
+    cached. ``invalidate`` drops a user's cached results for a scope, and
+    repository writes trigger it through ``collection_versions.mark_changed``.
+    """
+
+    def __init__(self, *, ttl_seconds: float = 2.0, max_entries: int = 10_000) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._inflight: dict[Hashable, _Call] = {}
+        self._results: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def do(self, key: tuple, fn: Callable[[], T], *, ttl: float | None = None) -> T:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[1] > now:
+                self._results.move_to_end(key)
+                record_cache("single_flight", hits=1)
+                return _clone(cached[0])
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            record_cache("single_flight", shared=1)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _clone(call.result)
+
+        record_cache("single_flight", misses=1)
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # An invalidation during the call already removed the entry;
+                # its possibly stale result must not be cached.
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+                    if call.error is None:
+                        self._store(key, call.result, ttl=self._ttl_seconds if ttl is None else ttl)
+            call.done.set()
+        return _clone(call.result)
+
+    def _store(self, key: Hashable, value: Any, *, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._results[key] = (value, time.monotonic() + ttl)
+        self._results.move_to_end(key)
+        while len(self._results) > self._max_entries:
+            self._results.popitem(last=False)
+
+    def invalidate(self, *, user_id: str, scope: str) -> None:
+        with self._lock:
+            for key in [k for k in self._results if k[:2] == (user_id, scope)]:
+                del self._results[key]
+            for key in [k for k in self._inflight if k[:2] == (user_id, scope)]:
+                del self._inflight[key]
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    return SingleFlight(ttl_seconds=get_settings().single_flight_ttl_seconds)
+
+
+def shared_read(scope: str):
+    """Decorator for keyword-only repository reads taking ``user_id``; see ``SingleFlight``.
+
+    ``scope`` is a collection from ``collection_versions``. Its current version
+    is part of the key, because ``invalidate`` only reaches this process: after
+    another worker's write, the first read that sees the new version (and so
+    the new ETag) misses instead of returning the old cached result. Without a
+    version, concurrent calls are still shared but nothing is cached.
+    """
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*, user_id: str, **kwargs):
+            # Imported here: collection_versions imports this module.
+            from app.services.collection_versions import get_collection_versions
+
+            version = get_collection_versions().get(user_id=user_id, collection=scope)
+            key = (user_id, scope, version, fn.__name__, tuple(sorted(kwargs.items())))
+            return get_single_flight().do(
+                key, lambda: fn(user_id=user_id, **kwargs), ttl=0 if version is None else None
+            )
+
+        return wrapper
+
+    return decorate
@@ -1,16 +1,58 @@
 from __future__ import annotations
 
+import hashlib
+import logging
 import mimetypes
-from dataclasses import dataclass
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import BinaryIO
+from urllib.parse import quote
+
+import httpx
+from fastapi import UploadFile
 
 from app.core.config import get_settings
+from app.services.metrics import record_cache
+from app.services.resilience import supabase_acall, supabase_call
 from app.services.supabase_client import get_supabase_admin
+from app.services.tracing import traced
+
+
+logger = logging.getLogger(__name__)
+
+# Upload bodies are piped to Storage in chunks of this size, so peak memory per
+# upload stays at roughly one chunk regardless of the file size.
+UPLOAD_CHUNK_BYTES = 256 * 1024
+
+# Longest-edge sizes (px) of the WebP derivatives stored next to each image.
+THUMBNAIL_SIZES = (128, 256, 512)
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class EmptyUploadError(ValueError):
+    pass
+
+
+class ForeignObjectError(ValueError):
+    """A record points at a storage path that isn't one of the user's stored objects."""
 
 
 @dataclass
 class StoredImage:
     path: str
     url: str
+    size_bytes: int = 0
+    sha256: str | None = None
+    deduplicated: bool = False
+    thumbnail_urls: dict[str, str] = field(default_factory=dict)
 
 
 def _guess_content_type(filename: str) -> str:
@@ -18,47 +60,492 @@ def _guess_content_type(filename: str) -> str:
     return ct or "application/octet-stream"
 
 
-def upload_image(*, user_id: str, filename: str, content: bytes) -> StoredImage:
+def _object_endpoint(*, bucket: str, path: str) -> str:
     settings = get_settings()
-    supabase = get_supabase_admin()
+    base = str(settings.supabase_url).rstrip("/")
+    return f"{base}/storage/v1/object/{bucket}/{quote(path)}"
 
-    safe_filename = filename.replace("/", "_").replace("\\", "_")
-    path = f"{user_id}/{safe_filename}"
 
-    bucket = supabase.storage.from_(settings.supabase_storage_bucket)
-    bucket.upload(
-        path,
-        content,
-        file_options={"content-type": _guess_content_type(filename), "x-upsert": "true"},
-    )
+class SignedUrlCache:
+    """Signed URLs keyed by (bucket, path), held until shortly before they expire."""
+
+    def __init__(self, *, max_entries: int = 10_000) -> None:
+        self._entries: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def get_many(self, *, bucket: str, paths: list[str]) -> dict[str, str]:
+        now = time.time()
+        found: dict[str, str] = {}
+        with self._lock:
+            for path in paths:
+                entry = self._entries.get((bucket, path))
+                if entry is None:
+                    continue
+                url, expires_at = entry
+                if expires_at <= now:
+                    self._entries.pop((bucket, path), None)
+                    continue
+                self._entries.move_to_end((bucket, path))
+                found[path] = url
+        return found
 
+    def put_many(self, *, bucket: str, urls: dict[str, str], expires_at: float) -> None:
+        with self._lock:
+            for path, url in urls.items():
+                self._entries[(bucket, path)] = (url, expires_at)
+                self._entries.move_to_end((bucket, path))
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+_signed_url_cache = SignedUrlCache()
+
+
+def _signed_url_margin(ttl: int) -> int:
+    # Stop serving a URL once less than 10% (min. one minute) of its lifetime is left.
+    return max(60, ttl // 10)
+
+
+def signed_url_epoch() -> int | None:
+    """Counter that advances at least as often as cached signed URLs stop being served.
+
+    Folding it into a listing's ETag guarantees a 304 never extends the life of
+    a signed URL past its expiry. None when objects are served publicly.
+    """
+    settings = get_settings()
     if settings.supabase_storage_public:
-        url = bucket.get_public_url(path)
-        return StoredImage(path=path, url=url)
+        return None
+    return int(time.time() // _signed_url_margin(settings.supabase_storage_signed_url_ttl_seconds))
+
+
+def _sign_paths(*, bucket: str, paths: list[str]) -> dict[str, str]:
+    settings = get_settings()
+    ttl = settings.supabase_storage_signed_url_ttl_seconds
+
+    cached = _signed_url_cache.get_many(bucket=bucket, paths=paths)
+    missing = [p for p in dict.fromkeys(paths) if p not in cached]
+    record_cache("signed_urls", hits=len(cached), misses=len(missing))
+    if not missing:
+        return cached
 
-    signed = bucket.create_signed_url(path, settings.supabase_storage_signed_url_ttl_seconds)
-    url = signed.get("signedURL") or signed.get("signedUrl")
-    return StoredImage(path=path, url=url)
+    issued_at = time.time()
+    resp = supabase_call(
+        lambda: get_supabase_admin().storage.from_(bucket).create_signed_urls(missing, ttl), operation="storage.sign"
+    )
 
+    signed: dict[str, str] = {}
+    for entry in resp or []:
+        if not isinstance(entry, dict) or entry.get("error"):
+            continue
+        url = entry.get("signedURL") or entry.get("signedUrl")
+        if entry.get("path") and url:
+            signed[entry["path"]] = url
+
+    margin = _signed_url_margin(ttl)
+    _signed_url_cache.put_many(bucket=bucket, urls=signed, expires_at=issued_at + ttl - margin)
+
+    return {**cached, **signed}
+
+
+@traced("storage.object_urls")
+def object_urls(*, bucket: str, paths: list[str]) -> dict[str, str]:
+    """Resolve display URLs for many objects: public URLs, or signed URLs in one batch call."""
+    paths = [p for p in paths if p]
+    if not paths:
+        return {}
+
+    if get_settings().supabase_storage_public:
+        storage_bucket = get_supabase_admin().storage.from_(bucket)
+        return {p: storage_bucket.get_public_url(p) for p in paths}
+
+    return _sign_paths(bucket=bucket, paths=paths)
+
+
+def _object_url(*, bucket: str, path: str) -> str:
+    return object_urls(bucket=bucket, paths=[path]).get(path) or ""
+
+
+@traced("storage.stream_upload")
+async def stream_upload(
+    *,
+    bucket: str,
+    path: str,
+    upload: UploadFile,
+    content_type: str,
+    max_bytes: int,
+) -> tuple[int, str]:
+    """Pipe ``upload`` to Storage chunk by chunk; returns ``(size_bytes, sha256)``.
+
+    The size limit is enforced while streaming, so an oversized body is aborted
+    mid-request instead of being buffered first. The write is an upsert, so a
+    failed attempt is retried from the start of the spooled file under the
+    Supabase upstream policy.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+    if not await upload.read(UPLOAD_CHUNK_BYTES):
+        raise EmptyUploadError("Empty file")
 
-def upload_document(*, user_id: str, filename: str, content: bytes) -> StoredImage:
     settings = get_settings()
-    supabase = get_supabase_admin()
+    headers = {
+        "apikey": settings.supabase_service_role_key,
+        "authorization": f"Bearer {settings.supabase_service_role_key}",
+        "content-type": content_type,
+        "x-upsert": "true",
+    }
+
+    async def _attempt() -> tuple[int, str]:
+        await upload.seek(0)
+        hasher = hashlib.sha256()
+        size = 0
+
+        async def _body():
+            nonlocal size
+            while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                hasher.update(chunk)
+                yield chunk
+
+        async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)) as client:
+            resp = await client.post(_object_endpoint(bucket=bucket, path=path), content=_body(), headers=headers)
+            resp.raise_for_status()
+        return size, hasher.hexdigest()
+
+    return await supabase_acall(_attempt, operation="storage.upload")
+
+
+async def hash_upload(upload: UploadFile, *, max_bytes: int) -> tuple[int, str]:
+    """Hash the spooled ``upload`` chunk by chunk and rewind it; returns ``(size_bytes, sha256)``."""
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+    hasher = hashlib.sha256()
+    size = 0
+    while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+        hasher.update(chunk)
+
+    if size == 0:
+        raise EmptyUploadError("Empty file")
+
+    await upload.seek(0)
+    return size, hasher.hexdigest()
+
+
+def _extension(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,8}", ext) else ""
+
+
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
 
-    safe_filename = filename.replace("/", "_").replace("\\", "_")
-    path = f"{user_id}/docs/{safe_filename}"
+def _blob_referenced(*, bucket: str, path: str) -> bool:
+    """Whether a stored row already references ``path``, i.e. its object (and thumbnails) exist."""
+    try:
+        resp = supabase_call(
+            lambda: get_supabase_admin()
+            .table("storage_blobs")
+            .select("ref_count")
+            .eq("bucket", bucket)
+            .eq("path", path)
+            .limit(1)
+            .execute()
+        )
+    except Exception:
+        # Without the blob table every upload is treated as new; the write is an
+        # idempotent upsert of identical content, so this only costs bandwidth.
+        logger.exception("Failed to look up storage blob")
+        return False
+    rows = resp.data or []
+    return bool(rows) and int(rows[0].get("ref_count") or 0) > 0
 
-    bucket = supabase.storage.from_("documents")
-    bucket.upload(
-        path,
-        content,
-        file_options={"content-type": _guess_content_type(filename), "x-upsert": "true"},
+
+def _register_blob(*, bucket: str, path: str, user_id: str, sha256: str, size_bytes: int) -> None:
+    """Record a stored object as ``user_id``'s blob (unreferenced) if it isn't tracked yet."""
+    supabase_call(
+        lambda: get_supabase_admin()
+        .rpc(
+            "register_storage_blob",
+            {"p_bucket": bucket, "p_path": path, "p_user_id": user_id, "p_sha256": sha256, "p_size_bytes": size_bytes},
+        )
+        .execute()
     )
 
-    if settings.supabase_storage_public:
-        url = bucket.get_public_url(path)
-        return StoredImage(path=path, url=url)
 
-    signed = bucket.create_signed_url(path, settings.supabase_storage_signed_url_ttl_seconds)
-    url = signed.get("signedURL") or signed.get("signedUrl")
-    return StoredImage(path=path, url=url)
+def owned_objects(*, bucket: str, user_id: str, paths: list[str]) -> set[str]:
+    """The subset of ``paths`` that are stored objects of ``user_id``."""
+    candidates = [p for p in dict.fromkeys(paths) if p and p.startswith(f"{user_id}/")]
+    if not candidates:
+        return set()
+    resp = supabase_call(
+        lambda: get_supabase_admin()
+        .table("storage_blobs")
+        .select("path")
+        .eq("bucket", bucket)
+        .eq("user_id", user_id)
+        .in_("path", candidates)
+        .execute()
+    )
+    return {r["path"] for r in resp.data or [] if isinstance(r, dict) and r.get("path")}
+
+
+def _release_blob(*, bucket: str, path: str, user_id: str) -> int | None:
+    """Drop one of ``user_id``'s references to an object; returns the remaining count.
+
+    None when the path isn't a referenced blob of that user.
+    """
+    resp = supabase_call(
+        lambda: get_supabase_admin()
+        .rpc("release_storage_blob", {"p_bucket": bucket, "p_path": path, "p_user_id": user_id})
+        .execute(),
+        retry=False,
+    )
+    return None if resp.data is None else int(resp.data)
+
+
+async def _store_content_addressed(
+    *,
+    bucket: str,
+    user_id: str,
+    prefix: str,
+    upload: UploadFile,
+    filename: str,
+    max_bytes: int,
+) -> StoredImage:
+    """Write ``upload`` under its content hash unless a stored row already references that object.
+
+    The object is registered as the user's blob, so records may point at it,
+    but no reference is taken here: the caller's item/document write does that
+    through ``acquire_object``, so an upload nobody saves leaves no count
+    behind. Concurrent first uploads of the same bytes both write them, which
+    is an idempotent upsert.
+    """
+    size, digest = await hash_upload(upload, max_bytes=max_bytes)
+    path = f"{prefix}/{digest}{_extension(filename)}"
+
+    deduplicated = _blob_referenced(bucket=bucket, path=path)
+    if not deduplicated:
+        await stream_upload(
+            bucket=bucket,
+            path=path,
+            upload=upload,
+            content_type=_guess_content_type(filename),
+            max_bytes=max_bytes,
+        )
+        _register_blob(bucket=bucket, path=path, user_id=user_id, sha256=digest, size_bytes=size)
+
+    url = _object_url(bucket=bucket, path=path)
+    return StoredImage(path=path, url=url, size_bytes=size, sha256=digest, deduplicated=deduplicated)
+
+
+@traced("storage.upload_image")
+async def upload_image(*, user_id: str, upload: UploadFile) -> StoredImage:
+    settings = get_settings()
+    return await _store_content_addressed(
+        bucket=settings.supabase_storage_bucket,
+        user_id=user_id,
+        prefix=user_id,
+        upload=upload,
+        filename=upload.filename or "upload.png",
+        max_bytes=settings.max_image_mb * 1024 * 1024,
+    )
+
+
+@traced("storage.upload_document")
+async def upload_document(*, user_id: str, upload: UploadFile) -> StoredImage:
+    settings = get_settings()
+    return await _store_content_addressed(
+        bucket="documents",
+        user_id=user_id,
+        prefix=f"{user_id}/docs",
+        upload=upload,
+        filename=upload.filename or "upload",
+        max_bytes=settings.max_document_mb * 1024 * 1024,
+    )
+
+
+@traced("storage.acquire_object")
+def acquire_object(*, bucket: str, path: str, user_id: str, size_bytes: int | None = None) -> int:
+    """Add a reference to ``path`` for a row that now points at it; returns the new count.
+
+    Call after the row is written. Only the user's own objects are counted;
+    anything else returns 0.
+    """
+    if not path.startswith(f"{user_id}/"):
+        return 0
+    stem = os.path.splitext(os.path.basename(path))[0]
+    # Reference counting isn't idempotent, so a failed call is never retried.
+    resp = supabase_call(
+        lambda: get_supabase_admin()
+        .rpc(
+            "acquire_storage_blob",
+            {
+                "p_bucket": bucket,
+                "p_path": path,
+                "p_user_id": user_id,
+                "p_sha256": stem if _SHA256_RE.fullmatch(stem) else None,
+                "p_size_bytes": size_bytes,
+            },
+        )
+        .execute(),
+        retry=False,
+    )
+    return int(resp.data or 0)
+
+
+@traced("storage.release_object")
+def release_object(*, bucket: str, path: str, user_id: str) -> bool:
+    """Drop one of ``user_id``'s references to ``path`` and delete the object (and its thumbnails) once unreferenced.
+
+    Returns True if the object was removed from storage. Paths the user doesn't
+    own, or that aren't tracked, are left alone.
+    """
+    if not path.startswith(f"{user_id}/"):
+        return False
+    remaining = _release_blob(bucket=bucket, path=path, user_id=user_id)
+    if remaining is None or remaining > 0:
+        return False
+
+    paths = [path, *(thumbnail_path(path, size) for size in THUMBNAIL_SIZES)]
+    supabase_call(lambda: get_supabase_admin().storage.from_(bucket).remove(paths), operation="storage.remove")
+    return True
+
+
+def thumbnail_path(path: str, size: int) -> str:
+    return f"{path}.thumb-{size}.webp"
+
+
+def render_thumbnails(source: BinaryIO) -> dict[int, bytes]:
+    """Encode one WebP per ``THUMBNAIL_SIZES`` entry from an image file object.
+
+    Returns an empty dict if Pillow is unavailable or the image can't be decoded.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning("Pillow not installed; skipping thumbnail generation")
+        return {}
+
+    largest = max(THUMBNAIL_SIZES)
+    out: dict[int, bytes] = {}
+    try:
+        with Image.open(source) as img:
+            # Lets JPEG decode at a reduced scale instead of full resolution.
+            img.draft("RGB", (largest, largest))
+            base = ImageOps.exif_transpose(img).convert("RGB")
+            for size in sorted(THUMBNAIL_SIZES, reverse=True):
+                base.thumbnail((size, size))
+                buf = BytesIO()
+                base.save(buf, format="WEBP", quality=80, method=4)
+                out[size] = buf.getvalue()
+    except Exception:
+        logger.exception("Failed to render thumbnails")
+        return {}
+
+    return out
+
+
+@traced("storage.store_thumbnails")
+def store_thumbnails(*, bucket: str, path: str, source: BinaryIO) -> dict[str, str]:
+    """Render and upload the derivatives for the object at ``path``; returns size -> URL."""
+    rendered = render_thumbnails(source)
+    if not rendered:
+        return {}
+
+    storage_bucket = get_supabase_admin().storage.from_(bucket)
+    for size, content in rendered.items():
+        supabase_call(
+            lambda: storage_bucket.upload(
+                thumbnail_path(path, size),
+                content,
+                file_options={"content-type": "image/webp", "x-upsert": "true"},
+            ),
+            operation="storage.upload",
+        )
+
+    return thumbnail_urls(bucket=bucket, path=path)
+
+
+def thumbnail_urls(*, bucket: str, path: str) -> dict[str, str]:
+    urls = object_urls(bucket=bucket, paths=[thumbnail_path(path, size) for size in THUMBNAIL_SIZES])
+    return {str(size): urls[thumbnail_path(path, size)] for size in THUMBNAIL_SIZES if thumbnail_path(path, size) in urls}
+
+
+def _own_image_path(item) -> str | None:
+    """The item's ``image_path`` if it lies under its owner's prefix; other paths are never signed."""
+    if not isinstance(item, dict):
+        return None
+    image_path, user_id = item.get("image_path"), item.get("user_id")
+    if not image_path or not user_id or not image_path.startswith(f"{user_id}/"):
+        return None
+    return image_path
+
+
+def attach_thumbnail_urls(items: list[dict]) -> list[dict]:
+    """Set fresh ``image_url`` and ``thumbnail_urls`` on items with a stored ``image_path``.
+
+    All URLs for the listing are resolved with a single batch signing call.
+    """
+    bucket = get_settings().supabase_storage_bucket
+    image_paths = [p for p in map(_own_image_path, items) if p]
+    if not image_paths:
+        return items
+
+    wanted = list(image_paths)
+    for p in image_paths:
+        wanted.extend(thumbnail_path(p, size) for size in THUMBNAIL_SIZES)
+    try:
+        urls = object_urls(bucket=bucket, paths=wanted)
+    except Exception:
+        logger.exception("Failed to resolve item image URLs")
+        return items
+
+    for it in items:
+        image_path = _own_image_path(it)
+        if not image_path:
+            continue
+        if image_path in urls:
+            it["image_url"] = urls[image_path]
+        it["thumbnail_urls"] = {
+            str(size): urls[thumbnail_path(image_path, size)]
+            for size in THUMBNAIL_SIZES
+            if thumbnail_path(image_path, size) in urls
+        }
+    return items
+
+
+def attach_document_urls(documents: list[dict]) -> list[dict]:
+    """Set a fresh ``url`` (and ``thumbnail_urls`` for images) on every document in one batch signing call."""
+    paths: list[str] = []
+    for d in documents:
+        if not isinstance(d, dict) or not d.get("storage_path"):
+            continue
+        paths.append(d["storage_path"])
+        if d.get("file_type") == "image":
+            paths.extend(thumbnail_path(d["storage_path"], size) for size in THUMBNAIL_SIZES)
+
+    try:
+        urls = object_urls(bucket="documents", paths=paths)
+    except Exception:
+        logger.exception("Failed to resolve document URLs")
+        return documents
+
+    for d in documents:
+        if not isinstance(d, dict) or d.get("storage_path") not in urls:
+            continue
+        storage_path = d["storage_path"]
+        d["url"] = urls[storage_path]
+        if d.get("file_type") == "image":
+            d["thumbnail_urls"] = {
+                str(size): urls[thumbnail_path(storage_path, size)]
+                for size in THUMBNAIL_SIZES
+                if thumbnail_path(storage_path, size) in urls
+            }
+    return documents
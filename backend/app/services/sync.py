@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+from app.services.storage import attach_document_urls, attach_thumbnail_urls
+from app.services.sync_repo import fetch_sync_changes
+
+
+# The next token starts this far before the server time of the current sync, so
+# a write whose transaction began before the snapshot but committed after it is
+# still picked up. Clients receive a few records twice; applying them is idempotent.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class InvalidSyncTokenError(ValueError):
+    pass
+
+
+def encode_sync_token(since: datetime) -> str:
+    raw = json.dumps({"v": 1, "t": since.isoformat()}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> datetime:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        if data.get("v") != 1:
+            raise ValueError("unsupported version")
+        since = datetime.fromisoformat(data["t"])
+    except Exception as e:
+        raise InvalidSyncTokenError("Invalid sync token") from e
+    if since.tzinfo is None:
+        raise InvalidSyncTokenError("Invalid sync token")
+    return since
+
+
+def sync_changes(*, user_id: str, since_token: str | None) -> dict:
+    """Changes since ``since_token`` (or everything, with ``full=True``) plus the token for the next call."""
+    since = decode_sync_token(since_token) if since_token else None
+    data = fetch_sync_changes(user_id=user_id, since=since.isoformat() if since else None)
+
+    next_since = data["server_time"] - SYNC_OVERLAP
+    if since is not None and next_since < since:
+        next_since = since
+
+    return {
+        "full": bool(data.get("full")),
+        "items": attach_thumbnail_urls(data.get("items") or []),
+        "documents": attach_document_urls(data.get("documents") or []),
+        "deleted_items": data.get("deleted_items") or [],
+        "deleted_documents": data.get("deleted_documents") or [],
+        "sync_token": encode_sync_token(next_since),
+    }
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from app.services.resilience import supabase_call
+from app.services.supabase_client import get_supabase_admin
+from app.services.tracing import traced
+
+
+class InvalidSyncResponseError(RuntimeError):
+    """The ``sync_changes`` RPC returned something other than a change set."""
+
+
+@traced()
+def fetch_sync_changes(*, user_id: str, since: str | None) -> dict:
+    """Items, documents and tombstones changed after ``since`` (ISO timestamp), via the ``sync_changes`` RPC.
+
+    The returned ``server_time`` is parsed to an aware ``datetime``.
+    """
+    supabase = get_supabase_admin()
+    resp = supabase_call(lambda: supabase.rpc("sync_changes", {"p_user_id": user_id, "p_since": since}).execute())
+    data = resp.data
+    if not isinstance(data, dict):
+        raise InvalidSyncResponseError(f"sync_changes returned {type(data).__name__}")
+    try:
+        server_time = datetime.fromisoformat(str(data["server_time"]))
+    except (KeyError, ValueError) as e:
+        raise InvalidSyncResponseError("sync_changes returned no valid server_time") from e
+    if server_time.tzinfo is None:
+        raise InvalidSyncResponseError("sync_changes returned a naive server_time")
+    return {**data, "server_time": server_time}
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+from app.core.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# Set by configure_tracing() when an exporter is configured and the optional
+# opentelemetry packages are installed; spans are timing-only otherwise.
+_tracer = None
+_provider = None
+
+
+def configure_tracing() -> None:
+    """Install an OpenTelemetry tracer exporting to OTLP/HTTP or a JSON-lines file, per settings."""
+    global _tracer, _provider
+    settings = get_settings()
+    exporter_kind = (settings.tracing_exporter or "none").lower()
+    if exporter_kind == "none" or _provider is not None:
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        logger.warning("opentelemetry-sdk is not installed; tracing is disabled")
+        return
+
+    if exporter_kind == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("opentelemetry-exporter-otlp-proto-http is not installed; tracing is disabled")
+            return
+        exporter = OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    elif exporter_kind == "file":
+        out = open(settings.tracing_file_path, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda s: s.to_json(indent=None) + "\n")
+    else:
+        logger.warning("Unknown TRACING_EXPORTER %r; tracing is disabled", exporter_kind)
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.tracing_service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    _provider = provider
+    _tracer = provider.get_tracer("app")
+
+
+def shutdown_tracing() -> None:
+    global _tracer, _provider
+    provider, _provider, _tracer = _provider, None, None
+    if provider is not None:
+        provider.shutdown()
+
+
+class Span:
+    """Handle for an open span; attributes are kept locally and forwarded to OpenTelemetry when enabled."""
+
+    __slots__ = ("name", "attributes", "start", "end", "_otel")
+
+    def __init__(self, name: str, attributes: dict, otel=None) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self._otel = otel
+
+    def set(self, key: str, value) -> None:
+        if value is None:
+            return
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+    def record_error(self, exc: BaseException) -> None:
+        if self._otel is not None:
+            from opentelemetry.trace import Status, StatusCode
+
+            self._otel.record_exception(exc)
+            self._otel.set_status(Status(StatusCode.ERROR, type(exc).__name__))
+
+    def finish(self) -> None:
+        if self.end is not None:
+            return
+        self.end = time.perf_counter()
+        if self._otel is not None:
+            self._otel.end()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000.0
+
+
+def start_span(name: str, *, parent: Span | None = None, **attributes) -> Span:
+    """Start a span that is not made current (safe to keep open across generator yields); call ``finish``."""
+    attributes = {k: v for k, v in attributes.items() if v is not None}
+    otel = None
+    if _tracer is not None:
+        context = None
+        if parent is not None and parent._otel is not None:
+            from opentelemetry import trace
+
+            context = trace.set_span_in_context(parent._otel)
+        otel = _tracer.start_span(name, context=context, attributes=attributes)
+    return Span(name, attributes, otel)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Trace the enclosed block as a child of the current span."""
+    attributes = {k: v for k, v in attributes.items() if v is not None}
+    if _tracer is None:
+        s = Span(name, attributes)
+        try:
+            yield s
+        finally:
+            s.finish()
+        return
+
+    with _tracer.start_as_current_span(
+        name, attributes=attributes, end_on_exit=False, record_exception=False, set_status_on_exception=False
+    ) as otel:
+        s = Span(name, attributes, otel)
+        try:
+            yield s
+        except BaseException as e:
+            s.record_error(e)
+            raise
+        finally:
+            s.finish()
+
+
+def _annotate_result(s: Span, result) -> None:
+    if isinstance(result, list):
+        s.set("rows", len(result))
+
+
+def traced(name: str | None = None):
+    """Decorator wrapping a function in a span (named ``module.function`` by default); list results set ``rows``."""
+
+    def decorate(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name) as s:
+                    result = await fn(*args, **kwargs)
+                    _annotate_result(s, result)
+                    return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name) as s:
+                result = fn(*args, **kwargs)
+                _annotate_result(s, result)
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+class Timeline:
+    """Consecutive named stages of one request, each traced as a span, reported to clients as a ``timing`` event.
+
+    Stages are started with ``begin`` (which ends the previous one) so they
+    can span generator yields in streaming handlers. Drive such a generator
+    through ``run``: each step then executes with the open stage as the
+    current span, so spans created inside it (queries, model calls) become
+    its children, and the timeline is finished however the stream ends.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._root = start_span(name)
+        self._current: Span | None = None
+        self._tokens: list | None = None
+        self.stages: list[dict] = []
+
+    def _activate(self, s: Span) -> None:
+        # Context changes only last for the current step; outside run() this is a no-op.
+        if self._tokens is None or s._otel is None:
+            return
+        from opentelemetry import context, trace
+
+        self._tokens.append(context.attach(trace.set_span_in_context(s._otel)))
+
+    @contextmanager
+    def _step(self) -> Iterator[None]:
+        self._tokens = []
+        self._activate(self._current or self._root)
+        try:
+            yield
+        finally:
+            tokens, self._tokens = self._tokens, None
+            if tokens:
+                from opentelemetry import context
+
+                for token in reversed(tokens):
+                    context.detach(token)
+
+    def run(self, events: Generator[T, None, None]) -> Iterator[T]:
+        """Yield from ``events``, advancing it one step at a time under the open stage's span context."""
+        try:
+            while True:
+                with self._step():
+                    try:
+                        event = next(events)
+                    except StopIteration:
+                        return
+                yield event
+        except Exception as e:
+            if self._current is not None:
+                self._current.record_error(e)
+            self._root.record_error(e)
+            raise
+        finally:
+            events.close()
+            self.finish()
+
+    def begin(self, stage: str, **attributes) -> Span:
+        self.end_stage()
+        self._current = start_span(f"{self._root.name}.{stage}", parent=self._root, **attributes)
+        self._activate(self._current)
+        return self._current
+
+    def end_stage(self) -> None:
+        current, self._current = self._current, None
+        if current is None:
+            return
+        current.finish()
+        stage = current.name.removeprefix(f"{self._root.name}.")
+        self.stages.append({"stage": stage, "ms": round(current.duration_ms, 1), **current.attributes})
+
+    def finish(self) -> dict:
+        """End the open stage and the root span; return the ``timing`` event payload. Safe to call again."""
+        self.end_stage()
+        self._root.finish()
+        return {"type": "timing", "total_ms": round(self._root.duration_ms, 1), "stages": self.stages}
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from io import BytesIO
+
+from app.services.activity import record_activity
+from app.services.document_index import index_document
+from app.services.job_queue import get_job_queue, job_handler
+from app.services.storage import store_thumbnails
+from app.services.resilience import supabase_call
+from app.services.supabase_client import get_supabase_admin
+
+
+@job_handler("document_activity")
+def _document_activity_job(payload: dict) -> dict:
+    activity = record_activity(
+        user_id=payload["user_id"],
+        action="upload_document",
+        details={
+            "filename": payload.get("filename"),
+            "mime_type": payload.get("mime_type"),
+            "storage_path": payload.get("storage_path"),
+        },
+        actor_name=payload.get("actor_name"),
+    )
+    return {"summary": activity.get("summary")}
+
+
+@job_handler("thumbnails")
+def _thumbnails_job(payload: dict) -> dict:
+    bucket = payload["bucket"]
+    path = payload["path"]
+    raw = supabase_call(lambda: get_supabase_admin().storage.from_(bucket).download(path), operation="storage.download")
+    return {"thumbnail_urls": store_thumbnails(bucket=bucket, path=path, source=BytesIO(raw))}
+
+
+@job_handler("index_document")
+def _index_document_job(payload: dict) -> dict:
+    chunks = index_document(
+        user_id=payload["user_id"],
+        storage_path=payload["storage_path"],
+        filename=payload.get("filename"),
+        mime_type=payload.get("mime_type"),
+    )
+    return {"chunks": chunks}
+
+
+def enqueue_document_postprocessing(*, user_id: str, document: dict, actor_name: str | None = None) -> list[str]:
+    """Queue the work that used to block /documents/upload; returns the job ids."""
+    queue = get_job_queue()
+    storage_path = document.get("storage_path")
+
+    job_ids = [
+        queue.enqueue(
+            user_id=user_id,
+            kind="document_activity",
+            payload={
+                "user_id": user_id,
+                "filename": document.get("filename"),
+                "mime_type": document.get("mime_type"),
+                "storage_path": storage_path,
+                "actor_name": actor_name,
+            },
+        )
+    ]
+
+    if not storage_path:
+        return job_ids
+
+    if document.get("file_type") == "image":
+        job_ids.append(queue.enqueue(user_id=user_id, kind="thumbnails", payload={"bucket": "documents", "path": storage_path}))
+    else:
+        job_ids.append(
+            queue.enqueue(
+                user_id=user_id,
+                kind="index_document",
+                payload={
+                    "user_id": user_id,
+                    "storage_path": storage_path,
+                    "filename": document.get("filename"),
+                    "mime_type": document.get("mime_type"),
+                },
+            )
+        )
+
+    return job_ids
@@ -0,0 +1,84 @@
+"""Compare response_model validation + stdlib JSON with the orjson fast path for large item lists.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_list_serialization --items 10000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.core.responses import FastJSONResponse, sse_event
+from app.schemas.inventory import ListItemsResponse
+from benchmarks.fixtures import make_items
+
+
+class _LegacyListItemsResponse(BaseModel):
+    # The previous schema: every row re-validated as a dict on the way out.
+    items: list[dict]
+
+
+def _legacy_sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def _best_of(fn, *, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _app(items: list[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=_LegacyListItemsResponse)
+    def legacy():
+        return _LegacyListItemsResponse(items=items)
+
+    @app.get("/fast", response_model=ListItemsResponse)
+    def fast():
+        return FastJSONResponse({"items": items})
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    items = make_items(count=args.items)
+    client = TestClient(_app(items))
+
+    legacy_body = client.get("/legacy").content
+    fast_body = client.get("/fast").content
+    assert json.loads(legacy_body) == json.loads(fast_body), "fast path changed the response"
+    print(f"{args.items:,} items, {len(fast_body) / 1024:.0f} KiB response")
+
+    old = _best_of(lambda: client.get("/legacy"), repeat=args.repeat)
+    new = _best_of(lambda: client.get("/fast"), repeat=args.repeat)
+    print(f"GET list (end to end)   response_model {old * 1000:8.1f} ms  FastJSONResponse {new * 1000:8.1f} ms  ({old / new:5.1f}x)")
+
+    old = _best_of(lambda: _LegacyListItemsResponse(items=items).model_dump_json(), repeat=args.repeat)
+    new = _best_of(lambda: FastJSONResponse({"items": items}), repeat=args.repeat)
+    print(f"render only             pydantic       {old * 1000:8.1f} ms  orjson           {new * 1000:8.1f} ms  ({old / new:5.1f}x)")
+
+    # An Assist "done" event embedding every searched item.
+    done = {"type": "done", "tool": "search_inventory", "result": {"items": items}, "assistant_message": "Found them."}
+    old = _best_of(lambda: _legacy_sse_event(done), repeat=args.repeat)
+    new = _best_of(lambda: sse_event(done), repeat=args.repeat)
+    print(f"SSE done event          json.dumps     {old * 1000:8.1f} ms  orjson           {new * 1000:8.1f} ms  ({old / new:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare whole-document PDF extraction with the incremental, budgeted extractor.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_pdf_extraction --pages 500
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from io import BytesIO
+
+from app.services.document_text_extractor import extract_text_from_pdf
+from benchmarks.fixtures import make_text_pdf
+
+
+def _extract_whole_document(*, pdf_bytes: bytes, max_chars: int = 200_000) -> tuple[str, bool]:
+    # The previous implementation: re-sums every page on each iteration, then
+    # joins and cleans the full text before truncating.
+    from pypdf import PdfReader
+
+    reader = PdfReader(BytesIO(pdf_bytes))
+    parts: list[str] = []
+    for page in reader.pages:
+        try:
+            t = page.extract_text() or ""
+        except Exception:
+            t = ""
+        if t:
+            parts.append(t)
+        if sum(len(p) for p in parts) >= max_chars:
+            break
+
+    text = "\n\n".join(parts).replace("\x00", " ")
+    text = re.sub(r"[ \t\f\v]+", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    truncated = len(text) > max_chars
+    return (text[:max_chars] if truncated else text), truncated
+
+
+def _best_of(fn, *, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pdf = make_text_pdf(pages=args.pages)
+    print(f"{args.pages}-page PDF, {len(pdf) / 1024:.0f} KiB")
+
+    for budget in (12_000, 200_000, 10_000_000):
+        old = _best_of(lambda: _extract_whole_document(pdf_bytes=pdf, max_chars=budget), repeat=args.repeat)
+        new = _best_of(lambda: extract_text_from_pdf(pdf_bytes=pdf, max_chars=budget), repeat=args.repeat)
+        print(f"max_chars={budget:>10,}  whole-document {old * 1000:8.1f} ms  incremental {new * 1000:8.1f} ms  ({old / new:5.1f}x)")
+
+    # read_document_text used to extract with the default 200k budget and then
+    # keep the first 12k characters; it now passes its budget down.
+    old = _best_of(lambda: _extract_whole_document(pdf_bytes=pdf)[0][:12_000], repeat=args.repeat)
+    new = _best_of(lambda: extract_text_from_pdf(pdf_bytes=pdf, max_chars=12_000), repeat=args.repeat)
+    print(f"agent read (12k of 200k)   whole-document {old * 1000:8.1f} ms  incremental {new * 1000:8.1f} ms  ({old / new:5.1f}x)")
+
+    window = _best_of(lambda: extract_text_from_pdf(pdf_bytes=pdf, page_start=400, page_end=410), repeat=args.repeat)
+    print(f"pages 401-410 only                                  {window * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
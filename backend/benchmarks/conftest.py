@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+# Slowdown that fails a ``--benchmark-compare`` run, per benchmark, against the
+# saved run it is compared with. Override on the command line with
+# ``--benchmark-compare-fail``.
+REGRESSION_THRESHOLD = "median:15%"
+
+
+def pytest_configure(config) -> None:
+    if config.getoption("benchmark_compare", None) and not config.getoption("benchmark_compare_fail", None):
+        from pytest_benchmark.utils import parse_compare_fail
+
+        config.option.benchmark_compare_fail = [parse_compare_fail(REGRESSION_THRESHOLD)]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import random
+from io import BytesIO
+
+_WORDS = (
+    "warranty dishwasher filter replace model serial install water heater valve drill battery "
+    "charger manual safety clean inspect monthly torque bolt gasket receipt purchase store "
+    "return period coverage parts labor service contact support"
+).split()
+
+
+def make_text_pdf(*, pages: int, lines_per_page: int = 45, seed: int = 0) -> bytes:
+    """Build a synthetic PDF with ``pages`` pages of extractable Helvetica text."""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    rng = random.Random(seed)
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+
+    for _ in range(pages):
+        page = writer.add_blank_page(width=612, height=792)
+        ops = ["BT", "/F1 10 Tf", "12 TL", "40 760 Td"]
+        for _ in range(lines_per_page):
+            line = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 14)))
+            ops.append(f"({line}) '")
+        ops.append("ET")
+
+        content = DecodedStreamObject()
+        content.set_data("\n".join(ops).encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+
+    buf = BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def make_items(*, count: int, seed: int = 0) -> list[dict]:
+    """Build ``count`` item rows shaped like ``items_repo.ITEM_COLUMNS`` output with resolved URLs."""
+    rng = random.Random(seed)
+    items: list[dict] = []
+    for i in range(count):
+        words = rng.sample(_WORDS, 3)
+        path = f"user-1/{i:08x}.jpg"
+        items.append(
+            {
+                "item_id": f"00000000-0000-4000-8000-{i:012x}",
+                "user_id": "user-1",
+                "name": " ".join(words).title(),
+                "category": rng.choice(("Tools", "Kitchen", "Garage", "Electronics", "Documents")),
+                "subcategory": rng.choice((None, "Power tools", "Hand tools", "Appliances")),
+                "brand": rng.choice((None, "Makita", "Bosch", "Whirlpool")),
+                "part_number": None,
+                "tags": words,
+                "confidence": round(rng.random(), 3),
+                "quantity": rng.randint(0, 20),
+                "location": rng.choice(("Garage", "Basement", "Kitchen", "Office")),
+                "image_url": f"https://example.supabase.co/storage/v1/object/sign/item-images/{path}?token=abc{i}",
+                "image_path": path,
+                "barcode": f"{rng.randrange(10**11, 10**12)}",
+                "purchase_source": rng.choice((None, "Home Depot", "Amazon")),
+                "notes": " ".join(rng.choices(_WORDS, k=12)),
+                "created_at": "2024-05-01T12:00:00+00:00",
+                "updated_at": "2024-05-02T08:30:00+00:00",
+                "thumbnail_urls": {
+                    str(size): f"https://example.supabase.co/storage/v1/object/sign/item-images/{path}.thumb-{size}.webp?token=t{i}"
+                    for size in (128, 256, 512)
+                },
+            }
+        )
+    return items
+
+
+def make_messy_text(*, chars: int, seed: int = 0) -> str:
+    """Raw extractor-style text: runs of tabs/spaces, NULs and stacked blank lines between words."""
+    rng = random.Random(seed)
+    separators = (" ", " ", " ", "  ", "\t", " \t ", "\x00", "\n", "\n\n\n\n", "   \f ")
+    parts: list[str] = []
+    size = 0
+    while size < chars:
+        word = rng.choice(_WORDS)
+        sep = rng.choice(separators)
+        parts.append(word)
+        parts.append(sep)
+        size += len(word) + len(sep)
+    return "".join(parts)[:chars]
+
+
+def make_documents(*, count: int, seed: int = 0) -> list[dict]:
+    """Build ``count`` document rows shaped like ``documents_repo.list_documents`` output."""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"00000000-0000-4000-9000-{i:012x}",
+            "filename": f"{' '.join(rng.sample(_WORDS, 2)).title()} Manual.pdf",
+            "storage_path": f"user-1/{i:08x}.pdf",
+            "mime_type": "application/pdf",
+            "size_bytes": rng.randrange(50_000, 5_000_000),
+            "ai_access_granted": rng.random() < 0.3,
+            "created_at": "2024-05-01T12:00:00+00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def make_activity(*, count: int, seed: int = 0) -> list[dict]:
+    """Build ``count`` recent-activity rows shaped like ``documents_repo.list_recent_activity`` output."""
+    rng = random.Random(seed)
+    actions = ("add_item", "update_item", "delete_item", "bulk_create", "ai_chat")
+    return [
+        {
+            "id": f"00000000-0000-4000-a000-{i:012x}",
+            "action": (action := rng.choice(actions)),
+            "summary": f"{action.replace('_', ' ').capitalize()}: {' '.join(rng.sample(_WORDS, 2))}",
+            "metadata": {"type": action, "count": rng.randint(1, 5)},
+            "created_at": f"2024-05-{1 + i % 28:02d}T12:00:00+00:00",
+        }
+        for i in range(count)
+    ]
@@ -0,0 +1,137 @@
+"""pytest-benchmark suite for the CPU-bound request paths, on fixed fixtures.
+
+Run from ``backend/`` (needs ``pip install -r benchmarks/requirements.txt``)::
+
+    python -m pytest benchmarks                         # measure, save under .benchmarks/
+    python -m pytest benchmarks --benchmark-compare     # ...and fail on a >15% median regression
+
+Every run is autosaved with the current commit id, and ``--benchmark-compare``
+checks against the most recent saved run, so the usual loop is: run on the base
+commit, apply the change, run again with ``--benchmark-compare``. Compare any
+two saved runs with ``pytest-benchmark compare 0001 0002``. Saved runs are
+machine-specific and stay out of git. Fixtures are seeded and sized like a
+large real account, so numbers from different commits are comparable.
+"""
+from __future__ import annotations
+
+import json
+import random
+from collections import Counter
+
+import pytest
+
+from app.core.responses import FastJSONResponse
+from app.schemas.inventory import BulkCreateRequest, BulkCreateResponse, MultiExtractFromImageResponse
+from app.services.ai_agent import _context_json, _normalize_new_items
+from app.services.document_text_extractor import _clean_text, extract_text_from_pdf
+from app.services.items_repo import _bulk_payloads
+from benchmarks.fixtures import make_activity, make_documents, make_items, make_messy_text, make_text_pdf
+
+# Fixture sizes. Changing one invalidates comparisons with earlier saved runs.
+CLEAN_TEXT_CHARS = 200_000
+PDF_PAGES = 40
+CONTEXT_ITEMS = 2_000
+CONTEXT_DOCUMENTS = 50
+CONTEXT_ACTIVITY = 25
+TOOL_ITEMS = 500
+BULK_ITEMS = 500
+LIST_ITEMS = 10_000
+
+
+@pytest.fixture(scope="module")
+def items() -> list[dict]:
+    return make_items(count=LIST_ITEMS)
+
+
+@pytest.fixture(scope="module")
+def tool_items() -> list:
+    """``add_inventory_items`` arguments as the model sends them: padded strings, gaps, the odd junk entry."""
+    rng = random.Random(1)
+    out: list = []
+    for row in make_items(count=TOOL_ITEMS, seed=1):
+        entry = {"name": f"  {row['name']} ", "quantity": rng.choice((None, row["quantity"]))}
+        if rng.random() < 0.7:
+            entry["category"] = row["category"]
+        if rng.random() < 0.7:
+            entry["location"] = f"{row['location']}  "
+        if rng.random() < 0.3:
+            entry["notes"] = row["notes"]
+        out.append(entry)
+    out[::50] = ["not an item"] * len(out[::50])
+    return out
+
+
+def _stats(items: list[dict]) -> dict:
+    def buckets(field: str) -> list[dict]:
+        counts = Counter(i[field] for i in items)
+        totals = Counter()
+        for i in items:
+            totals[i[field]] += i["quantity"]
+        return [{"key": k, "item_count": n, "total_quantity": totals[k]} for k, n in counts.most_common()]
+
+    return {
+        "total_items": len(items),
+        "total_quantity": sum(i["quantity"] for i in items),
+        "by_category": buckets("category"),
+        "by_location": buckets("location"),
+    }
+
+
+def test_clean_text(benchmark):
+    text = make_messy_text(chars=CLEAN_TEXT_CHARS)
+    cleaned = benchmark(_clean_text, text)
+    assert "\x00" not in cleaned and "\n\n\n" not in cleaned
+
+
+def test_extract_text_from_pdf(benchmark):
+    pdf_bytes = make_text_pdf(pages=PDF_PAGES)
+    text, truncated = benchmark(extract_text_from_pdf, pdf_bytes=pdf_bytes, max_chars=10_000_000)
+    assert text and not truncated
+
+
+def test_normalize_new_items(benchmark, tool_items):
+    normalized = benchmark(_normalize_new_items, tool_items)
+    assert len(normalized) == TOOL_ITEMS - len(tool_items[::50])
+    assert all(n["category"] and n["location"] and n["quantity"] is not None for n in normalized)
+
+
+def test_agent_context_json(benchmark, items):
+    context_items = items[:CONTEXT_ITEMS]
+    stats = _stats(context_items)
+    docs = make_documents(count=CONTEXT_DOCUMENTS)
+    activity = make_activity(count=CONTEXT_ACTIVITY)
+    out = benchmark(_context_json, items=context_items, stats=stats, docs=docs, activity=activity)
+    assert len(json.loads(out)["inventory_items"]) == CONTEXT_ITEMS
+
+
+def test_bulk_payloads(benchmark):
+    request = [
+        {k: v for k, v in row.items() if k not in ("item_id", "user_id", "created_at", "updated_at", "thumbnail_urls")}
+        for row in make_items(count=BULK_ITEMS, seed=2)
+    ]
+    payloads, failures = benchmark(_bulk_payloads, user_id="user-1", items=request, now="2024-05-01T12:00:00+00:00")
+    assert len(payloads) == BULK_ITEMS and not failures
+
+
+def test_bulk_create_request_validation(benchmark, items):
+    body = {"items": [{k: row[k] for k in ("name", "category", "quantity", "location", "tags", "confidence")} for row in items[:BULK_ITEMS]]}
+    parsed = benchmark(BulkCreateRequest.model_validate, body)
+    assert len(parsed.items) == BULK_ITEMS
+
+
+def test_bulk_create_response(benchmark, items):
+    inserted = items[:BULK_ITEMS]
+    body = benchmark(lambda: BulkCreateResponse(inserted=inserted, failures=[]).model_dump_json())
+    assert body.startswith('{"inserted":')
+
+
+def test_multi_extract_response(benchmark, items):
+    extracted = [{k: row[k] for k in ("name", "category", "subcategory", "quantity", "brand", "tags", "confidence", "notes")} for row in items[:50]]
+    summary = {"total_detected": len(extracted), "categories": dict(Counter(e["category"] for e in extracted))}
+    body = benchmark(lambda: MultiExtractFromImageResponse(items=extracted, summary=summary).model_dump_json())
+    assert body.startswith('{"items":')
+
+
+def test_list_items_response(benchmark, items):
+    resp = benchmark(FastJSONResponse, {"items": items})
+    assert resp.body.startswith(b'{"items":')
@@ -0,0 +1,80 @@
+"""Reproducible load tests against local fake Supabase and OpenAI upstreams.
+
+Run from ``backend/``::
+
+    python -m loadtest run --scenario mixed --users 8 --items 100,1000,10000,100000 --concurrency 32 --duration 60
+    python -m loadtest run --scenario assist --openai-latency 400+200 --openai-token-ms 15 --json assist.json
+    python -m loadtest fakes --key-file /tmp/loadtest.pem   # fakes only, for an API you start yourself
+
+``run`` starts the fakes and the API (``uvicorn app.main:app``) as child
+processes, drives ``--concurrency`` virtual users through the chosen
+scenarios and prints per-request throughput, p50/p95/p99 latency (and time
+to first streamed token for Assist) plus the API process's memory. Nothing
+leaves the machine. Scenarios: ``mixed`` or a comma-separated subset of
+search, browse, bulk_create, image_scan, document_upload, assist.
+Latencies are milliseconds, written as ``base`` or ``base+jitter``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from loadtest import runner
+
+
+def _add_world_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--users", type=int, default=8, help="synthetic users (default 8)")
+    parser.add_argument(
+        "--items", default="100,1000,10000", help="items per user, assigned round-robin, e.g. 100,10000,100000 (default 100,1000,10000)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db-latency", default="5+5", help="PostgREST latency per request (default 5+5)")
+    parser.add_argument("--storage-latency", default="20+20", help="Storage latency per request (default 20+20)")
+    parser.add_argument("--openai-latency", default="300+200", help="time to first token (default 300+200)")
+    parser.add_argument("--openai-token-ms", type=float, default=10.0, help="delay per generated token (default 10)")
+    parser.add_argument("--embedding-latency", default="50+30", help="embeddings latency (default 50+30)")
+    parser.add_argument("--scan-items", type=int, default=5, help="items the fake vision model detects per image (default 5)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="start fakes and the API, apply load, report")
+    _add_world_args(run)
+    run.add_argument("--scenario", default="mixed")
+    run.add_argument("--concurrency", type=int, default=16, help="virtual users issuing requests back to back (default 16)")
+    run.add_argument("--duration", type=float, default=30.0, help="measured seconds (default 30)")
+    run.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before the window (default 5)")
+    run.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (default 1)")
+    run.add_argument("--bulk-size", type=int, default=25, help="items per bulk_create request (default 25)")
+    run.add_argument("--upload-variants", type=int, default=8, help="distinct images/PDFs to upload (default 8)")
+    run.add_argument("--image-width", type=int, default=1600)
+    run.add_argument("--image-height", type=int, default=1200)
+    run.add_argument("--document-pages", type=int, default=20)
+    run.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="extra API setting, repeatable")
+    run.add_argument("--app-url", help="load an already running API instead of starting one")
+    run.add_argument("--app-pid", type=int, help="with --app-url: process to sample memory from")
+    run.add_argument("--key-file", help="with --app-url: signing key shared with `fakes --key-file`")
+    run.add_argument("--json", help="also write the report to this file")
+    run.add_argument("--keep-logs", action="store_true", help="keep the fakes/API logs and temp directory")
+
+    fakes = commands.add_parser("fakes", help="serve only the fake upstreams")
+    _add_world_args(fakes)
+    fakes.add_argument("--port", type=int, default=54321, help="Supabase (PostgREST/Storage/JWKS) port (default 54321)")
+    fakes.add_argument("--openai-port", type=int, default=54322, help="OpenAI-compatible port (default 54322)")
+    fakes.add_argument("--key-file", required=True, help="ES256 signing key for access tokens; created if missing")
+
+    args = parser.parse_args()
+    if args.command == "fakes":
+        runner.serve_fakes(args)
+        return
+
+    summary = runner.run(args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""OpenAI-compatible chat completions and embeddings with canned, schema-shaped answers.
+
+Forced function calls (``tool_choice`` naming a function) get arguments that
+fit the schemas in ``openai_service``; Assist's ``tool_choice="auto"`` calls
+pick a tool from the user's wording ("add ...", "where/find ...") and
+otherwise answer in text. Responses wait ``latency`` before the first token
+and ``token_ms`` per generated token, streamed or not.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import re
+import time
+import uuid
+
+import orjson
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from loadtest.latency import Latency
+from loadtest.users import CATEGORIES, LOCATIONS, NOUNS, item_name
+
+
+_ANSWER_WORDS = (
+    "You have a few of those in the garage and one more in the basement closet. "
+    "The newest one was added last week, and the manual is in your documents if you need the warranty details."
+).split()
+
+
+def _json(data, status_code: int = 200) -> Response:
+    return Response(orjson.dumps(data), status_code=status_code, media_type="application/json")
+
+
+def _last_user_text(messages: list[dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return " ".join(p.get("text") or "" for p in content if isinstance(p, dict))
+    return ""
+
+
+def _prompt_tokens(messages: list[dict]) -> int:
+    # Roughly four characters per token, like the real tokenizer on English text.
+    return max(1, len(orjson.dumps(messages)) // 4)
+
+
+def _keywords(text: str) -> str:
+    words = [w for w in re.findall(r"[a-z]+", text.lower()) if w in NOUNS]
+    return " ".join(words) or text.strip()
+
+
+def _forced_arguments(name: str, text: str, rng: random.Random, *, scan_items: int) -> dict:
+    if name == "extract_inventory_fields":
+        return {
+            "name": item_name(rng),
+            "category": rng.choice(CATEGORIES),
+            "quantity": rng.randint(1, 4),
+            "location": rng.choice(LOCATIONS),
+            "barcode": None,
+            "purchase_source": None,
+            "notes": None,
+        }
+    if name == "extract_inventory_items":
+        items = [
+            {
+                "name": item_name(rng),
+                "category": rng.choice(CATEGORIES),
+                "subcategory": None,
+                "quantity": rng.randint(1, 4),
+                "location": rng.choice(LOCATIONS),
+                "brand": None,
+                "part_number": None,
+                "barcode": None,
+                "tags": None,
+                "confidence": round(rng.uniform(0.5, 1.0), 2),
+                "notes": None,
+            }
+            for _ in range(scan_items)
+        ]
+        categories: dict[str, int] = {}
+        for item in items:
+            categories[item["category"]] = categories.get(item["category"], 0) + 1
+        return {"items": items, "summary": {"total_detected": len(items), "categories": categories}}
+    if name == "parse_inventory_search":
+        return {"text": _keywords(text), "category": None, "location": None}
+    if name == "barcode_to_item_guess":
+        return {"barcode": "".join(re.findall(r"\d", text)), "name": None, "category": None, "notes": "No match"}
+    return {}
+
+
+def _assist_tool_call(messages: list[dict], rng: random.Random) -> tuple[str, dict] | None:
+    """Choose a tool for the first Assist step the way the model tends to; None means answer in text."""
+    if any(m.get("role") == "tool" for m in messages):
+        return None
+    text = _last_user_text(messages).strip().lower()
+    if text.startswith("add "):
+        return "add_inventory_item", {
+            "name": _keywords(text[4:]).title() or item_name(rng),
+            "category": rng.choice(CATEGORIES),
+            "quantity": 1,
+            "location": rng.choice(LOCATIONS),
+        }
+    if text.startswith(("where", "find", "search")):
+        return "search_inventory", {"query": _keywords(text)}
+    return None
+
+
+class _Completion:
+    def __init__(self, body: dict, *, scan_items: int) -> None:
+        self.model = body.get("model") or "gpt-fake"
+        self.id = f"chatcmpl-{uuid.uuid4().hex}"
+        self.created = int(time.time())
+        messages = body.get("messages") or []
+        self.prompt_tokens = _prompt_tokens(messages)
+        rng = random.Random()
+
+        self.tool_call: tuple[str, str] | None = None
+        self.content: list[str] = []
+        tool_choice = body.get("tool_choice")
+        if isinstance(tool_choice, dict):
+            name = (tool_choice.get("function") or {}).get("name") or ""
+            args = _forced_arguments(name, _last_user_text(messages), rng, scan_items=scan_items)
+            self.tool_call = (name, orjson.dumps(args).decode())
+        elif body.get("tools") and tool_choice != "none" and (picked := _assist_tool_call(messages, rng)):
+            self.tool_call = (picked[0], orjson.dumps(picked[1]).decode())
+        else:
+            self.content = [f"{w} " for w in _ANSWER_WORDS]
+
+    @property
+    def pieces(self) -> list[str]:
+        """Generated output split into roughly token-sized pieces."""
+        if self.tool_call is not None:
+            arguments = self.tool_call[1]
+            return [arguments[i : i + 16] for i in range(0, len(arguments), 16)] or [""]
+        return self.content
+
+    def usage(self) -> dict:
+        completion = len(self.pieces)
+        return {"prompt_tokens": self.prompt_tokens, "completion_tokens": completion, "total_tokens": self.prompt_tokens + completion}
+
+    def message(self) -> dict:
+        if self.tool_call is None:
+            return {"role": "assistant", "content": "".join(self.content).strip()}
+        name, arguments = self.tool_call
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": {"name": name, "arguments": arguments}}],
+        }
+
+    def response(self) -> dict:
+        return {
+            "id": self.id,
+            "object": "chat.completion",
+            "created": self.created,
+            "model": self.model,
+            "choices": [{"index": 0, "message": self.message(), "finish_reason": "tool_calls" if self.tool_call else "stop"}],
+            "usage": self.usage(),
+        }
+
+    def chunk(self, delta: dict | None, finish_reason: str | None = None, *, usage: dict | None = None) -> bytes:
+        choices = [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        payload = {
+            "id": self.id,
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": self.model,
+            "choices": choices,
+            "usage": usage,
+        }
+        return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+    def deltas(self) -> list[dict]:
+        if self.tool_call is None:
+            return [{"role": "assistant", "content": ""}] + [{"content": piece} for piece in self.content]
+        name, _ = self.tool_call
+        first = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{"index": 0, "id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": {"name": name, "arguments": ""}}],
+        }
+        return [first] + [{"tool_calls": [{"index": 0, "function": {"arguments": piece}}]} for piece in self.pieces]
+
+
+def _embedding(text: str, dimensions: int) -> list[float]:
+    rng = random.Random(hashlib.blake2b(text.encode(), digest_size=8).digest())
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+def create_app(*, latency: Latency = Latency(), token_ms: float = 0.0, embedding_latency: Latency = Latency(), scan_items: int = 5) -> Starlette:
+    token_seconds = token_ms / 1000.0
+
+    async def chat_completions(request: Request) -> Response:
+        body = orjson.loads(await request.body())
+        completion = _Completion(body, scan_items=scan_items)
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency.seconds() + token_seconds * len(completion.pieces))
+            return _json(completion.response())
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        async def events():
+            await latency.sleep()
+            for i, delta in enumerate(completion.deltas()):
+                if i and token_seconds:
+                    await asyncio.sleep(token_seconds)
+                yield completion.chunk(delta)
+            yield completion.chunk({}, "tool_calls" if completion.tool_call else "stop")
+            if include_usage:
+                yield completion.chunk(None, usage=completion.usage())
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def embeddings(request: Request) -> Response:
+        body = orjson.loads(await request.body())
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dimensions = int(body.get("dimensions") or 256)
+        await embedding_latency.sleep()
+        tokens = sum(max(1, len(str(t)) // 4) for t in inputs)
+        return _json(
+            {
+                "object": "list",
+                "model": body.get("model") or "text-embedding-fake",
+                "data": [{"object": "embedding", "index": i, "embedding": _embedding(str(t), dimensions)} for i, t in enumerate(inputs)],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    async def health(request: Request) -> Response:
+        return _json({"ok": True})
+
+    return Starlette(
+        routes=[
+            Route("/healthz", health),
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/v1/embeddings", embeddings, methods=["POST"]),
+        ]
+    )
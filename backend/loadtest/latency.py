@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Latency:
+    """Simulated upstream delay: ``base_ms`` plus uniform jitter of up to ``jitter_ms``."""
+
+    base_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    @classmethod
+    def parse(cls, value: str) -> Latency:
+        """Parse ``"20"`` or ``"20+10"`` (base + jitter, milliseconds)."""
+        base, _, jitter = value.partition("+")
+        return cls(float(base or 0), float(jitter or 0))
+
+    def seconds(self) -> float:
+        return max(0.0, self.base_ms + random.uniform(0.0, self.jitter_ms)) / 1000.0
+
+    async def sleep(self) -> None:
+        delay = self.seconds()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def __str__(self) -> str:
+        return f"{self.base_ms:g}+{self.jitter_ms:g}ms"
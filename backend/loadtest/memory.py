@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+
+
+def rss_bytes(pid: int) -> int | None:
+    """Resident set size of ``pid`` (and its child processes, e.g. uvicorn workers)."""
+    pids = [pid, *_children(pid)]
+    sizes = [s for s in (_rss_one(p) for p in pids) if s is not None]
+    return sum(sizes) if sizes else None
+
+
+def _rss_one(pid: int) -> int | None:
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+
+    status = f"/proc/{pid}/status"
+    if os.path.exists(status):
+        with open(status, encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return None
+
+    # macOS and other systems without /proc.
+    try:
+        out = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True, timeout=2).stdout
+        return int(out.strip()) * 1024 if out.strip() else None
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def _children(pid: int) -> list[int]:
+    path = f"/proc/{pid}/task/{pid}/children"
+    if os.path.exists(path):
+        with open(path, encoding="ascii") as f:
+            return [int(p) for p in f.read().split()]
+    try:
+        out = subprocess.run(["pgrep", "-P", str(pid)], capture_output=True, text=True, timeout=2).stdout
+        return [int(p) for p in out.split()]
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return []
+
+
+class MemorySampler:
+    """Polls the API process RSS while a run is in progress; reports start, peak and end."""
+
+    def __init__(self, pid: int | None, *, interval: float = 0.25) -> None:
+        self._pid = pid
+        self._interval = interval
+        self.samples: list[int] = []
+        self._task: asyncio.Task | None = None
+
+    def sample(self) -> None:
+        if self._pid is None:
+            return
+        size = rss_bytes(self._pid)
+        if size is not None:
+            self.samples.append(size)
+
+    async def _run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self._interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.sample()
+
+    def summary(self) -> dict | None:
+        if not self.samples:
+            return None
+        return {"start_bytes": self.samples[0], "peak_bytes": max(self.samples), "end_bytes": self.samples[-1]}
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+
+@dataclass
+class Sample:
+    status: int
+    seconds: float
+    ttfb: float | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 400
+
+
+class Recorder:
+    """Per-request-name latency samples; anything recorded before ``start_measuring`` is warm-up and dropped."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[Sample]] = defaultdict(list)
+        self.measuring = False
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+
+    def start_measuring(self) -> None:
+        self.samples.clear()
+        self.measuring = True
+        self.started_at = time.perf_counter()
+
+    def stop_measuring(self) -> None:
+        self.measuring = False
+        self.stopped_at = time.perf_counter()
+
+    def add(self, name: str, sample: Sample) -> None:
+        if self.measuring:
+            self.samples[name].append(sample)
+
+    @property
+    def elapsed(self) -> float:
+        end = self.stopped_at if not self.measuring else time.perf_counter()
+        return max(1e-9, end - self.started_at)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile of already sorted values (``q`` in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _latency_stats(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round((values[-1] if values else 0.0) * 1000, 1),
+    }
+
+
+def summarize(recorder: Recorder, *, memory: dict | None, config: dict) -> dict:
+    elapsed = recorder.elapsed
+    requests: dict[str, dict] = {}
+    for name, samples in sorted(recorder.samples.items()):
+        errors: dict[str, int] = defaultdict(int)
+        for s in samples:
+            if not s.ok:
+                errors[s.error or str(s.status)] += 1
+        entry = {
+            "count": len(samples),
+            "errors": sum(errors.values()),
+            "error_breakdown": dict(errors),
+            "rps": round(len(samples) / elapsed, 2),
+            **_latency_stats([s.seconds for s in samples if s.ok]),
+        }
+        ttfbs = [s.ttfb for s in samples if s.ok and s.ttfb is not None]
+        if ttfbs:
+            entry["ttfb"] = _latency_stats(ttfbs)
+        requests[name] = entry
+
+    total = sum(r["count"] for r in requests.values())
+    return {
+        "config": config,
+        "duration_s": round(elapsed, 2),
+        "total_requests": total,
+        "total_errors": sum(r["errors"] for r in requests.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "requests": requests,
+        "memory": memory,
+    }
+
+
+def _mib(n: int | None) -> str:
+    return "-" if n is None else f"{n / (1024 * 1024):.0f} MiB"
+
+
+def format_summary(summary: dict) -> str:
+    lines = [
+        f"{summary['total_requests']} requests in {summary['duration_s']} s: "
+        f"{summary['throughput_rps']} req/s, {summary['total_errors']} errors",
+        "",
+        f"{'request':<28} {'count':>7} {'err':>5} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}",
+    ]
+    for name, r in summary["requests"].items():
+        lines.append(
+            f"{name:<28} {r['count']:>7} {r['errors']:>5} {r['rps']:>8.2f} "
+            f"{r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms"
+        )
+        if "ttfb" in r:
+            t = r["ttfb"]
+            lines.append(
+                f"{'  first token':<28} {'':>7} {'':>5} {'':>8} "
+                f"{t['p50_ms']:>7.1f}ms {t['p95_ms']:>7.1f}ms {t['p99_ms']:>7.1f}ms {t['max_ms']:>7.1f}ms"
+            )
+        for reason, n in sorted(r["error_breakdown"].items()):
+            lines.append(f"{'  ' + reason:<28} {n:>7}")
+
+    memory = summary.get("memory")
+    if memory:
+        lines += [
+            "",
+            f"API process RSS: start {_mib(memory['start_bytes'])}, peak {_mib(memory['peak_bytes'])}, end {_mib(memory['end_bytes'])}",
+        ]
+    return "\n".join(lines)
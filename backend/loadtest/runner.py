@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import httpx
+
+from loadtest.latency import Latency
+from loadtest.memory import MemorySampler
+from loadtest.report import Recorder, format_summary, summarize
+from loadtest.scenarios import SCENARIOS, Assets, Session
+from loadtest.users import SyntheticUser, TokenIssuer, make_users, parse_item_counts, service_key
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Synthetic users fire requests far faster than people do; per-user LLM limits
+# would turn most Assist/search traffic into 429s. The global cap stays.
+_DEFAULT_APP_ENV = {
+    "LLM_RATE_PER_MINUTE": "1000000",
+    "LLM_BURST": "1000000",
+    "LLM_USER_CONCURRENCY": "0",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, *, proc: subprocess.Popen | None, timeout: float, log_path: Path | None = None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with {proc.returncode} before becoming ready{_log_tail(log_path)}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s{_log_tail(log_path)}")
+
+
+def _log_tail(path: Path | None, lines: int = 30) -> str:
+    if path is None or not path.exists():
+        return ""
+    tail = path.read_text(errors="replace").splitlines()[-lines:]
+    return "\n--- " + str(path) + "\n" + "\n".join(tail)
+
+
+@contextlib.contextmanager
+def _process(cmd: list[str], *, env: dict[str, str], log_path: Path) -> Iterator[subprocess.Popen]:
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            yield proc
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+def fake_args(args) -> list[str]:
+    """Command-line flags that make a ``fakes`` process seed and behave like this run."""
+    return [
+        "--users", str(args.users),
+        "--items", args.items,
+        "--seed", str(args.seed),
+        "--db-latency", str(args.db_latency),
+        "--storage-latency", str(args.storage_latency),
+        "--openai-latency", str(args.openai_latency),
+        "--openai-token-ms", str(args.openai_token_ms),
+        "--embedding-latency", str(args.embedding_latency),
+        "--scan-items", str(args.scan_items),
+    ]
+
+
+def app_env(*, supabase_url: str, openai_url: str, workdir: Path, overrides: list[str]) -> dict[str, str]:
+    key = service_key()
+    env = {
+        **os.environ,
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_ANON_KEY": key,
+        "SUPABASE_SERVICE_ROLE_KEY": key,
+        "SUPABASE_JWKS_URL": f"{supabase_url}/auth/v1/.well-known/jwks.json",
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "JOB_QUEUE_PATH": str(workdir / "jobs.sqlite3"),
+        # Keep a developer's .env from pointing the run at real shared services.
+        "EVENTS_DATABASE_URL": "",
+        "RATE_LIMIT_REDIS_URL": "",
+        "TRACING_EXPORTER": "none",
+        "METRICS_TOKEN": "",
+        # Shared by every --workers process so a scrape aggregates all of them.
+        "PROMETHEUS_MULTIPROC_DIR": str(workdir / "prometheus"),
+        **_DEFAULT_APP_ENV,
+    }
+    for item in overrides:
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--app-env expects KEY=VALUE, got {item!r}")
+        env[name] = value
+    if env["PROMETHEUS_MULTIPROC_DIR"]:
+        Path(env["PROMETHEUS_MULTIPROC_DIR"]).mkdir(parents=True, exist_ok=True)
+    return env
+
+
+async def drive(
+    *,
+    base_url: str,
+    users: list[SyntheticUser],
+    issuer: TokenIssuer,
+    scenarios: list[str],
+    assets: Assets,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    bulk_size: int,
+    seed: int,
+    app_pid: int | None,
+) -> tuple[Recorder, dict | None]:
+    """Closed-loop load: ``concurrency`` virtual users each run weighted-random scenarios back to back."""
+    recorder = Recorder()
+    memory = MemorySampler(app_pid)
+    functions = [SCENARIOS[name][0] for name in scenarios]
+    weights = [SCENARIOS[name][1] for name in scenarios]
+    tokens = {u.user_id: issuer.token(u.user_id) for u in users}
+    stop = asyncio.Event()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=httpx.Timeout(300.0, connect=10.0)) as client:
+
+        async def virtual_user(i: int) -> None:
+            user = users[i % len(users)]
+            session = Session(
+                client=client,
+                user=user,
+                token=tokens[user.user_id],
+                recorder=recorder,
+                assets=assets,
+                rng=random.Random(seed * 100_003 + i),
+                bulk_size=bulk_size,
+            )
+            while not stop.is_set():
+                await session.rng.choices(functions, weights)[0](session)
+
+        tasks = [asyncio.create_task(virtual_user(i)) for i in range(concurrency)]
+        memory.sample()
+        await asyncio.sleep(warmup)
+        recorder.start_measuring()
+        memory.start()
+        await asyncio.sleep(duration)
+        recorder.stop_measuring()
+        await memory.stop()
+        stop.set()
+        # Requests still in flight were started inside the window but finish
+        # outside it; they aren't recorded, so there is no need to wait long.
+        _done, pending = await asyncio.wait(tasks, timeout=5.0)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return recorder, memory.summary()
+
+
+def run(args) -> dict:
+    scenarios = list(SCENARIOS) if args.scenario == "mixed" else [s.strip() for s in args.scenario.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"unknown scenario(s): {', '.join(unknown)}; choose from mixed, {', '.join(SCENARIOS)}")
+
+    users = make_users(count=args.users, item_counts=parse_item_counts(args.items), seed=args.seed)
+    assets = Assets.build(
+        variants=args.upload_variants,
+        image_size=(args.image_width, args.image_height),
+        document_pages=args.document_pages,
+        scenarios=set(scenarios),
+    )
+    config = {
+        "scenarios": scenarios,
+        "users": args.users,
+        "items": args.items,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "db_latency": str(Latency.parse(args.db_latency)),
+        "storage_latency": str(Latency.parse(args.storage_latency)),
+        "openai_latency": str(Latency.parse(args.openai_latency)),
+        "openai_token_ms": args.openai_token_ms,
+        "workers": args.workers,
+        "app_env": args.app_env,
+    }
+
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    try:
+        with contextlib.ExitStack() as stack:
+            if args.app_url:
+                if not args.key_file:
+                    raise SystemExit("--app-url needs --key-file (the key the API's fake JWKS was started with)")
+                issuer = TokenIssuer.from_file(args.key_file)
+                base_url, app_pid = args.app_url.rstrip("/"), args.app_pid
+            else:
+                key_file = workdir / "signing-key.pem"
+                issuer = TokenIssuer.from_file(str(key_file))
+                supabase_port, openai_port, app_port = free_port(), free_port(), free_port()
+                fakes_log = workdir / "fakes.log"
+                fakes = stack.enter_context(
+                    _process(
+                        [
+                            sys.executable, "-m", "loadtest", "fakes",
+                            "--port", str(supabase_port),
+                            "--openai-port", str(openai_port),
+                            "--key-file", str(key_file),
+                            *fake_args(args),
+                        ],
+                        env=dict(os.environ),
+                        log_path=fakes_log,
+                    )
+                )
+                supabase_url, openai_url = f"http://127.0.0.1:{supabase_port}", f"http://127.0.0.1:{openai_port}"
+                # Seeding 100k-item users takes a while.
+                wait_ready(f"{supabase_url}/healthz", proc=fakes, timeout=600, log_path=fakes_log)
+                wait_ready(f"{openai_url}/healthz", proc=fakes, timeout=30, log_path=fakes_log)
+
+                app_log = workdir / "api.log"
+                app = stack.enter_context(
+                    _process(
+                        [
+                            sys.executable, "-m", "uvicorn", "app.main:app",
+                            "--host", "127.0.0.1",
+                            "--port", str(app_port),
+                            "--workers", str(args.workers),
+                            "--log-level", "warning",
+                            "--no-access-log",
+                        ],
+                        env=app_env(supabase_url=supabase_url, openai_url=openai_url, workdir=workdir, overrides=args.app_env),
+                        log_path=app_log,
+                    )
+                )
+                base_url, app_pid = f"http://127.0.0.1:{app_port}", app.pid
+                wait_ready(f"{base_url}/metrics", proc=app, timeout=60, log_path=app_log)
+
+            print(f"running {', '.join(scenarios)} for {args.duration:g}s at concurrency {args.concurrency} ({args.users} users, items {args.items})", file=sys.stderr)
+            recorder, memory = asyncio.run(
+                drive(
+                    base_url=base_url,
+                    users=users,
+                    issuer=issuer,
+                    scenarios=scenarios,
+                    assets=assets,
+                    concurrency=args.concurrency,
+                    duration=args.duration,
+                    warmup=args.warmup,
+                    bulk_size=args.bulk_size,
+                    seed=args.seed,
+                    app_pid=app_pid,
+                )
+            )
+    finally:
+        if args.keep_logs:
+            print(f"logs kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize(recorder, memory=memory, config=config)
+    print(format_summary(summary))
+    return summary
+
+
+def serve_fakes(args) -> None:
+    """Run the fake Supabase and OpenAI servers in this process until interrupted."""
+    import uvicorn
+
+    from loadtest import fake_openai, fake_supabase
+
+    issuer = TokenIssuer.from_file(args.key_file)
+    users = make_users(count=args.users, item_counts=parse_item_counts(args.items), seed=args.seed)
+    db = fake_supabase.FakeDatabase()
+    db.seed(users, seed=args.seed)
+    print(f"seeded {len(users)} users with {db.row_count('items'):,} items", file=sys.stderr)
+
+    supabase_app = fake_supabase.create_app(
+        db=db,
+        jwks=issuer.jwks(),
+        db_latency=Latency.parse(args.db_latency),
+        storage_latency=Latency.parse(args.storage_latency),
+    )
+    openai_app = fake_openai.create_app(
+        latency=Latency.parse(args.openai_latency),
+        token_ms=args.openai_token_ms,
+        embedding_latency=Latency.parse(args.embedding_latency),
+        scan_items=args.scan_items,
+    )
+    servers = [
+        uvicorn.Server(uvicorn.Config(supabase_app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)),
+        uvicorn.Server(uvicorn.Config(openai_app, host="127.0.0.1", port=args.openai_port, log_level="warning", access_log=False)),
+    ]
+
+    supabase_url = f"http://127.0.0.1:{args.port}"
+    print(
+        "point the API at these fakes with:\n"
+        f"  SUPABASE_URL={supabase_url}\n"
+        f"  SUPABASE_JWKS_URL={supabase_url}/auth/v1/.well-known/jwks.json\n"
+        f"  SUPABASE_SERVICE_ROLE_KEY={service_key()}\n"
+        f"  OPENAI_BASE_URL=http://127.0.0.1:{args.openai_port}/v1",
+        file=sys.stderr,
+    )
+
+    async def serve() -> None:
+        await asyncio.gather(*(s.serve() for s in servers))
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve())
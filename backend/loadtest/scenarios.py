@@ -0,0 +1,183 @@
+"""What one virtual user does per iteration, for each scenario.
+
+Every function issues one request (or one short sequence) against the API
+and records it under a stable name; ``SCENARIOS`` maps scenario names to the
+function and its weight in the ``mixed`` workload.
+"""
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from io import BytesIO
+
+import httpx
+
+from loadtest.report import Recorder, Sample
+from loadtest.users import ADJECTIVES, CATEGORIES, LOCATIONS, NOUNS, SyntheticUser, item_name
+
+
+@dataclass
+class Assets:
+    """Upload bodies generated once per run; a small pool so repeat uploads also exercise de-duplication."""
+
+    images: list[bytes]
+    documents: list[bytes]
+
+    @classmethod
+    def build(cls, *, variants: int, image_size: tuple[int, int], document_pages: int, scenarios: set[str]) -> Assets:
+        images = [_make_photo(image_size, seed=i) for i in range(variants)] if "image_scan" in scenarios else []
+        documents: list[bytes] = []
+        if "document_upload" in scenarios:
+            from benchmarks.fixtures import make_text_pdf
+
+            documents = [make_text_pdf(pages=document_pages, seed=i) for i in range(variants)]
+        return cls(images=images, documents=documents)
+
+
+def _make_photo(size: tuple[int, int], *, seed: int) -> bytes:
+    """A JPEG with enough detail that its size and decode cost resemble a phone photo."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    img = Image.effect_noise(size, 40).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for _ in range(60):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randrange(20, size[0] // 3), rng.randrange(20, size[1] // 3)
+        draw.rectangle((x, y, x + w, y + h), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+@dataclass
+class Session:
+    client: httpx.AsyncClient
+    user: SyntheticUser
+    token: str
+    recorder: Recorder
+    assets: Assets
+    rng: random.Random
+    bulk_size: int = 25
+    etags: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def call(self, name: str, method: str, url: str, *, revalidate: bool = False, **kwargs) -> httpx.Response | None:
+        headers = self.headers
+        if revalidate and url in self.etags:
+            headers = {**headers, "If-None-Match": self.etags[url]}
+        start = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.add(name, Sample(0, time.perf_counter() - start, error=type(e).__name__))
+            return None
+        self.recorder.add(name, Sample(resp.status_code, time.perf_counter() - start))
+        if revalidate and resp.headers.get("etag"):
+            self.etags[url] = resp.headers["etag"]
+        return resp
+
+
+def _phrase(rng: random.Random) -> str:
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}" if rng.random() < 0.5 else rng.choice(NOUNS)
+
+
+async def search(s: Session) -> None:
+    if s.rng.random() < 0.25:
+        await s.call("search_items[semantic]", "POST", "/search_items", json={"query": _phrase(s.rng), "mode": "semantic"})
+    else:
+        query = s.rng.choice(("where is my {}", "{}", "do I have a {}", "find the {}")).format(_phrase(s.rng))
+        await s.call("search_items[keyword]", "POST", "/search_items", json={"query": query})
+
+
+async def browse(s: Session) -> None:
+    """App start / pull-to-refresh: the list endpoints, revalidated with the ETags from the previous visit."""
+    await s.call("GET /items", "GET", "/items", revalidate=True)
+    await s.call("GET /inventory/stats", "GET", "/inventory/stats")
+    await s.call("GET /documents", "GET", "/documents", revalidate=True)
+    await s.call("GET /activity/recent", "GET", "/activity/recent", revalidate=True)
+
+
+async def bulk_create(s: Session) -> None:
+    items = [
+        {
+            "name": item_name(s.rng),
+            "category": s.rng.choice(CATEGORIES),
+            "quantity": s.rng.randint(1, 5),
+            "location": s.rng.choice(LOCATIONS),
+            "tags": [s.rng.choice(NOUNS)],
+        }
+        for _ in range(s.bulk_size)
+    ]
+    await s.call(f"bulk_create[{s.bulk_size}]", "POST", "/inventory/bulk_create", json={"items": items})
+
+
+async def image_scan(s: Session) -> None:
+    image = s.rng.choice(s.assets.images)
+    files = {"file": ("photo.jpg", image, "image/jpeg")}
+    if s.rng.random() < 0.5:
+        await s.call("inventory/extract_from_image", "POST", "/inventory/extract_from_image", files=files)
+    else:
+        # Single-item extraction also stores the photo and renders thumbnails.
+        await s.call("extract_from_image", "POST", "/extract_from_image", files=files)
+
+
+async def document_upload(s: Session) -> None:
+    i = s.rng.randrange(len(s.assets.documents))
+    files = {"file": (f"manual-{i}.pdf", s.assets.documents[i], "application/pdf")}
+    await s.call("documents/upload", "POST", "/documents/upload", files=files)
+
+
+_ASSIST_MESSAGES = (
+    "Where is my {}?",
+    "Add {} to the garage",
+    "How many {} do I have?",
+    "Find the {}",
+    "What should I restock?",
+)
+
+
+async def assist(s: Session) -> None:
+    """Streaming Assist; records total time and time to the first streamed text."""
+    message = s.rng.choice(_ASSIST_MESSAGES).format(_phrase(s.rng))
+    name = "ai_command[stream]"
+    start = time.perf_counter()
+    first_delta: float | None = None
+    done = False
+    try:
+        async with s.client.stream(
+            "POST", "/ai_command", params={"stream": "1"}, json={"message": message}, headers=s.headers
+        ) as resp:
+            if resp.status_code != 200:
+                await resp.aread()
+                s.recorder.add(name, Sample(resp.status_code, time.perf_counter() - start))
+                return
+            async for line in resp.aiter_lines():
+                if first_delta is None and '"type":"delta"' in line:
+                    first_delta = time.perf_counter() - start
+                elif '"type":"done"' in line:
+                    done = True
+    except httpx.HTTPError as e:
+        s.recorder.add(name, Sample(0, time.perf_counter() - start, error=type(e).__name__))
+        return
+
+    elapsed = time.perf_counter() - start
+    s.recorder.add(name, Sample(200, elapsed, ttfb=first_delta, error=None if done else "stream ended without done"))
+
+
+Scenario = Callable[[Session], Awaitable[None]]
+
+# name -> (function, weight in the "mixed" workload)
+SCENARIOS: dict[str, tuple[Scenario, int]] = {
+    "search": (search, 4),
+    "browse": (browse, 4),
+    "bulk_create": (bulk_create, 1),
+    "image_scan": (image_scan, 1),
+    "document_upload": (document_upload, 1),
+    "assist": (assist, 2),
+}
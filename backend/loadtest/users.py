@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import base64
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+
+# Shared by the seeded rows, the fake model's answers and the scenario
+# queries, so searches actually match something.
+NOUNS = (
+    "drill", "battery", "charger", "hammer", "wrench", "screwdriver", "tape", "glue", "filter", "bulb",
+    "cable", "adapter", "saw", "clamp", "sander", "ladder", "paint", "brush", "gloves", "mask",
+    "blender", "kettle", "toaster", "pan", "knife", "router", "monitor", "keyboard", "mouse", "lamp",
+)
+ADJECTIVES = ("cordless", "spare", "small", "large", "red", "blue", "old", "new", "heavy", "portable")
+CATEGORIES = ("Tools", "Kitchen", "Electronics", "Garden", "Cleaning", "Hardware", "Office")
+LOCATIONS = ("Garage", "Basement", "Kitchen", "Office", "Closet", "Attic", "Shed")
+BRANDS = (None, "Makita", "Bosch", "DeWalt", "Philips", "Anker", "Logitech")
+FIRST_NAMES = ("Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie")
+
+_NAMESPACE = uuid.UUID("6f1c9a52-8d1e-4c59-9a57-3f0c7d2b1e40")
+_SEED_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class SyntheticUser:
+    user_id: str
+    first_name: str
+    item_count: int
+
+
+def parse_item_counts(value: str) -> list[int]:
+    """``"100,10000,100000"`` -> item counts assigned to users round-robin."""
+    counts = [int(v.replace("_", "")) for v in value.split(",") if v.strip()]
+    if not counts or any(c < 0 for c in counts):
+        raise ValueError(f"invalid item counts: {value!r}")
+    return counts
+
+
+def make_users(*, count: int, item_counts: list[int], seed: int = 0) -> list[SyntheticUser]:
+    """Deterministic users, so the fake upstreams and the load driver agree without sharing state."""
+    return [
+        SyntheticUser(
+            user_id=str(uuid.uuid5(_NAMESPACE, f"{seed}:{i}")),
+            first_name=FIRST_NAMES[i % len(FIRST_NAMES)],
+            item_count=item_counts[i % len(item_counts)],
+        )
+        for i in range(count)
+    ]
+
+
+def item_name(rng: random.Random) -> str:
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}".title()
+
+
+def make_item_rows(user: SyntheticUser, *, seed: int = 0) -> list[dict]:
+    """``user.item_count`` rows shaped like the ``items`` table, oldest first."""
+    rng = random.Random(f"{seed}:{user.user_id}")
+    rows: list[dict] = []
+    for i in range(user.item_count):
+        created = (_SEED_EPOCH + timedelta(seconds=i)).isoformat()
+        name = item_name(rng)
+        path = f"{user.user_id}/{uuid.UUID(int=rng.getrandbits(128)).hex}.jpg" if rng.random() < 0.6 else None
+        rows.append(
+            {
+                "item_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "user_id": user.user_id,
+                "name": name,
+                "category": rng.choice(CATEGORIES),
+                "subcategory": None,
+                "brand": rng.choice(BRANDS),
+                "part_number": None,
+                "tags": name.lower().split(),
+                "confidence": round(rng.random(), 3),
+                "quantity": rng.randint(0, 12),
+                "location": rng.choice(LOCATIONS),
+                "image_url": None,
+                "image_path": path,
+                "barcode": str(rng.randrange(10**11, 10**12)) if rng.random() < 0.3 else None,
+                "purchase_source": rng.choice((None, "Home Depot", "Amazon", "IKEA")),
+                "notes": " ".join(rng.choices(NOUNS + ADJECTIVES, k=8)),
+                "created_at": created,
+                "updated_at": created,
+                "embedding_hash": None,
+            }
+        )
+    return rows
+
+
+def _b64url(n: int, length: int) -> str:
+    return base64.urlsafe_b64encode(n.to_bytes(length, "big")).rstrip(b"=").decode()
+
+
+class TokenIssuer:
+    """ES256 signing key whose public half is served as the fake JWKS; mints access tokens for synthetic users."""
+
+    def __init__(self, private_key_pem: str | None = None, *, kid: str = "loadtest", audience: str = "authenticated") -> None:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        if private_key_pem is None:
+            key = ec.generate_private_key(ec.SECP256R1())
+            private_key_pem = key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            ).decode()
+        else:
+            key = serialization.load_pem_private_key(private_key_pem.encode(), password=None)
+        numbers = key.public_key().public_numbers()
+        self.kid = kid
+        self.audience = audience
+        self.pem = private_key_pem
+        self._jwk = {
+            "kty": "EC",
+            "crv": "P-256",
+            "alg": "ES256",
+            "use": "sig",
+            "kid": kid,
+            "x": _b64url(numbers.x, 32),
+            "y": _b64url(numbers.y, 32),
+        }
+
+    @classmethod
+    def from_file(cls, path: str) -> TokenIssuer:
+        """Load the signing key from ``path``, creating it first if missing (lets separate processes share it)."""
+        if os.path.exists(path):
+            with open(path, encoding="ascii") as f:
+                return cls(f.read())
+        issuer = cls()
+        with open(path, "w", encoding="ascii") as f:
+            f.write(issuer.pem)
+        return issuer
+
+    def jwks(self) -> dict:
+        return {"keys": [self._jwk]}
+
+    def token(self, user_id: str, *, ttl_seconds: int = 24 * 3600) -> str:
+        from jose import jwt
+
+        now = int(time.time())
+        claims = {"sub": user_id, "aud": self.audience, "role": "authenticated", "iat": now, "exp": now + ttl_seconds}
+        return jwt.encode(claims, self.pem, algorithm="ES256", headers={"kid": self.kid})
+
+
+def service_key() -> str:
+    """A JWT-shaped placeholder; the Supabase client rejects keys that don't look like one."""
+    from jose import jwt
+
+    return jwt.encode({"role": "service_role"}, "loadtest", algorithm="HS256")
@@ -0,0 +1,2 @@
+alter table public.items
+  add column if not exists image_path text;
@@ -0,0 +1,55 @@
+-- Content-addressed storage objects (<user_id>/<sha256><ext>) shared by every
+-- record that references the same bytes. Objects are removed from Storage only
+-- when ref_count drops to zero.
+create table if not exists public.storage_blobs (
+  bucket text not null,
+  path text not null,
+  user_id uuid not null,
+  sha256 text not null,
+  size_bytes bigint not null,
+  ref_count integer not null default 0,
+  created_at timestamptz not null default now(),
+  primary key (bucket, path)
+);
+
+alter table public.storage_blobs enable row level security;
+
+create index if not exists idx_storage_blobs_user on public.storage_blobs (user_id);
+
+create or replace function public.acquire_storage_blob(
+  p_bucket text,
+  p_path text,
+  p_user_id uuid,
+  p_sha256 text,
+  p_size_bytes bigint
+) returns integer
+language sql
+as $$
+  insert into public.storage_blobs (bucket, path, user_id, sha256, size_bytes, ref_count)
+  values (p_bucket, p_path, p_user_id, p_sha256, p_size_bytes, 1)
+  on conflict (bucket, path) do update set ref_count = public.storage_blobs.ref_count + 1
+  returning ref_count;
+$$;
+
+create or replace function public.release_storage_blob(p_bucket text, p_path text) returns integer
+language plpgsql
+as $$
+declare
+  remaining integer;
+begin
+  update public.storage_blobs
+    set ref_count = greatest(ref_count - 1, 0)
+    where bucket = p_bucket and path = p_path
+    returning ref_count into remaining;
+
+  if remaining is null then
+    return 0;
+  end if;
+
+  if remaining = 0 then
+    delete from public.storage_blobs where bucket = p_bucket and path = p_path and ref_count = 0;
+  end if;
+
+  return remaining;
+end;
+$$;
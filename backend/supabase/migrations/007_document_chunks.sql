@@ -0,0 +1,61 @@
+alter table public.documents
+  add column if not exists ai_access_granted boolean not null default false,
+  add column if not exists ai_access_granted_at timestamptz;
+
+-- Extracted document text split into passages for full-text search.
+create table if not exists public.document_chunks (
+  chunk_id uuid primary key default gen_random_uuid(),
+  user_id uuid not null,
+  storage_path text not null,
+  chunk_index integer not null,
+  page_start integer,
+  page_end integer,
+  content text not null,
+  content_tsv tsvector generated always as (to_tsvector('english', content)) stored,
+  created_at timestamptz not null default now(),
+  unique (user_id, storage_path, chunk_index)
+);
+
+alter table public.document_chunks enable row level security;
+
+create policy "document_chunks_select_own" on public.document_chunks
+  for select
+  using (auth.uid() = user_id);
+
+create index if not exists idx_document_chunks_tsv on public.document_chunks using gin (content_tsv);
+create index if not exists idx_document_chunks_user_path on public.document_chunks (user_id, storage_path);
+
+create or replace function public.search_document_chunks(
+  p_user_id uuid,
+  p_query text,
+  p_limit integer default 10,
+  p_require_ai_access boolean default false
+) returns table (
+  storage_path text,
+  filename text,
+  chunk_index integer,
+  page_start integer,
+  page_end integer,
+  rank real,
+  snippet text
+)
+language sql
+stable
+as $$
+  select
+    c.storage_path,
+    d.filename,
+    c.chunk_index,
+    c.page_start,
+    c.page_end,
+    ts_rank_cd(c.content_tsv, q) as rank,
+    ts_headline('english', c.content, q, 'MaxFragments=2, MinWords=8, MaxWords=40, StartSel=**, StopSel=**') as snippet
+  from public.document_chunks c
+  join public.documents d on d.user_id = c.user_id and d.storage_path = c.storage_path
+  cross join websearch_to_tsquery('english', p_query) q
+  where c.user_id = p_user_id
+    and c.content_tsv @@ q
+    and (not p_require_ai_access or d.ai_access_granted)
+  order by rank desc
+  limit p_limit;
+$$;
@@ -0,0 +1,88 @@
+-- Per-user inventory aggregates kept current by triggers on items, so counts
+-- by category/location are a single indexed read instead of a scan.
+-- dimension is 'total', 'category' or 'location'; key is '' for 'total'.
+create table if not exists public.user_inventory_stats (
+  user_id uuid not null,
+  dimension text not null,
+  key text not null,
+  item_count integer not null default 0,
+  total_quantity bigint not null default 0,
+  updated_at timestamptz not null default now(),
+  primary key (user_id, dimension, key)
+);
+
+alter table public.user_inventory_stats enable row level security;
+
+create policy "user_inventory_stats_select_own" on public.user_inventory_stats
+  for select
+  using (auth.uid() = user_id);
+
+create or replace function public.apply_inventory_stats_delta(
+  p_user_id uuid,
+  p_category text,
+  p_location text,
+  p_count integer,
+  p_quantity bigint
+) returns void
+language plpgsql
+as $$
+declare
+  d record;
+begin
+  for d in
+    select * from (values
+      ('total', ''),
+      ('category', coalesce(nullif(trim(p_category), ''), 'Uncategorized')),
+      ('location', coalesce(nullif(trim(p_location), ''), 'Unknown'))
+    ) as v(dimension, key)
+  loop
+    insert into public.user_inventory_stats as s (user_id, dimension, key, item_count, total_quantity, updated_at)
+    values (p_user_id, d.dimension, d.key, p_count, p_quantity, now())
+    on conflict (user_id, dimension, key) do update
+      set item_count = s.item_count + excluded.item_count,
+          total_quantity = s.total_quantity + excluded.total_quantity,
+          updated_at = now();
+  end loop;
+
+  delete from public.user_inventory_stats
+  where user_id = p_user_id and dimension <> 'total' and item_count <= 0;
+end;
+$$;
+
+create or replace function public.items_maintain_inventory_stats()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.apply_inventory_stats_delta(old.user_id, old.category, old.location, -1, -coalesce(old.quantity, 0));
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.apply_inventory_stats_delta(new.user_id, new.category, new.location, 1, coalesce(new.quantity, 0));
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists items_inventory_stats on public.items;
+create trigger items_inventory_stats
+  after insert or delete or update of user_id, category, location, quantity on public.items
+  for each row execute function public.items_maintain_inventory_stats();
+
+-- Backfill from existing rows.
+delete from public.user_inventory_stats;
+
+insert into public.user_inventory_stats (user_id, dimension, key, item_count, total_quantity)
+select user_id, 'total', '', count(*), coalesce(sum(quantity), 0)
+from public.items
+group by user_id;
+
+insert into public.user_inventory_stats (user_id, dimension, key, item_count, total_quantity)
+select user_id, 'category', coalesce(nullif(trim(category), ''), 'Uncategorized'), count(*), coalesce(sum(quantity), 0)
+from public.items
+group by 1, 3;
+
+insert into public.user_inventory_stats (user_id, dimension, key, item_count, total_quantity)
+select user_id, 'location', coalesce(nullif(trim(location), ''), 'Unknown'), count(*), coalesce(sum(quantity), 0)
+from public.items
+group by 1, 3;
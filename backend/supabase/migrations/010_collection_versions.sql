@@ -0,0 +1,82 @@
+-- Per-user version counters for list endpoints. Any write to a tracked table
+-- bumps the owning user's counter; the API turns it into an ETag.
+create table if not exists public.user_collection_versions (
+  user_id uuid not null,
+  collection text not null,
+  version bigint not null default 0,
+  updated_at timestamptz not null default now(),
+  primary key (user_id, collection)
+);
+
+alter table public.user_collection_versions enable row level security;
+
+create or replace function public.bump_collection_versions()
+returns trigger
+language plpgsql
+as $$
+declare
+  v_collection text := tg_argv[0];
+begin
+  if tg_op = 'DELETE' then
+    insert into public.user_collection_versions as v (user_id, collection, version)
+    select distinct user_id, v_collection, 1 from old_rows
+    on conflict (user_id, collection) do update
+      set version = v.version + 1, updated_at = now();
+  else
+    insert into public.user_collection_versions as v (user_id, collection, version)
+    select distinct user_id, v_collection, 1 from new_rows
+    on conflict (user_id, collection) do update
+      set version = v.version + 1, updated_at = now();
+  end if;
+  return null;
+end;
+$$;
+
+create or replace function public.bump_collection_version_row()
+returns trigger
+language plpgsql
+as $$
+begin
+  insert into public.user_collection_versions as v (user_id, collection, version)
+  values (new.user_id, tg_argv[0], 1)
+  on conflict (user_id, collection) do update
+    set version = v.version + 1, updated_at = now();
+  return null;
+end;
+$$;
+
+-- Statement-level triggers, so a batched insert bumps each user once. Item
+-- updates use a row-level trigger limited to client-visible columns, so
+-- background embedding writes don't invalidate listings.
+drop trigger if exists items_version_ins on public.items;
+drop trigger if exists items_version_upd on public.items;
+drop trigger if exists items_version_del on public.items;
+create trigger items_version_ins after insert on public.items
+  referencing new table as new_rows for each statement execute function public.bump_collection_versions('items');
+create trigger items_version_upd
+  after update of name, category, subcategory, brand, part_number, tags, confidence, quantity, location,
+    image_url, image_path, barcode, purchase_source, notes
+  on public.items
+  for each row execute function public.bump_collection_version_row('items');
+create trigger items_version_del after delete on public.items
+  referencing old table as old_rows for each statement execute function public.bump_collection_versions('items');
+
+drop trigger if exists documents_version_ins on public.documents;
+drop trigger if exists documents_version_upd on public.documents;
+drop trigger if exists documents_version_del on public.documents;
+create trigger documents_version_ins after insert on public.documents
+  referencing new table as new_rows for each statement execute function public.bump_collection_versions('documents');
+create trigger documents_version_upd after update on public.documents
+  referencing new table as new_rows for each statement execute function public.bump_collection_versions('documents');
+create trigger documents_version_del after delete on public.documents
+  referencing old table as old_rows for each statement execute function public.bump_collection_versions('documents');
+
+drop trigger if exists activity_log_version_ins on public.activity_log;
+drop trigger if exists activity_log_version_upd on public.activity_log;
+drop trigger if exists activity_log_version_del on public.activity_log;
+create trigger activity_log_version_ins after insert on public.activity_log
+  referencing new table as new_rows for each statement execute function public.bump_collection_versions('activity');
+create trigger activity_log_version_upd after update on public.activity_log
+  referencing new table as new_rows for each statement execute function public.bump_collection_versions('activity');
+create trigger activity_log_version_del after delete on public.activity_log
+  referencing old table as old_rows for each statement execute function public.bump_collection_versions('activity');
@@ -0,0 +1,158 @@
+-- Delta sync: change timestamps on items/documents plus tombstones for deletes.
+alter table public.items
+  add column if not exists updated_at timestamptz;
+update public.items set updated_at = created_at where updated_at is null;
+alter table public.items
+  alter column updated_at set default now(),
+  alter column updated_at set not null;
+
+alter table public.documents
+  add column if not exists file_type text,
+  add column if not exists size_bytes bigint,
+  add column if not exists updated_at timestamptz;
+update public.documents set updated_at = created_at where updated_at is null;
+alter table public.documents
+  alter column updated_at set default now(),
+  alter column updated_at set not null;
+
+create index if not exists idx_items_user_updated_at on public.items (user_id, updated_at);
+create index if not exists idx_documents_user_updated_at on public.documents (user_id, updated_at);
+
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+-- Only client-visible columns count as a change; background embedding
+-- writes must not make every client re-download the item.
+drop trigger if exists items_touch_updated_at on public.items;
+create trigger items_touch_updated_at
+  before update of name, category, subcategory, brand, part_number, tags, confidence, quantity, location,
+    image_url, image_path, barcode, purchase_source, notes
+  on public.items
+  for each row execute function public.touch_updated_at();
+
+drop trigger if exists documents_touch_updated_at on public.documents;
+create trigger documents_touch_updated_at
+  before update of filename, mime_type, file_type, size_bytes, ai_access_granted, ai_access_granted_at
+  on public.documents
+  for each row execute function public.touch_updated_at();
+
+create table if not exists public.sync_tombstones (
+  user_id uuid not null,
+  collection text not null,
+  record_id text not null,
+  deleted_at timestamptz not null default now(),
+  primary key (user_id, collection, record_id)
+);
+
+create index if not exists idx_sync_tombstones_user_deleted_at on public.sync_tombstones (user_id, deleted_at);
+
+alter table public.sync_tombstones enable row level security;
+
+-- Tombstones older than this are pruned; sync tokens older than this get a full resync.
+create or replace function public.sync_tombstone_retention()
+returns interval
+language sql
+immutable
+as $$ select interval '30 days' $$;
+
+create or replace function public.record_sync_tombstone()
+returns trigger
+language plpgsql
+as $$
+declare
+  v_record_id text := case tg_argv[0] when 'items' then old.item_id::text else old.storage_path end;
+begin
+  insert into public.sync_tombstones (user_id, collection, record_id, deleted_at)
+  values (old.user_id, tg_argv[0], v_record_id, now())
+  on conflict (user_id, collection, record_id) do update set deleted_at = excluded.deleted_at;
+
+  delete from public.sync_tombstones
+  where user_id = old.user_id and deleted_at < now() - public.sync_tombstone_retention();
+  return null;
+end;
+$$;
+
+drop trigger if exists items_sync_tombstone on public.items;
+create trigger items_sync_tombstone after delete on public.items
+  for each row execute function public.record_sync_tombstone('items');
+
+drop trigger if exists documents_sync_tombstone on public.documents;
+create trigger documents_sync_tombstone after delete on public.documents
+  for each row execute function public.record_sync_tombstone('documents');
+
+-- A re-created record must not stay deleted on clients.
+create or replace function public.clear_sync_tombstone()
+returns trigger
+language plpgsql
+as $$
+begin
+  delete from public.sync_tombstones
+  where user_id = new.user_id
+    and collection = tg_argv[0]
+    and record_id = case tg_argv[0] when 'items' then new.item_id::text else new.storage_path end;
+  return null;
+end;
+$$;
+
+drop trigger if exists documents_clear_sync_tombstone on public.documents;
+create trigger documents_clear_sync_tombstone after insert on public.documents
+  for each row execute function public.clear_sync_tombstone('documents');
+
+-- Everything that changed for a user since p_since. A null or too-old p_since
+-- returns the full collections with full = true so the client replaces its copy.
+create or replace function public.sync_changes(
+  p_user_id uuid,
+  p_since timestamptz default null
+) returns jsonb
+language plpgsql
+stable
+as $$
+declare
+  v_now timestamptz := clock_timestamp();
+  v_full boolean := p_since is null or p_since < now() - public.sync_tombstone_retention();
+begin
+  return jsonb_build_object(
+    'server_time', v_now,
+    'full', v_full,
+    'items', coalesce((
+      select jsonb_agg(to_jsonb(i) - 'embedding' - 'embedding_hash' - 'search_tsv' order by i.updated_at)
+      from public.items i
+      where i.user_id = p_user_id and (v_full or i.updated_at > p_since)
+    ), '[]'::jsonb),
+    'documents', coalesce((
+      select jsonb_agg(
+        jsonb_build_object(
+          'user_id', d.user_id,
+          'filename', d.filename,
+          'storage_path', d.storage_path,
+          'mime_type', d.mime_type,
+          'file_type', d.file_type,
+          'size_bytes', d.size_bytes,
+          'created_at', d.created_at,
+          'updated_at', d.updated_at,
+          'ai_access_granted', d.ai_access_granted,
+          'ai_access_granted_at', d.ai_access_granted_at
+        ) order by d.updated_at)
+      from public.documents d
+      where d.user_id = p_user_id and (v_full or d.updated_at > p_since)
+    ), '[]'::jsonb),
+    'deleted_items', coalesce((
+      select jsonb_agg(t.record_id)
+      from public.sync_tombstones t
+      where not v_full and t.user_id = p_user_id and t.collection = 'items' and t.deleted_at > p_since
+    ), '[]'::jsonb),
+    'deleted_documents', coalesce((
+      select jsonb_agg(t.record_id)
+      from public.sync_tombstones t
+      where not v_full and t.user_id = p_user_id and t.collection = 'documents' and t.deleted_at > p_since
+    ), '[]'::jsonb)
+  );
+end;
+$$;
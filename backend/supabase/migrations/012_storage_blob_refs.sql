@@ -0,0 +1,24 @@
+-- References are now taken when an item or document row is written, which may
+-- only know the object's path (e.g. an item saved from an earlier scan), so the
+-- digest and size become optional.
+alter table public.storage_blobs
+  alter column sha256 drop not null,
+  alter column size_bytes drop not null;
+
+create or replace function public.acquire_storage_blob(
+  p_bucket text,
+  p_path text,
+  p_user_id uuid,
+  p_sha256 text,
+  p_size_bytes bigint
+) returns integer
+language sql
+as $$
+  insert into public.storage_blobs (bucket, path, user_id, sha256, size_bytes, ref_count)
+  values (p_bucket, p_path, p_user_id, p_sha256, p_size_bytes, 1)
+  on conflict (bucket, path) do update set
+    ref_count = public.storage_blobs.ref_count + 1,
+    sha256 = coalesce(public.storage_blobs.sha256, excluded.sha256),
+    size_bytes = coalesce(public.storage_blobs.size_bytes, excluded.size_bytes)
+  returning ref_count;
+$$;
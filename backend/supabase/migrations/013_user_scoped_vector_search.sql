@@ -0,0 +1,149 @@
+-- Semantic candidates are ranked exactly within the caller's own rows.
+--
+-- The HNSW indexes from 008 span every tenant: "order by embedding <=> q limit n"
+-- walked the shared graph (hnsw.ef_search = 40 candidates by default) and the
+-- user_id filter was applied to whatever came back, so most users got few or
+-- no semantic hits. The candidate sets below are materialized from the
+-- user_id-leading btree indexes first, which the planner cannot push an
+-- index-ordered scan through, so the distance sort is exact over one user's
+-- rows. The shared HNSW indexes are no longer used and are dropped.
+--
+-- search_document_chunks also applies p_require_ai_access inside the candidate
+-- CTEs, so passages from documents without AI access can no longer use up the
+-- candidate limit before they are filtered out.
+
+drop index if exists public.idx_items_embedding;
+drop index if exists public.idx_document_chunks_embedding;
+
+create or replace function public.match_items_hybrid(
+  p_user_id uuid,
+  p_query text,
+  p_embedding vector(256) default null,
+  p_limit integer default 50,
+  p_semantic_weight real default 0.7
+) returns table (
+  item jsonb,
+  score real
+)
+language sql
+stable
+as $$
+  with mine as materialized (
+    select i.item_id, i.embedding
+    from public.items i
+    where p_embedding is not null
+      and i.user_id = p_user_id
+      and i.embedding is not null
+  ),
+  vec as (
+    select m.item_id, (1 - (m.embedding <=> p_embedding))::real as sim
+    from mine m
+    order by m.embedding <=> p_embedding
+    limit greatest(p_limit * 4, 50)
+  ),
+  lex as (
+    select i.item_id, ts_rank_cd(i.search_tsv, q)::real as rank
+    from public.items i
+    cross join websearch_to_tsquery('english', p_query) q
+    where i.user_id = p_user_id
+      and i.search_tsv @@ q
+    order by rank desc
+    limit greatest(p_limit * 4, 50)
+  ),
+  scored as (
+    select
+      coalesce(vec.item_id, lex.item_id) as item_id,
+      (p_semantic_weight * coalesce(vec.sim, 0)
+        + (1 - p_semantic_weight) * least(coalesce(lex.rank, 0), 1))::real as score
+    from vec
+    full outer join lex on lex.item_id = vec.item_id
+  )
+  select to_jsonb(i) - 'embedding' - 'embedding_hash' - 'search_tsv' as item, s.score
+  from scored s
+  join public.items i on i.item_id = s.item_id
+  order by s.score desc
+  limit p_limit;
+$$;
+
+create or replace function public.search_document_chunks(
+  p_user_id uuid,
+  p_query text,
+  p_limit integer default 10,
+  p_require_ai_access boolean default false,
+  p_embedding vector(256) default null,
+  p_semantic_weight real default 0.7
+) returns table (
+  storage_path text,
+  filename text,
+  chunk_index integer,
+  page_start integer,
+  page_end integer,
+  rank real,
+  snippet text
+)
+language sql
+stable
+as $$
+  with q as (
+    select websearch_to_tsquery('english', p_query) as tsq
+  ),
+  allowed as materialized (
+    select d.storage_path
+    from public.documents d
+    where d.user_id = p_user_id
+      and (not p_require_ai_access or d.ai_access_granted)
+  ),
+  mine as materialized (
+    select c.chunk_id, c.embedding
+    from public.document_chunks c
+    join allowed a on a.storage_path = c.storage_path
+    where p_embedding is not null
+      and c.user_id = p_user_id
+      and c.embedding is not null
+  ),
+  vec as (
+    select m.chunk_id, (1 - (m.embedding <=> p_embedding))::real as sim
+    from mine m
+    order by m.embedding <=> p_embedding
+    limit greatest(p_limit * 4, 40)
+  ),
+  lex as (
+    select c.chunk_id, ts_rank_cd(c.content_tsv, q.tsq)::real as rank
+    from public.document_chunks c
+    join allowed a on a.storage_path = c.storage_path
+    cross join q
+    where c.user_id = p_user_id
+      and c.content_tsv @@ q.tsq
+    order by rank desc
+    limit greatest(p_limit * 4, 40)
+  ),
+  scored as (
+    select
+      coalesce(vec.chunk_id, lex.chunk_id) as chunk_id,
+      case
+        when p_embedding is null then coalesce(lex.rank, 0)
+        else (p_semantic_weight * coalesce(vec.sim, 0)
+          + (1 - p_semantic_weight) * least(coalesce(lex.rank, 0), 1))
+      end::real as score
+    from vec
+    full outer join lex on lex.chunk_id = vec.chunk_id
+  )
+  select
+    c.storage_path,
+    d.filename,
+    c.chunk_index,
+    c.page_start,
+    c.page_end,
+    s.score as rank,
+    case
+      when c.content_tsv @@ q.tsq
+        then ts_headline('english', c.content, q.tsq, 'MaxFragments=2, MinWords=8, MaxWords=40, StartSel=**, StopSel=**')
+      else left(c.content, 280)
+    end as snippet
+  from scored s
+  join public.document_chunks c on c.chunk_id = s.chunk_id
+  join public.documents d on d.user_id = c.user_id and d.storage_path = c.storage_path
+  cross join q
+  order by s.score desc
+  limit p_limit;
+$$;
@@ -0,0 +1,48 @@
+-- Blob references are scoped to the blob's owner.
+--
+-- An item's image_path comes from the client, so a row can point at a path
+-- its user doesn't own. acquire only counts the owner's own blobs, and release
+-- only decrements a blob of p_user_id that still holds a reference. It returns
+-- null for a path that is untracked or belongs to someone else, which the API
+-- treats as "not ours to delete" rather than "last reference gone".
+
+create or replace function public.acquire_storage_blob(
+  p_bucket text,
+  p_path text,
+  p_user_id uuid,
+  p_sha256 text,
+  p_size_bytes bigint
+) returns integer
+language sql
+as $$
+  insert into public.storage_blobs as b (bucket, path, user_id, sha256, size_bytes, ref_count)
+  values (p_bucket, p_path, p_user_id, p_sha256, p_size_bytes, 1)
+  on conflict (bucket, path) do update set
+    ref_count = b.ref_count + 1,
+    sha256 = coalesce(b.sha256, excluded.sha256),
+    size_bytes = coalesce(b.size_bytes, excluded.size_bytes)
+    where b.user_id = excluded.user_id
+  returning ref_count;
+$$;
+
+drop function if exists public.release_storage_blob(text, text);
+
+create or replace function public.release_storage_blob(p_bucket text, p_path text, p_user_id uuid) returns integer
+language plpgsql
+as $$
+declare
+  remaining integer;
+begin
+  update public.storage_blobs
+    set ref_count = ref_count - 1
+    where bucket = p_bucket and path = p_path and user_id = p_user_id and ref_count > 0
+    returning ref_count into remaining;
+
+  if remaining = 0 then
+    delete from public.storage_blobs
+      where bucket = p_bucket and path = p_path and user_id = p_user_id and ref_count = 0;
+  end if;
+
+  return remaining;
+end;
+$$;
@@ -0,0 +1,20 @@
+-- Uploads are recorded as blobs of their owner before any row references them.
+--
+-- Item writes only accept an image_path that is a blob of the caller, so a
+-- fresh upload must be known before the item pointing at it is saved. The
+-- row starts with ref_count 0 and is counted up by acquire_storage_blob when
+-- a record is written; an existing row (of any owner) is left untouched.
+
+create or replace function public.register_storage_blob(
+  p_bucket text,
+  p_path text,
+  p_user_id uuid,
+  p_sha256 text,
+  p_size_bytes bigint
+) returns void
+language sql
+as $$
+  insert into public.storage_blobs (bucket, path, user_id, sha256, size_bytes, ref_count)
+  values (p_bucket, p_path, p_user_id, p_sha256, p_size_bytes, 0)
+  on conflict (bucket, path) do nothing;
+$$;
@@ -0,0 +1,73 @@
+"""Run the API's repositories against the in-memory Supabase stand-in from ``loadtest``.
+
+Run from ``backend/``: ``python -m pytest tests``.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+import uvicorn
+
+from loadtest.fake_supabase import FakeDatabase, create_app
+from loadtest.runner import free_port
+from loadtest.users import service_key
+
+_PORT = free_port()
+_WORKDIR = Path(tempfile.mkdtemp(prefix="api-tests-"))
+
+# Settings are read once per process, so these must be in place before any app import.
+os.environ.update(
+    {
+        "SUPABASE_URL": f"http://127.0.0.1:{_PORT}",
+        "SUPABASE_ANON_KEY": service_key(),
+        "SUPABASE_SERVICE_ROLE_KEY": service_key(),
+        "SUPABASE_JWKS_URL": f"http://127.0.0.1:{_PORT}/auth/v1/.well-known/jwks.json",
+        "OPENAI_API_KEY": "sk-test",
+        "JOB_QUEUE_PATH": str(_WORKDIR / "jobs.sqlite3"),
+        "EVENTS_DATABASE_URL": "",
+        "RATE_LIMIT_REDIS_URL": "",
+        "TRACING_EXPORTER": "none",
+        "METRICS_TOKEN": "",
+    }
+)
+
+
+@pytest.fixture(scope="session")
+def fake_db() -> FakeDatabase:
+    db = FakeDatabase()
+    server = uvicorn.Server(uvicorn.Config(create_app(db=db, jwks={"keys": []}), port=_PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("fake Supabase did not start")
+        time.sleep(0.05)
+    yield db
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def stored_image(fake_db):
+    """Factory for an uploaded, not yet referenced image of a user; returns its path."""
+    from app.core.config import get_settings
+
+    bucket = get_settings().supabase_storage_bucket
+
+    def make(user_id: str) -> str:
+        path = f"{user_id}/{uuid4().hex * 2}.png"
+        fake_db.objects[(bucket, path)] = b"png"
+        fake_db.rpc(
+            "register_storage_blob",
+            {"p_bucket": bucket, "p_path": path, "p_user_id": user_id, "p_sha256": None, "p_size_bytes": 3},
+        )
+        return path
+
+    return make
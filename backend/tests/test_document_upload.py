@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from starlette.datastructures import QueryParams
+
+from app.core.auth import AuthenticatedUser, get_current_user
+from app.main import app
+
+
+def test_repeat_upload_returns_existing_document_without_new_jobs(fake_db):
+    user = str(uuid4())
+    app.dependency_overrides[get_current_user] = lambda: AuthenticatedUser(user_id=user)
+    try:
+        client = TestClient(app)
+        files = {"file": ("manual.txt", b"Torque settings: 40 Nm", "text/plain")}
+
+        first = client.post("/documents/upload", files=files)
+        assert first.status_code == 200
+        assert first.json()["job_ids"]
+
+        again = client.post("/documents/upload", files=files)
+        assert again.status_code == 200
+        assert again.json()["job_ids"] == []
+        assert again.json()["document"]["storage_path"] == first.json()["document"]["storage_path"]
+        assert len(fake_db.query("documents", QueryParams({"user_id": f"eq.{user}"}))) == 1
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
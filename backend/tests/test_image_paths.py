@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.auth import AuthenticatedUser, get_current_user
+from app.main import app
+from app.services.storage import attach_thumbnail_urls
+
+
+@pytest.fixture
+def client_as(fake_db):
+    def make(user_id: str) -> TestClient:
+        app.dependency_overrides[get_current_user] = lambda: AuthenticatedUser(user_id=user_id)
+        return TestClient(app)
+
+    yield make
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def _item(image_path: str) -> dict:
+    return {"name": "Drill", "category": "Tools", "quantity": 1, "location": "Garage", "image_path": image_path}
+
+
+def test_add_item_accepts_own_upload(client_as, stored_image):
+    user = str(uuid4())
+    resp = client_as(user).post("/add_item", json=_item(stored_image(user)))
+    assert resp.status_code == 200
+
+
+def test_add_item_rejects_another_users_image(client_as, stored_image):
+    owner, other = str(uuid4()), str(uuid4())
+    resp = client_as(other).post("/add_item", json=_item(stored_image(owner)))
+    assert resp.status_code == 400
+
+
+def test_add_item_rejects_unknown_image_under_own_prefix(client_as):
+    user = str(uuid4())
+    resp = client_as(user).post("/add_item", json=_item(f"{user}/{uuid4().hex}.png"))
+    assert resp.status_code == 400
+
+
+def test_update_item_rejects_another_users_image(client_as, stored_image):
+    owner, other = str(uuid4()), str(uuid4())
+    client = client_as(other)
+    item = client.post("/add_item", json=_item(stored_image(other))).json()["item"]
+
+    resp = client.patch("/update_item", json={"item_id": item["item_id"], "image_path": stored_image(owner)})
+    assert resp.status_code == 400
+
+
+def test_thumbnail_urls_only_signed_for_owners_images(fake_db):
+    owner, other = str(uuid4()), str(uuid4())
+    items = [
+        {"user_id": owner, "image_path": f"{owner}/a.png"},
+        {"user_id": other, "image_path": f"{owner}/a.png"},
+    ]
+    own, foreign = attach_thumbnail_urls(items)
+    assert own.get("image_url")
+    assert "image_url" not in foreign and "thumbnail_urls" not in foreign
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from app.services.job_queue import JobQueue, job_handler
+
+_release = threading.Event()
+_runs: list[dict] = []
+
+
+@job_handler("test_blocking")
+def _blocking(payload: dict) -> dict:
+    _release.wait(timeout=10)
+    return {"ok": True}
+
+
+@job_handler("test_record")
+def _record(payload: dict) -> dict:
+    _runs.append(payload)
+    return {"ok": True}
+
+
+async def _wait_for(queue: JobQueue, job_id: str, status: str, *, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while queue.get(user_id="u", job_id=job_id).status != status:
+        assert time.monotonic() < deadline, f"job never reached {status!r}"
+        await asyncio.sleep(0.02)
+
+
+def test_stop_hands_interrupted_jobs_back(tmp_path):
+    async def scenario() -> None:
+        queue = JobQueue(str(tmp_path / "jobs.sqlite3"), workers=1, poll_interval=0.05)
+        await queue.start()
+        job_id = queue.enqueue(user_id="u", kind="test_blocking", payload={})
+        await _wait_for(queue, job_id, "running")
+
+        await queue.stop(timeout=0.1)
+        _release.set()
+        assert queue.get(user_id="u", job_id=job_id).status == "queued"
+
+    _release.clear()
+    asyncio.run(scenario())
+
+
+def test_expired_lease_is_reclaimed_without_restart(tmp_path):
+    async def scenario() -> None:
+        queue = JobQueue(str(tmp_path / "jobs.sqlite3"), workers=1, poll_interval=0.05)
+        job_id = queue.enqueue(user_id="u", kind="test_record", payload={"n": 1})
+        # A worker of another process claimed it and died.
+        queue._db.execute(
+            "update jobs set status = 'running', owner = 'dead', lease_until = ?, attempts = 1 where job_id = ?",
+            (time.time() + 0.2, job_id),
+        )
+
+        await queue.start()
+        await asyncio.sleep(0.1)
+        assert queue.get(user_id="u", job_id=job_id).status == "running"
+        await _wait_for(queue, job_id, "succeeded")
+        await queue.stop()
+
+    _runs.clear()
+    asyncio.run(scenario())
+    assert _runs == [{"n": 1}]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+from storage3.exceptions import StorageApiError
+
+from app.core.auth import AuthenticatedUser, get_current_user
+from app.main import app
+from app.services.resilience import (
+    SUPABASE,
+    CircuitBreaker,
+    CircuitOpenError,
+    Upstream,
+    _supabase_client_error,
+    _supabase_retryable,
+    get_upstream,
+)
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "http://supabase/rest/v1/items")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.mark.parametrize(
+    ("exc", "retryable", "client_error"),
+    [
+        (httpx.ConnectError("refused"), True, False),
+        (_status_error(503), True, False),
+        (_status_error(404), False, True),
+        (APIError({"code": 502, "message": "JSON could not be generated"}), True, False),
+        (APIError({"code": "PGRST000", "message": "Could not connect"}), True, False),
+        (APIError({"code": "57014", "message": "statement timeout"}), True, False),
+        (APIError({"code": "23505", "message": "duplicate key"}), False, True),
+        (APIError({"code": "PGRST116", "message": "no rows"}), False, True),
+        (StorageApiError("busy", "InternalError", 503), True, False),
+        (StorageApiError("missing", "not_found", "404"), False, True),
+        (ValueError("bug"), False, False),
+    ],
+)
+def test_supabase_error_classification(exc, retryable, client_error):
+    assert _supabase_retryable(exc) is retryable
+    assert _supabase_client_error(exc) is client_error
+
+
+def test_upstream_5xx_errors_open_the_circuit():
+    upstream = Upstream(
+        "test",
+        is_retryable=_supabase_retryable,
+        is_client_error=_supabase_client_error,
+        breaker=CircuitBreaker("test", failure_threshold=3),
+    )
+
+    def fail():
+        raise APIError({"code": 503, "message": "JSON could not be generated"})
+
+    for _ in range(3):
+        with pytest.raises(APIError):
+            upstream.call(fail, retry=False)
+    with pytest.raises(CircuitOpenError):
+        upstream.call(lambda: None)
+
+
+def test_open_circuit_reaches_the_503_handler(fake_db):
+    breaker = get_upstream(SUPABASE).breaker
+    app.dependency_overrides[get_current_user] = lambda: AuthenticatedUser(user_id="u")
+    try:
+        for _ in range(100):
+            breaker.record_failure()
+        resp = TestClient(app).patch("/update_item", json={"item_id": "i", "name": "Drill"})
+        assert resp.status_code == 503
+        assert int(resp.headers["retry-after"]) >= 1
+    finally:
+        breaker.record_success()
+        app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.core.auth import AuthenticatedUser, get_current_user
+from app.main import app
+from app.services.collection_versions import ITEMS, get_collection_versions
+
+
+def test_write_on_another_worker_is_not_served_from_cache(fake_db):
+    user = str(uuid4())
+    app.dependency_overrides[get_current_user] = lambda: AuthenticatedUser(user_id=user)
+    try:
+        client = TestClient(app)
+        client.post("/add_item", json={"name": "Drill", "category": "Tools", "quantity": 1, "location": "Garage"})
+        first = client.get("/items")
+        assert [i["name"] for i in first.json()["items"]] == ["Drill"]
+
+        # Another worker adds an item: the database bumps the version, but
+        # nothing in this process is invalidated. Once this process's cached
+        # version lapses, it sees the new version ...
+        fake_db.insert("items", [{"item_id": str(uuid4()), "user_id": user, "name": "Saw", "quantity": 1}])
+        get_collection_versions()._entries.pop((user, ITEMS))
+
+        # ... and must not pair the new ETag with the body cached under the old one.
+        second = client.get("/items", headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 200
+        assert second.headers["etag"] != first.headers["etag"]
+        assert sorted(i["name"] for i in second.json()["items"]) == ["Drill", "Saw"]
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
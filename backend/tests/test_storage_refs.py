@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.items_repo import add_item, delete_item, update_item
+
+
+@pytest.fixture
+def bucket() -> str:
+    return get_settings().supabase_storage_bucket
+
+
+def _legacy_item(db, *, user_id: str, image_path: str) -> str:
+    """An item row written before image paths were checked, so it may point anywhere."""
+    item_id = str(uuid4())
+    db.insert("items", [{"item_id": item_id, "user_id": user_id, "name": "Legacy", "image_path": image_path}])
+    return item_id
+
+
+def test_deleting_last_reference_removes_object(fake_db, bucket, stored_image):
+    user = str(uuid4())
+    path = stored_image(user)
+    first = add_item(user_id=user, item={"name": "Drill", "image_path": path})
+    second = add_item(user_id=user, item={"name": "Drill bits", "image_path": path})
+    assert fake_db.blob_refs.get((bucket, path)) == 2
+
+    delete_item(user_id=user, item_id=first["item_id"])
+    assert (bucket, path) in fake_db.objects
+
+    delete_item(user_id=user, item_id=second["item_id"])
+    assert (bucket, path) not in fake_db.objects
+    assert (bucket, path) not in fake_db.blob_refs
+
+
+def test_deleting_item_pointing_at_another_users_image_keeps_it(fake_db, bucket, stored_image):
+    owner, other = str(uuid4()), str(uuid4())
+    path = stored_image(owner)
+    add_item(user_id=owner, item={"name": "Drill", "image_path": path})
+    borrowed = _legacy_item(fake_db, user_id=other, image_path=path)
+
+    assert delete_item(user_id=other, item_id=borrowed)
+    assert (bucket, path) in fake_db.objects
+    assert fake_db.blob_refs.get((bucket, path)) == 1
+
+
+def test_repointing_item_away_from_another_users_image_keeps_it(fake_db, bucket, stored_image):
+    owner, other = str(uuid4()), str(uuid4())
+    path = stored_image(owner)
+    add_item(user_id=owner, item={"name": "Drill", "image_path": path})
+    borrowed = _legacy_item(fake_db, user_id=other, image_path=path)
+
+    update_item(user_id=other, item_id=borrowed, updates={"image_path": stored_image(other)})
+    assert (bucket, path) in fake_db.objects
+    assert fake_db.blob_refs.get((bucket, path)) == 1
+
+
+def test_deleting_item_with_untracked_image_keeps_object(fake_db, bucket):
+    user = str(uuid4())
+    path = f"{user}/{uuid4().hex}.png"
+    fake_db.objects[(bucket, path)] = b"png"
+    item_id = _legacy_item(fake_db, user_id=user, image_path=path)
+
+    assert delete_item(user_id=user, item_id=item_id)
+    assert (bucket, path) in fake_db.objects
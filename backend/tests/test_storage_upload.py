@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from io import BytesIO
+
+import httpx
+from fastapi import UploadFile
+
+from app.services.storage import stream_upload
+
+
+def test_stream_upload_retries_from_the_start(fake_db, monkeypatch):
+    content = b"0123456789" * 100_000
+    original_post = httpx.AsyncClient.post
+    attempts = 0
+
+    async def flaky_post(self, url, **kwargs):
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            # Consume part of the body before failing, as a dropped connection would.
+            await anext(kwargs["content"])
+            raise httpx.ConnectError("connection reset")
+        return await original_post(self, url, **kwargs)
+
+    monkeypatch.setattr(httpx.AsyncClient, "post", flaky_post)
+    upload = UploadFile(file=BytesIO(content), filename="manual.pdf")
+
+    size, digest = asyncio.run(
+        stream_upload(bucket="documents", path="u/manual.pdf", upload=upload, content_type="application/pdf", max_bytes=len(content))
+    )
+
+    assert attempts == 2
+    assert (size, digest) == (len(content), hashlib.sha256(content).hexdigest())
+    assert fake_db.objects[("documents", "u/manual.pdf")] == content
@@ -40,6 +40,7 @@ type DraftItem = {
   quantity: number;
   location: string;
   image_url?: string | null;
+  image_path?: string | null;
   barcode?: string | null;
   purchase_source?: string | null;
   notes?: string | null;
@@ -51,6 +52,7 @@ const emptyDraft: DraftItem = {
   quantity: 1,
   location: "",
   image_url: null,
+  image_path: null,
   barcode: null,
   purchase_source: null,
   notes: null,
@@ -489,6 +491,7 @@ export function DashboardClient() {
           quantity: draft.quantity,
           location: draft.location,
           image_url: draft.image_url ?? null,
+          image_path: draft.image_path ?? null,
           barcode: draft.barcode ?? null,
           purchase_source: draft.purchase_source ?? null,
           notes: draft.notes ?? null,
@@ -544,6 +547,7 @@ export function DashboardClient() {
         purchase_source: asString(extracted.purchase_source) ?? d.purchase_source,
         notes: asString(extracted.notes) ?? d.notes,
         image_url: res.image_url,
+        image_path: res.image_path,
       }));
 
       setCreateOpen(true);
@@ -1166,7 +1170,12 @@ export function DashboardClient() {
                     <TableCell>
                       {it.image_url ? (
                         <a href={it.image_url} target="_blank" rel="noreferrer" className="underline">
-                          View
+                          {it.thumbnail_urls?.["128"] ? (
+                            // eslint-disable-next-line @next/next/no-img-element
+                            <img src={it.thumbnail_urls["128"]} alt={it.name} className="h-10 w-10 rounded object-cover" loading="lazy" />
+                          ) : (
+                            "View"
+                          )}
                         </a>
                       ) : (
                         <span className="text-muted-foreground">—</span>
@@ -10,6 +10,8 @@ export type InventoryItem = {
   quantity: number;
   location: string;
   image_url?: string | null;
+  image_path?: string | null;
+  thumbnail_urls?: Record<string, string> | null;
   barcode?: string | null;
   purchase_source?: string | null;
   notes?: string | null;
@@ -41,6 +43,10 @@ async function apiFetch<T>(
   return (await res.json()) as T;
 }
 
+export async function listItems(params: { token: string }) {
+  return apiFetch<{ items: InventoryItem[] }>("/items", { token: params.token });
+}
+
 export async function searchItems(params: { token: string; query: string }) {
   return apiFetch<{ items: InventoryItem[]; parsed: Record<string, unknown> }>(
     "/search_items",
@@ -53,6 +59,23 @@ export async function searchItems(params: { token: string; query: string }) {
   );
 }
 
+export type InventoryStatsBucket = {
+  key: string;
+  item_count: number;
+  total_quantity: number;
+};
+
+export type InventoryStats = {
+  total_items: number;
+  total_quantity: number;
+  by_category: InventoryStatsBucket[];
+  by_location: InventoryStatsBucket[];
+};
+
+export async function getInventoryStats(params: { token: string }) {
+  return apiFetch<InventoryStats>("/inventory/stats", { token: params.token });
+}
+
 export type ExtractedInventoryItem = {
   name: string;
   category: string;
@@ -97,7 +120,7 @@ export async function bulkCreate(params: {
 
 export async function addItem(params: {
   token: string;
-  item: Omit<InventoryItem, "item_id" | "created_at">;
+  item: Omit<InventoryItem, "item_id" | "created_at" | "thumbnail_urls">;
 }) {
   return apiFetch<{ item: InventoryItem }>("/add_item", {
     method: "POST",
@@ -119,7 +142,12 @@ export async function deleteItem(params: { token: string; item_id: string }) {
 export async function extractFromImage(params: { token: string; file: File }) {
   const form = new FormData();
   form.append("file", params.file);
-  return apiFetch<{ extracted: Record<string, unknown>; image_url: string }>(
+  return apiFetch<{
+    extracted: Record<string, unknown>;
+    image_url: string;
+    image_path: string;
+    thumbnail_urls: Record<string, string>;
+  }>(
     "/extract_from_image",
     {
       method: "POST",
@@ -59,6 +59,14 @@ class ApiClient {
     return docs.map(DocumentEntry.fromJson).toList();
   }
 
+  Future<SyncResult> sync({String? since}) async {
+    final res = await _dio.get<Map<String, dynamic>>(
+      '/sync',
+      queryParameters: <String, dynamic>{if (since != null) 'since': since},
+    );
+    return SyncResult.fromJson(res.data ?? {});
+  }
+
   Future<SearchItemsResult> searchItems({required String query}) async {
     final res = await _dio.post<Map<String, dynamic>>(
       '/search_items',
@@ -378,6 +386,37 @@ class UpdateItemRequest {
   }
 }
 
+class SyncResult {
+  SyncResult({
+    required this.full,
+    required this.items,
+    required this.documents,
+    required this.deletedItemIds,
+    required this.deletedDocumentIds,
+    required this.syncToken,
+  });
+
+  final bool full;
+  final List<InventoryItem> items;
+  final List<DocumentEntry> documents;
+  final List<String> deletedItemIds;
+  final List<String> deletedDocumentIds;
+  final String syncToken;
+
+  factory SyncResult.fromJson(Map<String, dynamic> json) {
+    List<Map<String, dynamic>> rows(String key) => (json[key] as List<dynamic>? ?? []).cast<Map<String, dynamic>>();
+    List<String> ids(String key) => (json[key] as List<dynamic>? ?? []).map((e) => e.toString()).toList();
+    return SyncResult(
+      full: json['full'] == true,
+      items: rows('items').map(InventoryItem.fromJson).toList(),
+      documents: rows('documents').map(DocumentEntry.fromJson).toList(),
+      deletedItemIds: ids('deleted_items'),
+      deletedDocumentIds: ids('deleted_documents'),
+      syncToken: (json['sync_token'] ?? '').toString(),
+    );
+  }
+}
+
 class SearchItemsResult {
   SearchItemsResult({required this.items, required this.parsed});
 
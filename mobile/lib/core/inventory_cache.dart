@@ -2,10 +2,31 @@ import 'api_client.dart';
 
 class InventoryCache {
   static List<InventoryItem> _items = const [];
+  static String? _syncToken;
 
   static List<InventoryItem> get items => _items;
 
+  /// Token for the next `/sync` call; null until the first full sync.
+  static String? get syncToken => _syncToken;
+
   static void setItems(List<InventoryItem> items) {
     _items = List<InventoryItem>.unmodifiable(items);
   }
+
+  static void applySync(SyncResult result) {
+    final byId = <String, InventoryItem>{
+      if (!result.full)
+        for (final it in _items) it.itemId: it,
+    };
+    for (final id in result.deletedItemIds) {
+      byId.remove(id);
+    }
+    for (final it in result.items) {
+      byId[it.itemId] = it;
+    }
+
+    final merged = byId.values.toList()..sort((a, b) => b.createdAt.compareTo(a.createdAt));
+    setItems(merged);
+    _syncToken = result.syncToken.isEmpty ? null : result.syncToken;
+  }
 }
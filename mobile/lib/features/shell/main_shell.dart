@@ -28,20 +28,12 @@ class _MainShellState extends State<MainShell> {
 
   Future<void> _prefetchInventoryCache() async {
     try {
-      final supabase = Supabase.instance.client;
-      final uid = supabase.auth.currentUser?.id;
+      final uid = Supabase.instance.client.auth.currentUser?.id;
       if (uid == null || uid.isEmpty) return;
 
-      final resp = await supabase
-          .from('items')
-          .select('item_id,name,category,quantity,location,created_at')
-          .eq('user_id', uid)
-          .order('created_at', ascending: false)
-          .limit(250);
-
-      final rows = (resp as List<dynamic>).cast<Map<String, dynamic>>();
-      final items = rows.map(InventoryItem.fromJson).toList();
-      InventoryCache.setItems(items);
+      // Only changes since the last sync cross the network after the first call.
+      final result = await widget.api.sync(since: InventoryCache.syncToken);
+      InventoryCache.applySync(result);
     } catch (_) {
       // Best-effort only.
     }